@@ -0,0 +1,148 @@
+# ai/anytime.py
+"""
+Giao diện quyết định "anytime" dùng chung cho mọi bot.
+
+- decide(state, dice_value, deadline): chọn piece_id cho state với xúc xắc cho trước, không gieo
+  xúc xắc và không để lại thay đổi nào trên gm. deadline tính theo time.perf_counter()
+  (None = bot tự dùng time_budget nếu có).
+- best_move(): nước tốt nhất tìm được tới lúc này (đọc được từ luồng khác khi bot đang nghĩ).
+- stop(): yêu cầu bot dừng sớm, decide trả về best_move() hiện tại.
+- choose_move(): giao diện cũ (gieo xúc xắc, ghi gm.dice_value, trả về Piece), gọi decide.
+
+AnytimeDecision chạy decide trên một luồng nền với bản sao của ván, để vòng lặp vẽ không bị
+treo: mỗi frame UI chỉ cần hỏi done / best_move() và quyết định dừng khi hết giờ.
+"""
+import copy
+import logging
+import threading
+import time
+
+STOP_JOIN_TIMEOUT = 0.5  # giây tối đa chờ luồng bot dừng sau stop()
+
+
+class AnytimeBot:
+    """Mixin cho các bot: lớp con cài đặt _decide(dice_value, movable_pieces, deadline)."""
+    display_name = "Bot"
+    time_budget = None
+
+    def decide(self, state, dice_value, deadline=None):
+        """piece_id nên đi với dice_value ở state (lượt của bot), None nếu không có nước đi."""
+        gm = self.gm
+        live = gm.state
+        saved = None
+        if state is not live:
+            saved = live.copy()
+            live.assign(state)
+            gm.rebuild_occupancy()
+        saved_dice = live.dice_value
+        live.dice_value = dice_value
+        if deadline is None and self.time_budget is not None:
+            deadline = time.perf_counter() + self.time_budget
+        self._stop_requested = False
+        self._best = None
+        try:
+            movable_pieces = gm.get_movable_pieces(self.player_id, dice_value)
+            if not movable_pieces:
+                return None
+            self._best = movable_pieces[0].id
+            piece_id = self._decide(dice_value, movable_pieces, deadline)
+            self._best = piece_id
+            return piece_id
+        finally:
+            if saved is not None:
+                live.assign(saved)
+                gm.rebuild_occupancy()
+            else:
+                live.dice_value = saved_dice
+
+    def best_move(self):
+        """piece_id tốt nhất tìm được tới lúc này (None nếu chưa bắt đầu hoặc không có nước đi)."""
+        return getattr(self, '_best', None)
+
+    def stop(self):
+        """Yêu cầu dừng sớm lần decide đang chạy."""
+        self._stop_requested = True
+
+    def out_of_time(self, deadline):
+        """True khi đã bị yêu cầu dừng (stop() hoặc stop_event) hoặc quá deadline (time.perf_counter())."""
+        if getattr(self, '_stop_requested', False):
+            return True
+        stop_event = getattr(self, 'stop_event', None)
+        if stop_event is not None and stop_event.is_set():
+            return True
+        return deadline is not None and time.perf_counter() >= deadline
+
+    def clone(self, game_manager):
+        """Bản sao cùng cấu hình, gắn với game_manager khác (dùng cho luồng nền)."""
+        bot = copy.copy(self)
+        bot.gm = game_manager
+        bot._stop_requested = False
+        bot._best = None
+        bot.stop_event = None
+        return bot
+
+    def choose_move(self):
+        """
+        Gieo xúc xắc, ghi vào gm.dice_value và chọn nước đi bằng decide.
+        Trả về Piece hoặc None nếu không có nước đi.
+        """
+        dice_value = self.gm.rng.roll()
+        self.gm.dice_value = dice_value
+        logging.info(f"{self.display_name} (Người {self.player_id + 1}) gieo được: {dice_value}")
+        piece_id = self.decide(self.gm.state, dice_value)
+        if piece_id is None:
+            logging.info(f"{self.display_name} (Người {self.player_id + 1}) không có nước đi.")
+            return None
+        return self.gm.players[self.player_id][piece_id]
+
+
+class AnytimeDecision:
+    """
+    Chạy bot.decide trên luồng nền, trên một GameManager headless sao chép từ gm
+    (gm gốc vẫn được vẽ bình thường). Bản sao có GameRNG riêng, seed rút từ luồng phụ của gm.rng:
+    luồng bot không chạm vào gm.rng và ván vẫn tái lập được từ seed.
+    Yêu cầu dừng ghi vào một Event mà out_of_time() của bot kiểm tra, nên stop() gọi trước khi
+    luồng kịp chạy decide vẫn có hiệu lực.
+    """
+
+    def __init__(self, bot, gm, dice_value, deadline):
+        from core.game_manager import GameManager  # tránh import vòng (GameManager tạo bot)
+
+        engine = GameManager(num_players=gm.num_players, seed=gm.rng.getrandbits(52))
+        engine.restore_state(gm.state)
+        self.bot = bot.clone(engine)
+        self._stop_event = threading.Event()
+        self.bot.stop_event = self._stop_event
+        self.dice_value = dice_value
+        self.deadline = deadline
+        self.result = None
+        self.error = None
+        self._thread = threading.Thread(target=self._run, name=f"bot-{bot.player_id}", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            self.result = self.bot.decide(self.bot.gm.state, self.dice_value, self.deadline)
+        except Exception as e:  # lỗi trong bot không được làm sập vòng lặp UI
+            logging.exception(f"Bot gặp lỗi khi suy nghĩ: {e}")
+            self.error = e
+
+    @property
+    def done(self):
+        return not self._thread.is_alive()
+
+    def best_move(self):
+        return self.result if self.done and self.error is None else self.bot.best_move()
+
+    def stop(self):
+        """Yêu cầu bot dừng (không chờ)."""
+        self._stop_event.set()
+
+    def finish(self, timeout=STOP_JOIN_TIMEOUT):
+        """Dừng bot (nếu chưa xong), chờ tối đa timeout giây và trả về nước đi tốt nhất hiện có."""
+        if not self.done:
+            self.stop()
+            self._thread.join(timeout)
+            if not self.done:
+                logging.warning(f"Luồng {self._thread.name} chưa dừng sau {timeout}s, dùng nước tốt nhất hiện có.")
+        return self.best_move()
@@ -0,0 +1,285 @@
+# ai/expectimax_bot.py
+import time
+import logging
+from ai.hard_bot import HardBot
+from ai import tablebase
+from ai.anytime import AnytimeBot
+from core.canonical import canonical_hash, distinct_moves
+from core.board import LAST_INDEX, HOME_LANE_START
+from core.transposition import TranspositionTable, EXACT, LOWER_BOUND, UPPER_BOUND
+
+# Giá trị đánh giá luôn nằm trong [LOWER, UPPER] (cần cho cắt tỉa Star1/Star2 ở nút may rủi)
+LOWER, UPPER = -1.0, 1.0
+DICE_FACES = (1, 2, 3, 4, 5, 6)
+NODES_PER_CLOCK_CHECK = 64
+
+
+def _piece_value(path_index):
+    """Giá trị một quân theo vị trí: ra quân đáng ~10 bước, vào đường về đích (an toàn) được thưởng thêm."""
+    if path_index < 0:
+        return 0.0
+    if path_index == LAST_INDEX:
+        return 1.0
+    if path_index >= HOME_LANE_START:
+        return 0.75 + 0.03 * (path_index - HOME_LANE_START)
+    return 0.1 + 0.5 * path_index / (HOME_LANE_START - 1)
+
+
+# PIECE_VALUE[path_index + 1]
+PIECE_VALUE = tuple(_piece_value(i) for i in range(-1, LAST_INDEX + 1))
+
+
+class _SearchTimeout(Exception):
+    """Hết thời gian suy nghĩ: bỏ độ sâu đang tìm, dùng kết quả độ sâu trước."""
+
+
+class ExpectimaxBot(AnytimeBot):
+    """
+    Bot tìm kiếm expectiminimax vài lượt gieo về phía trước.
+    - Nút quyết định: người đang đi chọn quân (bot = MAX, mọi đối thủ = MIN - mô hình "paranoid").
+    - Nút may rủi: trung bình 6 mặt xúc xắc, cắt tỉa Star1 + thăm dò Star2.
+    - Thứ tự nước đi lấy từ HardBot.evaluate_moves, nước tốt nhất trong bảng chuyển vị được thử trước.
+    - Bảng chuyển vị khoá theo core.canonical.canonical_hash (không phân biệt các quân cùng người),
+      nước đi lưu theo vị trí quân nguồn; các quân cùng ô chỉ thử một lần.
+    - Iterative deepening theo hạn chót: luôn trả lời trong time_budget giây
+      (time_budget=None: tìm hết max_depth, cho kết quả không phụ thuộc tốc độ máy).
+    Mọi nước thử đều dùng gm.apply_move/undo_move, không sao chép GameManager.
+    best_move() trả về nước tốt nhất của độ sâu đã tìm xong gần nhất.
+    """
+    display_name = "Bot Chuyên gia"
+
+    def __init__(self, player_id, game_manager, time_budget=0.3, max_depth=6):
+        self.player_id = player_id
+        self.gm = game_manager
+        self.time_budget = time_budget
+        self.max_depth = max_depth
+        self.tt = TranspositionTable(1 << 16)
+        self.last_search_depth = 0
+        self.nodes = 0
+        self._deadline = None
+        self._orderers = {}
+        self.tablebase = tablebase.get_default()
+
+    def clone(self, game_manager):
+        bot = super().clone(game_manager)
+        bot.tt = TranspositionTable(self.tt.capacity, self.tt.policy)
+        bot._orderers = {}
+        return bot
+
+    # --- Hàm đánh giá tĩnh ---
+    def _progress(self, slot):
+        """Tiến độ của một người chơi trong [0, 1] (trung bình PIECE_VALUE của 4 quân)."""
+        total = 0.0
+        for path_index in self.gm.state.player_positions(slot):
+            total += PIECE_VALUE[path_index + 1]
+        return total / 4
+
+    def evaluate(self):
+        """Giá trị vị trí theo góc nhìn của bot: tiến độ của mình trừ tiến độ đối thủ mạnh nhất."""
+        state = self.gm.state
+        if state.winner is not None:
+            return UPPER if state.winner == self.player_id else LOWER
+        mine = self._progress(self.player_id)
+        best_opponent = max(self._progress(slot) for slot in range(state.num_players) if slot != self.player_id)
+        return mine - best_opponent
+
+    # --- Sinh và sắp xếp nước đi ---
+    def _orderer(self, slot):
+        if slot not in self._orderers:
+            self._orderers[slot] = HardBot(slot, self.gm)
+        return self._orderers[slot]
+
+    def _distinct_moves(self, slot, dice):
+        """piece_id đi được, bỏ quân đứng chung ô với quân id nhỏ hơn (cùng một nước đi)."""
+        return distinct_moves(self.gm.state, slot, [piece.id for piece in self.gm.get_movable_pieces(slot, dice)])
+
+    def _ordered_moves(self, slot, dice, tt_source=None):
+        """
+        Các nước đi khác nhau, sắp theo điểm HardBot giảm dần.
+        tt_source: vị trí quân nguồn của nước tốt nhất trong bảng chuyển vị (được đưa lên đầu).
+        """
+        moves = self._distinct_moves(slot, dice)
+        if len(moves) <= 1:
+            return moves
+        scores = self._orderer(slot).evaluate_moves(dice)
+        moves.sort(key=lambda piece_id: -scores[piece_id])
+        if tt_source is not None:
+            state = self.gm.state
+            for piece_id in moves:
+                if state.get_index(slot, piece_id) == tt_source:
+                    moves.remove(piece_id)
+                    moves.insert(0, piece_id)
+                    break
+        return moves
+
+    def _tick(self):
+        self.nodes += 1
+        if self.nodes % NODES_PER_CLOCK_CHECK == 0 and self.out_of_time(self._deadline):
+            raise _SearchTimeout()
+
+    # --- Tìm kiếm ---
+    def _after_move(self, depth, alpha, beta):
+        """Giá trị sau khi một nước (hoặc lượt bỏ) đã được thực hiện."""
+        state = self.gm.state
+        if state.winner is not None or depth == 0:
+            return self.evaluate()
+        return self._chance(depth, alpha, beta)
+
+    def _decision(self, depth, alpha, beta, probe=False):
+        """Nút quyết định: state.dice_value đã biết. probe=True chỉ thử nước đầu tiên (Star2)."""
+        self._tick()
+        gm = self.gm
+        state = gm.state
+        slot = state.turn
+        maximizing = slot == self.player_id
+
+        key = None if probe else canonical_hash(state, gm.player_map, self.player_id)
+        entry = None if probe else self.tt.get(key)
+        if entry is not None and entry.depth >= depth:
+            if entry.flag == EXACT:
+                return entry.value
+            if entry.flag == LOWER_BOUND and entry.value >= beta:
+                return entry.value
+            if entry.flag == UPPER_BOUND and entry.value <= alpha:
+                return entry.value
+
+        moves = self._ordered_moves(slot, state.dice_value, entry.move if entry else None)
+        if not moves:
+            record = gm.apply_pass()
+            try:
+                return self._after_move(depth - 1, alpha, beta)
+            finally:
+                gm.undo_move(record)
+        if probe:
+            moves = moves[:1]
+
+        original_alpha, original_beta = alpha, beta
+        best_value = LOWER - 1 if maximizing else UPPER + 1
+        best_move = moves[0]
+        for piece_id in moves:
+            record = gm.apply_move(slot, piece_id)
+            try:
+                value = self._after_move(depth - 1, alpha, beta)
+            finally:
+                gm.undo_move(record)
+            if maximizing:
+                if value > best_value:
+                    best_value, best_move = value, piece_id
+                alpha = max(alpha, value)
+            else:
+                if value < best_value:
+                    best_value, best_move = value, piece_id
+                beta = min(beta, value)
+            if alpha >= beta:
+                break
+
+        if not probe:
+            if best_value <= original_alpha:
+                flag = UPPER_BOUND
+            elif best_value >= original_beta:
+                flag = LOWER_BOUND
+            else:
+                flag = EXACT
+            self.tt.store(key, depth, best_value, flag, state.get_index(slot, best_move))
+        return best_value
+
+    def _chance(self, depth, alpha, beta):
+        """
+        Nút may rủi (xúc xắc chưa gieo) với cắt tỉa Star1 và thăm dò Star2.
+        lo[i]/hi[i] là cận dưới/trên đã biết của giá trị nhánh mặt xúc xắc i.
+        """
+        state = self.gm.state
+        faces = len(DICE_FACES)
+        lo = [LOWER] * faces
+        hi = [UPPER] * faces
+        maximizing = state.turn == self.player_id
+
+        def child(i, a, b, probe=False):
+            state.dice_value = DICE_FACES[i]
+            try:
+                return self._decision(depth, a, b, probe)
+            finally:
+                state.dice_value = None
+
+        # Star2: thăm dò nước đầu tiên của mỗi nhánh để có cận (dưới nếu MAX đi, trên nếu MIN đi)
+        for i in range(faces):
+            if maximizing:
+                b_i = min(UPPER, faces * beta - (sum(lo) - lo[i]))
+                lo[i] = max(lo[i], child(i, LOWER, b_i, probe=True))
+                if sum(lo) / faces >= beta:
+                    return sum(lo) / faces
+            else:
+                a_i = max(LOWER, faces * alpha - (sum(hi) - hi[i]))
+                hi[i] = min(hi[i], child(i, a_i, UPPER, probe=True))
+                if sum(hi) / faces <= alpha:
+                    return sum(hi) / faces
+
+        # Star1: tìm đầy đủ từng nhánh với cửa sổ thu hẹp theo cận của các nhánh còn lại
+        for i in range(faces):
+            a_i = max(LOWER, faces * alpha - (sum(hi) - hi[i]))
+            b_i = min(UPPER, faces * beta - (sum(lo) - lo[i]))
+            value = child(i, a_i, b_i)
+            lo[i] = hi[i] = value
+            if sum(hi) / faces <= alpha:
+                return sum(hi) / faces
+            if sum(lo) / faces >= beta:
+                return sum(lo) / faces
+        return sum(lo) / faces
+
+    def search(self, dice_value, deadline):
+        """
+        Iterative deepening tại nút gốc (lượt của bot, xúc xắc = dice_value) tới deadline
+        (time.perf_counter()). Trả về piece_id.
+        """
+        gm = self.gm
+        state = gm.state
+        self._deadline = deadline
+        self.nodes = 0
+        self.tt.new_search()
+
+        moves = self._ordered_moves(self.player_id, dice_value)
+        best_move = moves[0]
+        self.last_search_depth = 0
+        for depth in range(1, self.max_depth + 1):
+            try:
+                alpha = LOWER - 1
+                depth_best, depth_value = moves[0], LOWER - 1
+                for piece_id in moves:
+                    record = gm.apply_move(self.player_id, piece_id)
+                    try:
+                        value = self._after_move(depth - 1, alpha, UPPER + 1)
+                    finally:
+                        gm.undo_move(record)
+                    if value > depth_value:
+                        depth_best, depth_value = piece_id, value
+                    alpha = max(alpha, value)
+            except _SearchTimeout:
+                break
+            best_move = self._best = depth_best
+            self.last_search_depth = depth
+            # Nước tốt nhất của độ sâu này được thử trước ở độ sâu sau
+            moves.remove(best_move)
+            moves.insert(0, best_move)
+            if self.out_of_time(deadline):
+                break
+        assert state.dice_value == dice_value
+        return best_move
+
+    def _decide(self, dice_value, movable_pieces, deadline):
+        """
+        Chọn nước đi bằng tìm kiếm expectiminimax tới deadline (choose_move gieo xúc xắc trước rồi gọi decide).
+        """
+        if len(self._distinct_moves(self.player_id, dice_value)) == 1:
+            return movable_pieces[0].id  # mọi quân đi được đều đứng chung một ô
+        # Thế đua về đích (không còn chạm được đối thủ): tra tablebase thay cho tìm kiếm
+        if self.tablebase is not None:
+            piece_id = self.tablebase.best_move(self.gm, self.player_id, dice_value)
+            if piece_id is not None:
+                logging.info(f"Bot Chuyên gia (Người {self.player_id + 1}) đua về đích, đi quân {piece_id + 1} theo tablebase.")
+                return piece_id
+
+        start = time.perf_counter()
+        piece_id = self.search(dice_value, deadline)
+        logging.info(f"Bot Chuyên gia chọn quân {piece_id + 1} (độ sâu {self.last_search_depth}, "
+                     f"{self.nodes} nút, {time.perf_counter() - start:.3f}s)")
+        return piece_id
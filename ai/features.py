@@ -0,0 +1,97 @@
+# ai/features.py
+"""
+Đặc trưng (feature) của một nước đi cho hàm đánh giá học từ self-play (ai.learned_eval).
+
+Mỗi nước đi ứng với một vector FEATURE_NAMES, tính theo góc nhìn người đi:
+- Phần nước đi: các tín hiệu mà HardBot đang cộng điểm bằng hằng số đoán tay
+  (về đích, vào đường về đích, ra quân, đá quân, bước đi, ô an toàn, nguy hiểm / thoát nguy hiểm...).
+- Phần thế cờ sau nước đi: tiến độ, số quân trong chuồng / đã an toàn, rủi ro bị đá của mình và đối thủ.
+Nước đi được thử bằng gm.apply_move rồi hoàn tác bằng gm.undo_move, gm không bị thay đổi.
+"""
+from core import rules
+from core.board import LAST_INDEX, HOME_LANE_START
+
+FEATURE_NAMES = (
+    'finish', 'enter_home', 'spawn', 'kick', 'extra_roll', 'step', 'land_safe',
+    'danger_dest', 'escape', 'tower',
+    'my_progress', 'my_home', 'my_yard', 'my_risk',
+    'opp_best_progress', 'opp_mean_progress', 'opp_yard', 'opp_risk',
+    'players_2', 'players_3', 'players_4',
+)
+NUM_FEATURES = len(FEATURE_NAMES)
+
+
+def _player_summary(state, threats, occupancy, ring, slot):
+    """(tiến độ, tỉ lệ quân đã an toàn, tỉ lệ quân trong chuồng, tổng xác suất bị đá của quân lẻ)."""
+    progress = home = yard = risk = 0.0
+    for path_index in state.player_positions(slot):
+        progress += path_index + 1
+        if path_index < 0:
+            yard += 1
+        elif path_index >= HOME_LANE_START:
+            home += 1
+        else:
+            cell = ring[path_index]
+            if occupancy.count(cell, slot) == 1:
+                risk += threats.threat(cell, slot)
+    return progress / (4 * (LAST_INDEX + 1)), home / 4, yard / 4, risk / 4
+
+
+def move_features(gm, slot, piece_id):
+    """Vector đặc trưng (list float) của nước đi quân piece_id với gm.dice_value hiện tại."""
+    state = gm.state
+    occupancy = gm.occupancy
+    threats = gm.threats
+    num_players = state.num_players
+    board_id = gm.player_map.get(slot, slot)
+    ring = rules.RING_CELL[board_id]
+    dice = state.dice_value
+
+    old_index = state.get_index(slot, piece_id)
+    target = rules.MOVE_TABLE[board_id][rules.move_key(old_index, dice)]
+
+    # Phần nước đi (trước khi đi, như HardBot.evaluate_moves)
+    threats.sync(state)
+    danger = 0.0
+    if target.ring >= 0 and occupancy.count(target.ring, slot) == 0:
+        danger = threats.threat(target.ring, slot)
+    escape = 0.0
+    if old_index >= 0 and ring[old_index] >= 0 and occupancy.count(ring[old_index], slot) == 1:
+        escape = threats.threat(ring[old_index], slot)
+
+    record = gm.apply_move(slot, piece_id)
+    try:
+        kicked = record[3] is not None
+        extra_roll = state.winner is None and state.turn == slot
+        tower = target.ring >= 0 and occupancy.count(target.ring, slot) >= 2
+
+        # Phần thế cờ sau nước đi
+        threats.sync(state)
+        my_progress, my_home, my_yard, my_risk = _player_summary(state, threats, occupancy, ring, slot)
+        opp_best = opp_total = opp_yard = opp_risk = 0.0
+        for other in range(num_players):
+            if other == slot:
+                continue
+            other_ring = rules.RING_CELL[gm.player_map.get(other, other)]
+            progress, _home, yard, risk = _player_summary(state, threats, occupancy, other_ring, other)
+            opp_best = max(opp_best, progress)
+            opp_total += progress
+            opp_yard += yard
+            opp_risk += risk
+    finally:
+        gm.undo_move(record)
+
+    opponents = num_players - 1
+    return [
+        float(target.finishes), float(target.enters_home_lane), float(old_index == -1), float(kicked),
+        float(extra_roll), (target.index - old_index) / 6, float(target.safe),
+        danger, escape, float(tower),
+        my_progress, my_home, my_yard, my_risk,
+        opp_best, opp_total / opponents, opp_yard / opponents, opp_risk / opponents,
+        float(num_players == 2), float(num_players == 3), float(num_players == 4),
+    ]
+
+
+def candidate_features(gm, slot, piece_ids):
+    """Ma trận đặc trưng (list các vector) cho mọi nước đi ứng viên, để đánh giá theo lô."""
+    return [move_features(gm, slot, piece_id) for piece_id in piece_ids]
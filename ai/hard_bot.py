@@ -1,93 +1,138 @@
 # ai/hard_bot.py
-import random
 import logging
 from core import rules # Cần import rules để biết các ô an toàn
+from ai import tablebase
+from ai.anytime import AnytimeBot
+
+DICE_SLOTS = rules.DICE_SLOTS  # bảng dùng chung khoá rules.move_key(path_index, dice)
+
+
+def _static_score(path_index, target):
+    """Phần điểm chỉ phụ thuộc nước đi (rules.MoveTarget): bước 1, 3, 4, 5, 6 của heuristic."""
+    score = 0
+    # 1. Ưu tiên về đích
+    if target.finishes:
+        score += 1000 # Điểm tuyệt đối
+    # 3. Ưu tiên đi vào đường về đích (home lane)
+    if target.enters_home_lane:
+        score += 100
+    # 4. Ưu tiên ra quân (nếu đang ở chuồng)
+    if path_index == -1:
+        score += 50
+    # 5. Ưu tiên tiến lên phía trước
+    score += (target.index - path_index) * 2
+    # 6. Ưu tiên đi đến ô an toàn (ô xuất phát)
+    if target.safe:
+        score += 30
+    return score
+
+
+def _build_tables():
+    """
+    Suy từ rules.MOVE_TABLE, theo từng board_id và khoá rules.move_key(path_index, dice):
+    - STATIC_SCORE: điểm tĩnh của nước đi, None nếu nước đi không hợp lệ.
+    - DEST_RING: ô vòng ngoài của ô đích (-1 nếu ở đường về đích).
+    - KICKABLE: ô đích có thể đá quân (trên vòng ngoài và không phải ô an toàn).
+    """
+    static_tables, ring_tables, kick_tables = [], [], []
+    for table in rules.MOVE_TABLE:
+        static, rings, kickable = [], [], []
+        for key, target in enumerate(table):
+            if target is None:
+                static.append(None)
+                rings.append(-1)
+                kickable.append(False)
+                continue
+            static.append(_static_score(key // DICE_SLOTS - 1, target))
+            rings.append(target.ring)
+            kickable.append(target.ring >= 0 and not target.safe)
+        static_tables.append(tuple(static))
+        ring_tables.append(tuple(rings))
+        kick_tables.append(tuple(kickable))
+    return tuple(static_tables), tuple(ring_tables), tuple(kick_tables)
+
+
+STATIC_SCORE, DEST_RING, KICKABLE = _build_tables()
+
+
+class HardBot(AnytimeBot):
+    display_name = "Bot Khó"
+    DANGER_WEIGHT = 200  # điểm trừ cho nước đi chắc chắn bị đá ở lượt tới (nhân với xác suất)
 
-class HardBot:
     def __init__(self, player_id, game_manager):
         self.player_id = player_id
         self.gm = game_manager
+        self.tablebase = tablebase.get_default()
 
-    def _evaluate_move(self, piece, new_path_index):
+    def evaluate_moves(self, dice_value):
         """
         Hàm đánh giá (heuristic) - "Bộ não" của bot.
-        Chấm điểm cho một nước đi giả lập.
+        Chấm điểm nước đi của cả 4 quân với dice_value trong một lượt duyệt các bảng tính sẵn.
+        Trả về list 4 điểm theo piece_id, None cho quân không đi được.
         """
-        score = 0
-        path_len = len(self.gm.board.get_path_for_player(self.player_id)) # 57
-        last_index = path_len - 1 # 56
-        
-        # 1. Ưu tiên về đích
-        if new_path_index == last_index:
-            score += 1000 # Điểm tuyệt đối
-            
-        # 2. Ưu tiên đá quân đối thủ
-        destination_cell = self.gm.board.get_path_for_player(self.player_id)[new_path_index]
-        if destination_cell not in rules.SAFE_CELLS: # Không đá được ở ô an toàn
-            for opponent_pid, opponent_pieces in enumerate(self.gm.players):
-                if opponent_pid == self.player_id: continue
-                for opp_piece in opponent_pieces:
-                    if opp_piece.path_index < 0 or opp_piece.finished: continue
-                    opp_cell = self.gm.board.get_path_for_player(opponent_pid)[opp_piece.path_index]
-                    if opp_cell == destination_cell:
-                        score += 500 # Điểm rất cao cho việc đá quân
-                        
-        # 3. Ưu tiên đi vào đường về đích (home lane)
-        # 51 là index bắt đầu của đường về đích (nếu 51 ô ngoài + 6 ô trong)
-        if new_path_index >= 51 and piece.path_index < 51:
-            score += 100 
-            
-        # 4. Ưu tiên ra quân (nếu đang ở chuồng)
-        if piece.path_index == -1:
-            score += 50
-            
-        # 5. Ưu tiên tiến lên phía trước
-        score += (new_path_index - piece.path_index) * 2
-        
-        # 6. Ưu tiên đi đến ô an toàn (ô xuất phát)
-        if destination_cell in rules.SAFE_CELLS:
-            score += 30
-
-        # 7. Tránh đi vào ô có thể bị đá bởi đối thủ (logic phức tạp hơn - có thể thêm sau)
-        
-        return score
-
-    def choose_move(self):
+        gm = self.gm
+        slot = self.player_id
+        state = gm.state
+        board_id = gm.player_map.get(slot, slot)
+        static, dest_rings, kickable = STATIC_SCORE[board_id], DEST_RING[board_id], KICKABLE[board_id]
+        ring_cells = rules.RING_CELL[board_id]
+        occupancy = gm.occupancy
+        threats = gm.threats
+        threats.sync(state)
+        danger = self.DANGER_WEIGHT
+        opponents = 0  # bitboard các ô có quân đối thủ: phần lớn ô đích trống nên bỏ qua được bước đếm
+        for other in range(state.num_players):
+            if other != slot:
+                opponents |= occupancy.occupied[other]
+
+        scores = []
+        for path_index in state.player_positions(slot):
+            k = (path_index + 1) * DICE_SLOTS + dice_value
+            score = static[k]
+            if score is None:  # quân đã về đích / chưa gieo 6 / đi quá ô đích
+                scores.append(None)
+                continue
+            destination_ring = dest_rings[k]
+            # 2. Ưu tiên đá quân đối thủ (mỗi quân đối thủ trên ô đích, trừ ô an toàn)
+            if kickable[k] and opponents >> destination_ring & 1:
+                score += 500 * occupancy.opponents_at(destination_ring, slot)
+            # 7. Tránh đi vào ô có thể bị đá ở lượt tới (bản đồ nguy hiểm); ô có sẵn quân mình sẽ thành
+            #    "tháp" nên không bị đá; rời ô nguy hiểm được cộng điểm.
+            if destination_ring >= 0 and occupancy.count(destination_ring, slot) == 0:
+                score -= danger * threats.threat(destination_ring, slot)
+            if path_index >= 0:
+                current_ring = ring_cells[path_index]
+                if current_ring >= 0 and occupancy.count(current_ring, slot) == 1:
+                    score += danger * threats.threat(current_ring, slot)
+            scores.append(score)
+        return scores
+
+    def _evaluate_move(self, piece, new_path_index):
+        """Điểm của một nước đi (giao diện cũ; dùng evaluate_moves khi chấm nhiều quân)."""
+        dice_value = 6 if piece.path_index == -1 else new_path_index - piece.path_index
+        return self.evaluate_moves(dice_value)[piece.id]
+
+    def _decide(self, dice_value, movable_pieces, deadline):
         """
-        Gieo xúc xắc và chọn nước đi có điểm cao nhất.
+        Chọn nước đi có điểm cao nhất (choose_move gieo xúc xắc trước rồi gọi decide).
         """
-        dice_value = random.randint(1, 6)
-        self.gm.dice_value = dice_value
-        logging.info(f"Bot Khó (Người {self.player_id + 1}) gieo được: {dice_value}")
+        # Thế đua về đích (không còn chạm được đối thủ): tra tablebase thay cho heuristic
+        if self.tablebase is not None and len(movable_pieces) > 1:
+            piece_id = self.tablebase.best_move(self.gm, self.player_id, dice_value)
+            if piece_id is not None:
+                logging.info(f"Bot Khó (Người {self.player_id + 1}) đua về đích, đi quân {piece_id + 1} theo tablebase.")
+                return piece_id
 
-        movable_pieces = self.gm.get_movable_pieces(self.player_id, dice_value)
-        
-        if not movable_pieces:
-            logging.info(f"Bot Khó (Người {self.player_id + 1}) không có nước đi.")
-            return None
-
-        # --- Logic chọn lựa ---
+        # --- Logic chọn lựa: chấm cả 4 quân một lần, lấy quân điểm cao nhất (hoà thì quân id nhỏ) ---
+        scores = self.evaluate_moves(dice_value)
         best_move = None
         best_score = -float('inf') # Khởi tạo điểm thấp nhất
-
         for piece in movable_pieces:
-            # Tính toán vị trí đích
-            new_path_index = -1
-            if piece.path_index == -1 and dice_value == 6:
-                new_path_index = 0 # Ra quân
-            elif piece.path_index >= 0:
-                new_path_index = piece.path_index + dice_value
-            
-            if new_path_index == -1: continue # Bỏ qua nếu không hợp lệ
-
-            # Chấm điểm cho nước đi này
-            move_score = self._evaluate_move(piece, new_path_index)
-            
-            logging.debug(f"Bot Khó: Quân {piece.id+1} đi tới {new_path_index} được {move_score} điểm.")
-
+            move_score = scores[piece.id]
+            logging.debug(f"Bot Khó: Quân {piece.id+1} được {move_score} điểm.")
             if move_score > best_score:
                 best_score = move_score
                 best_move = piece
-        
+
         logging.info(f"Bot Khó chọn di chuyển quân: {best_move.id + 1} (Điểm: {best_score})")
-        return best_move
\ No newline at end of file
+        return best_move.id
@@ -0,0 +1,36 @@
+# ai/learned_bot.py
+import logging
+from ai.hard_bot import HardBot
+from ai.features import candidate_features
+from ai import learned_eval
+from core.canonical import distinct_moves
+
+
+class LearnedBot(HardBot):
+    """
+    Bot dùng hàm đánh giá học từ self-play (ai.learned_eval) thay cho các hằng số của HardBot:
+    tính đặc trưng của mọi nước đi ứng viên rồi đánh giá cả lô trong một lần gọi mô hình.
+    Chưa có file mô hình (hoặc không có NumPy) thì chơi như HardBot.
+    """
+    display_name = "Bot Học máy"
+
+    def __init__(self, player_id, game_manager, evaluator=None):
+        super().__init__(player_id, game_manager)
+        self.evaluator = evaluator or learned_eval.get_default()
+
+    def _decide(self, dice_value, movable_pieces, deadline):
+        if self.evaluator is None:
+            return super()._decide(dice_value, movable_pieces, deadline)
+        # Thế đua về đích (không còn chạm được đối thủ): tra tablebase như HardBot
+        if self.tablebase is not None and len(movable_pieces) > 1:
+            piece_id = self.tablebase.best_move(self.gm, self.player_id, dice_value)
+            if piece_id is not None:
+                return piece_id
+
+        moves = distinct_moves(self.gm.state, self.player_id, [piece.id for piece in movable_pieces])
+        if len(moves) == 1:
+            return moves[0]
+        probabilities = self.evaluator.predict(candidate_features(self.gm, self.player_id, moves))
+        best = int(probabilities.argmax())
+        logging.info(f"Bot Học máy chọn quân {moves[best] + 1} (xác suất thắng ước lượng {probabilities[best]:.2f})")
+        return moves[best]
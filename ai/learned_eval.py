@@ -0,0 +1,149 @@
+# ai/learned_eval.py
+"""
+Hàm đánh giá học từ self-play: ước lượng xác suất người đi thắng ván sau một nước đi,
+từ vector đặc trưng ai.features (đã chuẩn hoá theo mean/std của dữ liệu huấn luyện).
+
+- 'linear': hồi quy logistic, p = sigmoid(z @ w + b).
+- 'mlp':    một lớp ẩn tanh, p = sigmoid(tanh(z @ W1 + b1) @ w2 + b2).
+Huấn luyện bằng Adam trên log-loss, thuần NumPy, chỉ dùng CPU (xem ai.selfplay).
+File mô hình là .npz: kind, feature_names, mean, std và các ma trận trọng số.
+"""
+import logging
+import os
+
+try:
+    import numpy as np
+except ImportError:  # bot học máy lùi về heuristic HardBot khi không có NumPy
+    np = None
+
+from ai.features import FEATURE_NAMES
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')  # theo thư mục gói, không theo thư mục đang chạy
+DEFAULT_PATH = os.path.join(DATA_DIR, 'learned_eval.npz')
+KINDS = ('linear', 'mlp')
+
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-np.clip(x, -30.0, 30.0)))
+
+
+class LearnedEvaluator:
+    def __init__(self, kind, mean, std, params):
+        if kind not in KINDS:
+            raise ValueError(f"kind phải thuộc {KINDS}")
+        self.kind = kind
+        self.mean = mean
+        self.std = std
+        self.params = params  # linear: [w, b]; mlp: [W1, b1, w2, b2]
+
+    def _forward(self, z):
+        if self.kind == 'linear':
+            w, b = self.params
+            return z @ w + b, None
+        W1, b1, w2, b2 = self.params
+        hidden = np.tanh(z @ W1 + b1)
+        return hidden @ w2 + b2, hidden
+
+    def predict(self, features):
+        """Xác suất thắng cho một lô vector đặc trưng (mảng hoặc list các list), trả về mảng 1 chiều."""
+        z = (np.asarray(features, dtype=np.float64) - self.mean) / self.std
+        return _sigmoid(self._forward(z)[0])
+
+    # --- Lưu / tải ---
+    def save(self, path=DEFAULT_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        arrays = {f'p{i}': p for i, p in enumerate(self.params)}
+        np.savez(path, kind=self.kind, feature_names=np.array(FEATURE_NAMES), mean=self.mean, std=self.std, **arrays)
+
+    @classmethod
+    def load(cls, path=DEFAULT_PATH):
+        with np.load(path) as data:
+            if tuple(data['feature_names']) != FEATURE_NAMES:
+                raise ValueError(f"Mô hình {path} dùng bộ đặc trưng khác phiên bản hiện tại")
+            kind = str(data['kind'])
+            count = 2 if kind == 'linear' else 4
+            params = [data[f'p{i}'] for i in range(count)]
+            return cls(kind, data['mean'], data['std'], params)
+
+    # --- Huấn luyện ---
+    @classmethod
+    def fit(cls, X, y, kind='linear', hidden=16, epochs=30, batch_size=4096, lr=0.01, l2=1e-4, seed=0,
+            log_every=5):
+        """Huấn luyện trên X (n x NUM_FEATURES), y (0/1) bằng Adam theo mini-batch."""
+        rng = np.random.default_rng(seed)
+        X = np.asarray(X, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        mean = X.mean(axis=0)
+        std = X.std(axis=0)
+        std[std < 1e-9] = 1.0  # đặc trưng hằng (ví dụ chỉ có ván 4 người)
+        Z = (X - mean) / std
+        n, f = Z.shape
+        if kind == 'linear':
+            params = [np.zeros(f), np.zeros(1)]
+        else:
+            params = [rng.normal(0.0, 1.0 / np.sqrt(f), (f, hidden)), np.zeros(hidden),
+                      rng.normal(0.0, 1.0 / np.sqrt(hidden), hidden), np.zeros(1)]
+        model = cls(kind, mean, std, params)
+        moments = [(np.zeros_like(p), np.zeros_like(p)) for p in params]
+        beta1, beta2, eps = 0.9, 0.999, 1e-8
+        step = 0
+        for epoch in range(epochs):
+            order = rng.permutation(n)
+            for start in range(0, n, batch_size):
+                batch = order[start:start + batch_size]
+                grads = model._gradients(Z[batch], y[batch], l2)
+                step += 1
+                for i, grad in enumerate(grads):
+                    m, v = moments[i]
+                    m = beta1 * m + (1 - beta1) * grad
+                    v = beta2 * v + (1 - beta2) * grad * grad
+                    moments[i] = (m, v)
+                    update = lr * (m / (1 - beta1 ** step)) / (np.sqrt(v / (1 - beta2 ** step)) + eps)
+                    model.params[i] = model.params[i] - update
+            if log_every and (epoch + 1) % log_every == 0:
+                logging.info(f"Epoch {epoch + 1}/{epochs}: log-loss {model.log_loss(X, y):.4f}")
+        return model
+
+    def _gradients(self, z, y, l2):
+        """Gradient của log-loss trung bình (+ L2 trên ma trận trọng số) theo từng tham số."""
+        logits, hidden = self._forward(z)
+        error = (_sigmoid(logits) - y) / len(y)
+        if self.kind == 'linear':
+            w, _b = self.params
+            return [z.T @ error + l2 * w, np.array([error.sum()])]
+        W1, _b1, w2, _b2 = self.params
+        back = np.outer(error, w2) * (1.0 - hidden * hidden)
+        return [z.T @ back + l2 * W1, back.sum(axis=0), hidden.T @ error + l2 * w2, np.array([error.sum()])]
+
+    def log_loss(self, X, y):
+        p = np.clip(self.predict(X), 1e-7, 1 - 1e-7)
+        y = np.asarray(y, dtype=np.float64)
+        return float(-np.mean(y * np.log(p) + (1 - y) * np.log(1 - p)))
+
+    def describe(self):
+        """Trọng số (theo đặc trưng đã chuẩn hoá) của mô hình tuyến tính, để so với hằng số của HardBot."""
+        if self.kind != 'linear':
+            return {}
+        return dict(zip(FEATURE_NAMES, (float(w) for w in self.params[0])))
+
+
+_DEFAULT = None
+_LOAD_FAILED = False
+
+
+def get_default():
+    """Mô hình dùng chung cho cả tiến trình, None nếu chưa huấn luyện hoặc không có NumPy."""
+    global _DEFAULT, _LOAD_FAILED
+    if _DEFAULT is None and not _LOAD_FAILED:
+        if np is None:
+            _LOAD_FAILED = True
+            logging.info("Không có NumPy: bot học máy dùng heuristic HardBot.")
+            return None
+        try:
+            _DEFAULT = LearnedEvaluator.load(DEFAULT_PATH)
+        except (OSError, ValueError, KeyError) as e:
+            _LOAD_FAILED = True
+            logging.info(f"Không dùng hàm đánh giá học máy ({e}). Tạo bằng: python -m ai.selfplay")
+    return _DEFAULT
@@ -0,0 +1,368 @@
+# ai/mcts_bot.py
+"""
+Bot Monte Carlo Tree Search song song theo gốc (root parallelization).
+
+Mỗi tiến trình con dựng lại ván từ GameState.to_bytes() trên một GameManager headless,
+tự xây một cây UCT độc lập (seed riêng) cho tới hạn chót rồi trả về thống kê các nhánh gốc
+(số lần thăm, số lần thắng). Tiến trình chính cộng dồn thống kê và chọn nước được thăm nhiều nhất.
+
+Cây là "open-loop": nút con khoá theo piece_id, xúc xắc được gieo lại ở mỗi lần duyệt nên
+một nút gom mọi kết quả gieo; khi chọn nhánh chỉ xét các quân đi được với xúc xắc vừa gieo.
+Playout dùng heuristic của HardBot (tính trực tiếp trên state) kèm một phần nước ngẫu nhiên.
+"""
+import logging
+import math
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+
+from ai import tablebase
+from ai.anytime import AnytimeBot
+from ai.hard_bot import STATIC_SCORE, DEST_RING, KICKABLE, DICE_SLOTS
+from core.board import LAST_INDEX
+from core.state import GameState
+
+EXPLORATION = 0.5          # hằng số C của UCB1
+PLAYOUT_EPSILON = 0.1      # tỉ lệ nước ngẫu nhiên trong playout
+PRIOR_WEIGHT = 10.0        # trọng số progressive bias theo điểm HardBot
+MAX_PLAYOUT_PLIES = 2000   # chặn playout vô hạn (thực tế một ván < 1000 lần gieo)
+RESULT_MARGIN = 0.02       # giây dành cho việc gửi kết quả từ tiến trình con về
+REPORT_INTERVAL = 256      # số lần duyệt giữa hai lần báo thống kê gốc (best_move khi tìm trong tiến trình)
+POLL_INTERVAL = 0.01       # giây tối đa giữa hai lần kiểm tra stop() khi chờ tiến trình con
+FALLBACK_TIME = 0.05       # giây tìm trong tiến trình khi hết giờ mà chưa tiến trình con nào trả kết quả
+
+_POOL = None
+_POOL_WORKERS = 0
+_IN_PROCESS = False  # True: không tạo pool (đang chạy trong tiến trình con của pool khác, ví dụ giải đấu)
+_ENGINES = {}  # num_players -> GameManager headless (trong mỗi tiến trình)
+
+
+class _Node:
+    """Nút cây: wins tính theo góc nhìn người vừa đi nước dẫn vào nút này."""
+    __slots__ = ('children', 'visits', 'wins')
+
+    def __init__(self):
+        self.children = {}
+        self.visits = 0
+        self.wins = 0.0
+
+
+def _engine(num_players):
+    """GameManager không bot, không lưu trữ, dùng lại giữa các lần tìm kiếm."""
+    gm = _ENGINES.get(num_players)
+    if gm is None:
+        from core.game_manager import GameManager
+        gm = GameManager(num_players=num_players)
+        _ENGINES[num_players] = gm
+    return gm
+
+
+def _legal_moves(state, slot, dice):
+    """Các nước đi khác nhau: quân cùng ô cho cùng một kết quả nên chỉ giữ quân id nhỏ nhất (core.canonical)."""
+    moves = []
+    seen = []
+    for piece_id, path_index in enumerate(state.player_positions(slot)):
+        if path_index in seen:
+            continue
+        if path_index == -1:
+            if dice == 6:
+                moves.append(piece_id)
+        elif path_index + dice <= LAST_INDEX and not state.is_finished(slot, piece_id):
+            moves.append(piece_id)
+        seen.append(path_index)
+    return moves
+
+
+def _heuristic_scores(gm, slot, dice, moves):
+    """Điểm HardBot bước 1-6 của từng nước (bảng tính sẵn của ai.hard_bot, bỏ bản đồ nguy hiểm cho nhanh)."""
+    state = gm.state
+    board_id = gm.player_map.get(slot, slot)
+    static, dest_rings, kickable = STATIC_SCORE[board_id], DEST_RING[board_id], KICKABLE[board_id]
+    occupancy = gm.occupancy
+    opponents = 0  # bitboard các ô có quân đối thủ
+    for other in range(state.num_players):
+        if other != slot:
+            opponents |= occupancy.occupied[other]
+    scores = []
+    for piece_id in moves:
+        k = (state.get_index(slot, piece_id) + 1) * DICE_SLOTS + dice
+        score = static[k]
+        if kickable[k] and opponents >> dest_rings[k] & 1:
+            score += 500 * occupancy.opponents_at(dest_rings[k], slot)
+        scores.append(score)
+    return scores
+
+
+def _playout_move(gm, slot, dice, moves, rng):
+    """Chọn nước trong playout: nước có điểm HardBot cao nhất, thỉnh thoảng ngẫu nhiên."""
+    if len(moves) == 1 or rng.random() < PLAYOUT_EPSILON:
+        return rng.choice(moves)
+    scores = _heuristic_scores(gm, slot, dice, moves)
+    return moves[scores.index(max(scores))]
+
+
+def _ucb_select(gm, node, slot, dice, moves, exploration):
+    """
+    Chọn nhánh: quân chưa thử có điểm HardBot cao nhất trước, sau đó theo UCB1 cộng
+    progressive bias PRIOR_WEIGHT * prior / (1 + visits) (prior = điểm HardBot chuẩn hoá về [0, 1]).
+    """
+    scores = _heuristic_scores(gm, slot, dice, moves)
+    top = max(scores) or 1
+    untried = [(score, move) for score, move in zip(scores, moves) if move not in node.children]
+    if untried:
+        return max(untried)[1], True
+    log_n = math.log(node.visits)
+    best_move, best_value = moves[0], -1.0
+    for score, move in zip(scores, moves):
+        child = node.children[move]
+        value = (child.wins / child.visits + exploration * math.sqrt(log_n / child.visits)
+                 + PRIOR_WEIGHT * score / top / (1 + child.visits))
+        if value > best_value:
+            best_move, best_value = move, value
+    return best_move, False
+
+
+def _root_stats(root):
+    return {move: (child.visits, child.wins) for move, child in root.children.items() if move is not None}
+
+
+def run_search(gm, deadline, rng, exploration=EXPLORATION, max_iterations=None, should_stop=None, report=None):
+    """
+    Chạy UCT từ gm.state (xúc xắc của lượt hiện tại đã biết) tới hạn chót deadline (time.monotonic()).
+    gm.state được khôi phục nguyên vẹn sau mỗi lần duyệt. Trả về (thống kê gốc, số lần duyệt)
+    với thống kê gốc = {piece_id: (visits, wins)}.
+    should_stop(): dừng sớm khi trả về True; report(thống kê gốc) được gọi sau mỗi REPORT_INTERVAL lần duyệt.
+    """
+    state = gm.state
+    num_players = state.num_players
+    root = _Node()
+    iterations = 0
+    while time.monotonic() < deadline and (max_iterations is None or iterations < max_iterations):
+        if should_stop is not None and should_stop():
+            break
+        node = root
+        path = []  # (nút, người đi nước dẫn vào nút)
+        records = []
+        expanded = False
+
+        # 1-2. Chọn nhánh trong cây + mở rộng một nút
+        while state.winner is None and not expanded:
+            if state.dice_value is None:
+                state.dice_value = rng.randint(1, 6)
+            slot = state.turn
+            moves = _legal_moves(state, slot, state.dice_value)
+            if not moves:
+                move, expanded = None, None not in node.children
+                records.append(gm.apply_pass())
+            else:
+                move, expanded = _ucb_select(gm, node, slot, state.dice_value, moves, exploration)
+                records.append(gm.apply_move(slot, move))
+            child = node.children.get(move)
+            if child is None:
+                child = node.children[move] = _Node()
+            path.append((child, slot))
+            node = child
+
+        # 3. Playout tới hết ván
+        plies = 0
+        while state.winner is None and plies < MAX_PLAYOUT_PLIES:
+            if state.dice_value is None:
+                state.dice_value = rng.randint(1, 6)
+            slot = state.turn
+            moves = _legal_moves(state, slot, state.dice_value)
+            if moves:
+                records.append(gm.apply_move(slot, _playout_move(gm, slot, state.dice_value, moves, rng)))
+            else:
+                records.append(gm.apply_pass())
+            plies += 1
+
+        # 4. Cập nhật ngược (ván chưa xong: chia đều)
+        winner = state.winner
+        root.visits += 1
+        for child, mover in path:
+            child.visits += 1
+            if winner is None:
+                child.wins += 1.0 / num_players
+            elif winner == mover:
+                child.wins += 1.0
+
+        for record in reversed(records):
+            gm.undo_move(record)
+        iterations += 1
+        if report is not None and iterations % REPORT_INTERVAL == 0:
+            report(_root_stats(root))
+
+    return _root_stats(root), iterations
+
+
+def _worker_search(task):
+    """Chạy trong tiến trình con. task = (state_bytes, seed, deadline, exploration)."""
+    state_bytes, seed, deadline, exploration = task
+    state = GameState.from_bytes(state_bytes)
+    gm = _engine(state.num_players)
+    gm.restore_state(state)
+    return run_search(gm, deadline, random.Random(seed), exploration)
+
+
+def _init_worker():
+    logging.getLogger().setLevel(logging.WARNING)
+
+
+def _warm_worker(num_players):
+    """Chạy trong tiến trình con mới: import engine sẵn để lần tìm kiếm đầu không tốn thời gian khởi động."""
+    _engine(num_players)
+
+
+def set_in_process(flag):
+    """Buộc mọi tìm kiếm / playout chạy ngay trong tiến trình hiện tại (gọi trong initializer của pool khác)."""
+    global _IN_PROCESS
+    _IN_PROCESS = flag
+
+
+def use_pool(workers):
+    return workers > 1 and not _IN_PROCESS
+
+
+def get_pool(workers):
+    """
+    Pool tiến trình dùng chung cho mọi MCTSBot, tạo một lần và giữ lại giữa các nước đi.
+    Tiến trình con khởi động bằng 'spawn': không fork tiến trình có luồng UI / luồng lưu đang chạy.
+    """
+    global _POOL, _POOL_WORKERS
+    if _POOL is None or _POOL_WORKERS != workers:
+        shutdown_pool()
+        _POOL = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                    initializer=_init_worker)
+        _POOL_WORKERS = workers
+    return _POOL
+
+
+def warm_pool(workers, num_players):
+    """Khởi động sẵn các tiến trình con của pool (spawn mất vài trăm ms mỗi tiến trình)."""
+    try:
+        pool = get_pool(workers)
+        for _ in range(workers):
+            pool.submit(_warm_worker, num_players)
+    except (BrokenProcessPool, OSError) as e:
+        logging.warning(f"Không khởi động được pool MCTS ({e}).")
+        shutdown_pool()
+
+
+def shutdown_pool():
+    global _POOL, _POOL_WORKERS
+    if _POOL is not None:
+        _POOL.shutdown(wait=False, cancel_futures=True)
+    _POOL = None
+    _POOL_WORKERS = 0
+
+
+class MCTSBot(AnytimeBot):
+    """
+    Bot MCTS dùng mọi lõi CPU: mỗi tiến trình một cây độc lập, gộp thống kê ở gốc.
+    workers=None dùng os.cpu_count(); workers=1 tìm kiếm ngay trong tiến trình hiện tại.
+    max_iterations: giới hạn số lần duyệt (chỉ khi tìm trong tiến trình, cho kết quả tái lập được).
+    best_move() cập nhật theo thống kê gốc: định kỳ khi tìm trong tiến trình, mỗi khi một
+    tiến trình con trả kết quả khi dùng pool.
+    """
+    display_name = "Bot MCTS"
+
+    def __init__(self, player_id, game_manager, time_budget=1.0, workers=None, exploration=EXPLORATION,
+                 max_iterations=None):
+        self.player_id = player_id
+        self.gm = game_manager
+        self.time_budget = time_budget
+        self.workers = workers or os.cpu_count() or 1
+        self.exploration = exploration
+        self.max_iterations = max_iterations
+        self.last_iterations = 0
+        self.last_stats = {}
+        self.tablebase = tablebase.get_default()
+        if use_pool(self.workers) and self.max_iterations is None:
+            warm_pool(self.workers, game_manager.num_players)
+
+    def search(self, deadline):
+        """
+        Tìm nước đi cho gm.state hiện tại (lượt của bot, xúc xắc đã gieo) tới deadline
+        (time.perf_counter()). Trả về piece_id.
+        """
+        if deadline is None:
+            deadline = time.perf_counter() + (self.time_budget if self.time_budget is not None else math.inf)
+        # Tiến trình con so hạn chót bằng time.monotonic() (đồng hồ chung của cả máy)
+        stats, iterations = self._collect(time.monotonic() + (deadline - time.perf_counter()))
+        self.last_stats = stats
+        self.last_iterations = iterations
+        if not stats:  # bị dừng trước khi kịp duyệt
+            return _legal_moves(self.gm.state, self.player_id, self.gm.dice_value)[0]
+        return max(stats, key=lambda move: (stats[move][0], stats[move][1]))
+
+    def _collect(self, deadline):
+        if use_pool(self.workers) and self.max_iterations is None:
+            state_bytes = self.gm.state.to_bytes()
+            base_seed = self.gm.rng.getrandbits(32)
+            tasks = [(state_bytes, base_seed + i, deadline - RESULT_MARGIN, self.exploration)
+                     for i in range(self.workers)]
+            try:
+                pool = get_pool(self.workers)
+                pending = {pool.submit(_worker_search, task) for task in tasks}
+                results = []
+                while pending and not self.out_of_time(None):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    done, pending = wait(pending, timeout=min(remaining, POLL_INTERVAL),
+                                         return_when=FIRST_COMPLETED)
+                    if done:
+                        # Tiến trình con nhận việc sau hạn chót của nó trả về 0 lần duyệt: không tính
+                        results.extend(result for result in (future.result() for future in done) if result[1])
+                        self._report(self._merge(results)[0])
+                for future in pending:  # tiến trình con tự dừng ở hạn chót của nó, kết quả bỏ đi
+                    future.cancel()
+                if results or self.out_of_time(None):
+                    return self._merge(results)
+                # Hết giờ mà chưa tiến trình con nào trả kết quả (pool còn đang khởi động): tìm nhanh tại chỗ
+                logging.warning("Pool MCTS chưa trả kết quả trước hạn chót, tìm kiếm trong tiến trình hiện tại.")
+                deadline = max(deadline, time.monotonic() + FALLBACK_TIME)
+            except (BrokenProcessPool, OSError) as e:
+                logging.warning(f"Pool MCTS lỗi ({e}), tìm kiếm trong tiến trình hiện tại.")
+                shutdown_pool()
+        return run_search(self.gm, deadline, random.Random(self.gm.rng.getrandbits(32)), self.exploration,
+                          max_iterations=self.max_iterations, should_stop=lambda: self.out_of_time(None),
+                          report=self._report)
+
+    def _report(self, stats):
+        if stats:
+            self._best = max(stats, key=lambda move: (stats[move][0], stats[move][1]))
+
+    @staticmethod
+    def _merge(results):
+        merged = {}
+        total_iterations = 0
+        for stats, iterations in results:
+            total_iterations += iterations
+            for move, (visits, wins) in stats.items():
+                old_visits, old_wins = merged.get(move, (0, 0.0))
+                merged[move] = (old_visits + visits, old_wins + wins)
+        return merged, total_iterations
+
+    def _decide(self, dice_value, movable_pieces, deadline):
+        """
+        Chọn nước đi bằng MCTS tới deadline (choose_move gieo xúc xắc trước rồi gọi decide).
+        """
+        if len(_legal_moves(self.gm.state, self.player_id, dice_value)) == 1:
+            return movable_pieces[0].id  # mọi quân đi được đều đứng chung một ô
+        # Thế đua về đích (không còn chạm được đối thủ): tra tablebase thay cho tìm kiếm
+        if self.tablebase is not None:
+            piece_id = self.tablebase.best_move(self.gm, self.player_id, dice_value)
+            if piece_id is not None:
+                logging.info(f"Bot MCTS (Người {self.player_id + 1}) đua về đích, đi quân {piece_id + 1} theo tablebase.")
+                return piece_id
+
+        start = time.perf_counter()
+        piece_id = self.search(deadline)
+        visits, wins = self.last_stats.get(piece_id, (0, 0.0))
+        logging.info(f"Bot MCTS chọn quân {piece_id + 1} ({self.last_iterations} playout, "
+                     f"thắng {wins / max(visits, 1):.2f}, {time.perf_counter() - start:.3f}s)")
+        return piece_id
@@ -0,0 +1,221 @@
+# ai/selfplay.py
+"""
+Pipeline self-play offline cho hàm đánh giá học máy (ai.learned_eval, ai.learned_bot).
+
+1. Sinh dữ liệu (đa tiến trình, engine headless):
+       python -m ai.selfplay generate --games 2000 --players 2 3 4 --out data/selfplay
+   Mỗi nước đi của mọi ghế ghi một bản ghi (ai.features của nước đã chọn, người đi có thắng ván không).
+   Nước đi do chính sách --policy chọn ('bot_hard' hoặc 'bot_learned' để lặp lại vòng học),
+   kèm --epsilon nước ngẫu nhiên để dữ liệu phủ cả nước đi kém. Kết quả về tiến trình chính
+   theo từng nhóm ván và được ghi dần thành các shard nén shard_00000.npz, shard_00001.npz...
+   (mảng X float32, y int8, num_players int8, game int64 = seed của ván).
+
+2. Huấn luyện (NumPy, CPU):
+       python -m ai.selfplay train --data data/selfplay --model mlp --out data/learned_eval.npz
+   Tách một phần ván (theo seed) làm tập kiểm tra, in log-loss / độ chính xác trước khi ghi mô hình.
+"""
+import argparse
+import glob
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from ai.features import NUM_FEATURES, FEATURE_NAMES, move_features
+from ai.hard_bot import HardBot
+from ai.learned_bot import LearnedBot
+from ai.learned_eval import LearnedEvaluator, DATA_DIR, DEFAULT_PATH as MODEL_PATH
+from core.canonical import distinct_moves
+
+DEFAULT_DIR = os.path.join(DATA_DIR, 'selfplay')
+POLICIES = ('bot_hard', 'bot_learned')
+GAMES_PER_TASK = 10
+
+
+def _init_worker():
+    logging.getLogger().setLevel(logging.WARNING)
+
+
+def play_selfplay_game(num_players, seed, policy='bot_hard', epsilon=0.1, max_plies=5000):
+    """
+    Chơi một ván headless. Trả về (danh sách vector đặc trưng, danh sách ghế đã đi, người thắng)
+    hoặc None nếu ván không kết thúc trong max_plies lần gieo.
+    """
+    from core.game_manager import GameManager  # tránh import vòng (GameManager dùng ai.*)
+
+    gm = GameManager(num_players=num_players, seed=seed)
+    bot_class = LearnedBot if policy == 'bot_learned' else HardBot
+    bots = [bot_class(slot, gm) for slot in range(num_players)]
+    features, movers = [], []
+    for _ in range(max_plies):
+        if gm.winner is not None:
+            return features, movers, gm.winner
+        slot = gm.turn
+        dice = gm.rng.roll()
+        gm.dice_value = dice
+        moves = distinct_moves(gm.state, slot, [piece.id for piece in gm.get_movable_pieces(slot, dice)])
+        if not moves:
+            gm.apply_pass()
+            continue
+        if len(moves) > 1 and gm.rng.random() < epsilon:
+            piece_id = gm.rng.choice(moves)
+        else:
+            piece_id = bots[slot].decide(gm.state, dice)
+        features.append(move_features(gm, slot, piece_id))
+        movers.append(slot)
+        gm.apply_move(slot, piece_id)
+    return None
+
+
+def _play_task(task):
+    """Một nhóm ván trong tiến trình con. Trả về (X, y, num_players, game, số ván hoàn thành)."""
+    num_players, seeds, policy, epsilon = task
+    rows, labels, games = [], [], []
+    finished = 0
+    for seed in seeds:
+        result = play_selfplay_game(num_players, seed, policy, epsilon)
+        if result is None:
+            continue
+        features, movers, winner = result
+        rows.extend(features)
+        labels.extend(1 if mover == winner else 0 for mover in movers)
+        games.extend([seed] * len(movers))
+        finished += 1
+    X = np.asarray(rows, dtype=np.float32).reshape(-1, NUM_FEATURES)
+    return (X, np.asarray(labels, dtype=np.int8), np.full(len(labels), num_players, dtype=np.int8),
+            np.asarray(games, dtype=np.int64), finished)
+
+
+class ShardWriter:
+    """Gom bản ghi và ghi ra shard nén khi đủ shard_size dòng."""
+
+    def __init__(self, directory, shard_size=200000):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.shard_size = shard_size
+        self.index = len(glob.glob(os.path.join(directory, 'shard_*.npz')))  # ghi tiếp, không đè shard cũ
+        self._parts = []
+        self._rows = 0
+        self.written = 0
+
+    def add(self, X, y, players, games):
+        if len(y) == 0:
+            return
+        self._parts.append((X, y, players, games))
+        self._rows += len(y)
+        if self._rows >= self.shard_size:
+            self.flush()
+
+    def flush(self):
+        if not self._parts:
+            return
+        X = np.concatenate([p[0] for p in self._parts])
+        y = np.concatenate([p[1] for p in self._parts])
+        players = np.concatenate([p[2] for p in self._parts])
+        games = np.concatenate([p[3] for p in self._parts])
+        path = os.path.join(self.directory, f'shard_{self.index:05d}.npz')
+        np.savez_compressed(path, X=X, y=y, num_players=players, game=games, feature_names=np.array(FEATURE_NAMES))
+        logging.info(f"Đã ghi {path} ({len(y)} bản ghi)")
+        self.index += 1
+        self.written += len(y)
+        self._parts = []
+        self._rows = 0
+
+
+def generate(out=DEFAULT_DIR, games=1000, player_counts=(2, 3, 4), policy='bot_hard', epsilon=0.1,
+             workers=None, seed=0, shard_size=200000):
+    """Sinh games ván cho mỗi số người chơi, ghi shard vào out. Trả về số bản ghi đã ghi."""
+    if policy not in POLICIES:
+        raise ValueError(f"policy phải thuộc {POLICIES}")
+    tasks = []
+    game_no = 0
+    for num_players in player_counts:
+        for start in range(0, games, GAMES_PER_TASK):
+            count = min(GAMES_PER_TASK, games - start)
+            tasks.append((num_players, range(seed + game_no, seed + game_no + count), policy, epsilon))
+            game_no += count
+    workers = workers or os.cpu_count() or 1
+    writer = ShardWriter(out, shard_size)
+    finished = 0
+    start_time = time.perf_counter()
+    logging.info(f"Self-play: {game_no} ván trên {workers} tiến trình, chính sách {policy} (epsilon {epsilon})")
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        for X, y, players, games_played, done in pool.map(_play_task, tasks):
+            writer.add(X, y, players, games_played)
+            finished += done
+    writer.flush()
+    logging.info(f"Xong {finished}/{game_no} ván, {writer.written} bản ghi trong {time.perf_counter() - start_time:.1f}s")
+    return writer.written
+
+
+def load_shards(directory=DEFAULT_DIR):
+    """Nối mọi shard trong thư mục. Trả về (X, y, num_players, game)."""
+    paths = sorted(glob.glob(os.path.join(directory, 'shard_*.npz')))
+    if not paths:
+        raise FileNotFoundError(f"Không có shard nào trong {directory}")
+    parts = []
+    for path in paths:
+        with np.load(path) as data:
+            if tuple(data['feature_names']) != FEATURE_NAMES:
+                logging.warning(f"Bỏ qua {path}: bộ đặc trưng khác phiên bản hiện tại")
+                continue
+            parts.append((data['X'], data['y'], data['num_players'], data['game']))
+    return tuple(np.concatenate([p[i] for p in parts]) for i in range(4))
+
+
+def train(data=DEFAULT_DIR, out=MODEL_PATH, kind='linear', hidden=16, epochs=30, validation=0.1, seed=0):
+    """Huấn luyện trên các shard, in log-loss / độ chính xác trên tập kiểm tra rồi ghi mô hình."""
+    X, y, _players, games = load_shards(data)
+    # Tách theo ván (mọi nước của một ván cùng nằm một phía) để tập kiểm tra không lẫn ván đã học
+    is_val = (games * 2654435761 + seed) % 1000 < validation * 1000
+    model = LearnedEvaluator.fit(X[~is_val], y[~is_val], kind=kind, hidden=hidden, epochs=epochs, seed=seed)
+    if is_val.any():
+        X_val, y_val = X[is_val], y[is_val].astype(np.float64)
+        accuracy = float(np.mean((model.predict(X_val) >= 0.5) == (y_val == 1)))
+        rate = float(np.clip(y[~is_val].mean(), 1e-7, 1 - 1e-7))  # chỉ đoán theo tỉ lệ thắng chung
+        baseline = float(-np.mean(y_val * np.log(rate) + (1 - y_val) * np.log(1 - rate)))
+        logging.info(f"Tập kiểm tra ({len(y_val)} bản ghi): log-loss {model.log_loss(X_val, y_val):.4f} "
+                     f"(đoán theo tỉ lệ thắng chung: {baseline:.4f}), độ chính xác {accuracy:.3f}")
+    model.save(out)
+    logging.info(f"Đã ghi mô hình {kind} vào {out}")
+    for name, weight in model.describe().items():
+        logging.info(f"  {name:<18} {weight:+.3f}")
+    return model
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Self-play và huấn luyện hàm đánh giá học máy cho bot Ludo.")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    gen = sub.add_parser('generate', help="Sinh dữ liệu self-play thành các shard .npz.")
+    gen.add_argument('--games', type=int, default=1000, help="Số ván cho mỗi số người chơi.")
+    gen.add_argument('--players', nargs='+', type=int, default=[2, 3, 4], choices=[2, 3, 4])
+    gen.add_argument('--policy', default='bot_hard', choices=POLICIES)
+    gen.add_argument('--epsilon', type=float, default=0.1, help="Tỉ lệ nước đi ngẫu nhiên.")
+    gen.add_argument('--workers', type=int, default=None, help="Số tiến trình (mặc định: số lõi CPU).")
+    gen.add_argument('--seed', type=int, default=0, help="Seed gốc; ván thứ i dùng seed + i.")
+    gen.add_argument('--shard-size', type=int, default=200000, help="Số bản ghi mỗi shard.")
+    gen.add_argument('--out', default=DEFAULT_DIR, help="Thư mục shard.")
+
+    fit = sub.add_parser('train', help="Huấn luyện mô hình từ các shard.")
+    fit.add_argument('--data', default=DEFAULT_DIR, help="Thư mục shard.")
+    fit.add_argument('--model', default='linear', choices=['linear', 'mlp'])
+    fit.add_argument('--hidden', type=int, default=16, help="Số nơ-ron lớp ẩn (mlp).")
+    fit.add_argument('--epochs', type=int, default=30)
+    fit.add_argument('--validation', type=float, default=0.1, help="Tỉ lệ dữ liệu dùng để kiểm tra.")
+    fit.add_argument('--seed', type=int, default=0)
+    fit.add_argument('--out', default=MODEL_PATH, help="File mô hình.")
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s')
+    if args.command == 'generate':
+        generate(args.out, args.games, args.players, args.policy, args.epsilon, args.workers, args.seed,
+                 args.shard_size)
+    else:
+        train(args.data, args.out, args.model, args.hidden, args.epochs, args.validation, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+# ai/tablebase.py
+"""
+Bảng tra cứu tàn cuộc "đua về đích" (race tablebase).
+
+Khi quân của một người chơi không còn chạm được quân đối thủ nào (mọi ô vòng ngoài mình còn
+đi qua không trùng ô nào đối thủ còn đi qua, ví dụ khi tất cả đã vào đường về đích), ván cờ của
+người đó là một bài toán một người chơi: về đích hết 4 quân với số lượt kỳ vọng nhỏ nhất.
+Bài toán này giải chính xác bằng quy hoạch động trên mặt xúc xắc.
+
+Trạng thái = tập bội 4 vị trí (-1..56) đã sắp xếp, đánh số bằng hệ số tổ hợp:
+c_i = vị trí_i + 1 + i (tăng ngặt trong 0..60), index = C(c0,1) + C(c1,2) + C(c2,3) + C(c3,4).
+Tổng cộng C(61, 4) = 521.855 trạng thái.
+
+Tạo file (offline, khoảng một phút):  python -m ai.tablebase
+Bot mở file bằng mmap lúc khởi tạo; mỗi lần tra cứu chỉ là một phép đọc mảng.
+
+Định dạng file: header (MAGIC, NUM_STATES) rồi NUM_STATES float32 (số lượt kỳ vọng, tính cả
+lượt hiện tại) rồi NUM_STATES * 6 byte nước đi tối ưu (vị trí quân cần đi + 1, NO_MOVE nếu không đi được).
+"""
+import argparse
+import logging
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from itertools import combinations
+from math import comb
+
+from core.board import LAST_INDEX, HOME_LANE_START
+from core.rules import RING_CELL
+
+MAGIC = b'LUDORACE'
+HEADER = struct.Struct('<8sI')
+NUM_VALUES = LAST_INDEX + 2           # vị trí -1..56
+NUM_STATES = comb(NUM_VALUES + 3, 4)  # 521.855
+NO_MOVE = 0xFF
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')  # theo thư mục gói, không theo thư mục đang chạy
+DEFAULT_PATH = os.path.join(DATA_DIR, 'race_tablebase.bin')
+
+# BINOM[k][c] = C(c, k) cho k = 1..4
+BINOM = [tuple(comb(c, k) for c in range(NUM_VALUES + 4)) for k in range(5)]
+
+# REACH_MASK[board_id][path_index + 1]: bitmask các ô vòng ngoài quân còn có thể đi qua
+# (từ vị trí hiện tại tới hết vòng ngoài; quân trong chuồng tính từ ô xuất phát)
+REACH_MASK = []
+for _board_id in range(len(RING_CELL)):
+    _masks = [0] * NUM_VALUES
+    for _index in range(HOME_LANE_START - 1, -1, -1):
+        _masks[_index + 1] = _masks[_index + 2] | (1 << RING_CELL[_board_id][_index])
+    _masks[0] = _masks[1]
+    REACH_MASK.append(tuple(_masks))
+
+
+def state_index(positions):
+    """Index của tập bội 4 vị trí (thứ tự bất kỳ)."""
+    a, b, c, d = sorted(positions)
+    return BINOM[1][a + 1] + BINOM[2][b + 2] + BINOM[3][c + 3] + BINOM[4][d + 4]
+
+
+def is_race(state, player_map, slot):
+    """True nếu không quân nào của slot còn có thể gặp quân đối thủ trên vòng ngoài."""
+    board_id = player_map.get(slot, slot)
+    mine = 0
+    for path_index in state.player_positions(slot):
+        mine |= REACH_MASK[board_id][path_index + 1]
+    if not mine:
+        return True
+    for other in range(state.num_players):
+        if other == slot:
+            continue
+        other_board = player_map.get(other, other)
+        for path_index in state.player_positions(other):
+            if REACH_MASK[other_board][path_index + 1] & mine:
+                return False
+    return True
+
+
+def _successors(positions, dice):
+    """Các nước đi khác nhau (vị trí nguồn, vị trí đích) của tập bội positions với dice."""
+    seen = set()
+    for p in positions:
+        if p in seen or p == LAST_INDEX:
+            continue
+        seen.add(p)
+        if p == -1:
+            if dice == 6:
+                yield p, 0
+        elif p + dice <= LAST_INDEX:
+            yield p, p + dice
+
+
+def generate(path=DEFAULT_PATH):
+    """
+    Giải toàn bộ trạng thái và ghi file. Với V(S) = số lượt kỳ vọng còn lại sau lượt đang dở:
+    gieo d, đi nước được thưởng lượt (6 hoặc về đích) tốn V(S'), nước thường tốn 1 + V(S').
+    Gọi A = tổng chi phí tốt nhất của các mặt có nước đi, m / k = số mặt không đi được
+    (khác 6 / bằng 6): 6V = A + m(1 + V) + kV  =>  V = (A + m) / (6 - m - k).
+    Mọi nước đi đều tăng tổng vị trí nên duyệt theo tổng giảm dần là đủ.
+    """
+    start = time.perf_counter()
+    states = [tuple(c - i - 1 for i, c in enumerate(combo))
+              for combo in combinations(range(NUM_VALUES + 3), 4)]
+    states.sort(key=sum, reverse=True)
+
+    values = array('f', [0.0]) * NUM_STATES
+    moves = bytearray([NO_MOVE]) * (NUM_STATES * 6)
+    done = (LAST_INDEX,) * 4
+    for positions in states:
+        index = state_index(positions)
+        if positions == done:
+            continue
+        total, m, k = 0.0, 0, 0
+        for dice in range(1, 7):
+            best_cost, best_source = None, NO_MOVE
+            for source, target in _successors(positions, dice):
+                after = list(positions)
+                after[after.index(source)] = target
+                if tuple(after) == done:
+                    cost = 0.0
+                elif dice == 6 or target == LAST_INDEX:
+                    cost = values[state_index(after)] - 1.0
+                else:
+                    cost = values[state_index(after)]
+                if best_cost is None or cost < best_cost:
+                    best_cost, best_source = cost, source + 1
+            if best_cost is None:
+                if dice == 6:
+                    k += 1
+                else:
+                    m += 1
+            else:
+                total += best_cost
+                moves[index * 6 + dice - 1] = best_source
+        values[index] = 1.0 + (total + m) / (6 - m - k)
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if sys.byteorder != 'little':
+        values.byteswap()
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, NUM_STATES))
+        f.write(values.tobytes())
+        f.write(moves)
+    logging.info(f"Đã ghi tablebase {NUM_STATES} trạng thái vào {path} "
+                 f"({time.perf_counter() - start:.1f}s)")
+
+
+class RaceTablebase:
+    """File tablebase đã mmap (chỉ đọc)."""
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, num_states = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or num_states != NUM_STATES:
+            self._mmap.close()
+            raise ValueError(f"File tablebase không hợp lệ: {path}")
+        view = memoryview(self._mmap)
+        values_end = HEADER.size + 4 * NUM_STATES
+        if sys.byteorder == 'little':
+            self.values = view[HEADER.size:values_end].cast('f')
+        else:
+            swapped = array('f', view[HEADER.size:values_end].tobytes())
+            swapped.byteswap()
+            self.values = swapped
+        self.moves = view[values_end:values_end + 6 * NUM_STATES]
+
+    def expected_turns(self, positions):
+        """Số lượt kỳ vọng (tính cả lượt hiện tại) để 4 quân về đích khi đi tối ưu."""
+        return self.values[state_index(positions)]
+
+    def best_source(self, positions, dice):
+        """Vị trí của quân nên đi với mặt dice, hoặc None nếu không có nước đi."""
+        source = self.moves[state_index(positions) * 6 + dice - 1]
+        return None if source == NO_MOVE else source - 1
+
+    def best_move(self, gm, slot, dice):
+        """
+        piece_id nên đi nếu slot đang ở thế đua về đích, ngược lại None
+        (bot dùng heuristic / tìm kiếm như bình thường).
+        """
+        state = gm.state
+        if not is_race(state, gm.player_map, slot):
+            return None
+        source = self.best_source(state.player_positions(slot), dice)
+        if source is None:
+            return None
+        for piece_id, path_index in enumerate(state.player_positions(slot)):
+            if path_index == source and not state.is_finished(slot, piece_id):
+                return piece_id
+        return None
+
+
+_DEFAULT = None
+_LOAD_FAILED = False
+
+
+def get_default():
+    """Tablebase dùng chung (mmap một lần cho cả tiến trình), None nếu chưa tạo file."""
+    global _DEFAULT, _LOAD_FAILED
+    if _DEFAULT is None and not _LOAD_FAILED:
+        try:
+            _DEFAULT = RaceTablebase(DEFAULT_PATH)
+        except (OSError, ValueError) as e:
+            _LOAD_FAILED = True
+            logging.info(f"Không dùng tablebase đua về đích ({e}). Tạo bằng: python -m ai.tablebase")
+    return _DEFAULT
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tạo tablebase đua về đích cho bot Ludo.")
+    parser.add_argument('--out', default=DEFAULT_PATH, help="File đầu ra.")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s')
+    generate(args.out)
+
+
+if __name__ == "__main__":
+    main()
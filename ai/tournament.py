@@ -0,0 +1,197 @@
+# ai/tournament.py
+"""
+Giải đấu bot chạy headless trên nhiều tiến trình.
+
+Chạy:  python -m ai.tournament --bots bot_easy bot_hard bot_expert --players 2 3 4 --games 200
+
+Mỗi cách xếp ghế (mọi tổ hợp bot cho 2/3/4 ghế) được chơi --games ván. Mỗi ván có
+seed riêng (seed gốc + số thứ tự ván) nên có thể chơi lại đúng ván đó. Bot tìm kiếm chơi với ngân
+sách cố định (FIXED_BUDGETS: độ sâu / số lần duyệt thay cho thời gian) nên cùng --seed cho cùng
+kết quả trên mọi máy. Kết quả gồm tỉ lệ thắng theo bot và theo ghế kèm khoảng tin cậy Wilson 95%,
+cùng tốc độ games/sec.
+
+Thống kê theo bot tính theo ván: mỗi ván có bot đó và ít nhất một bot khác là một lần thử
+(thắng nếu một ghế của bot thắng), ván toàn một loại bot (mirror) bị bỏ qua; khoảng Wilson nhờ vậy
+tính trên các ván độc lập thay vì các ghế cùng ván.
+"""
+import argparse
+import itertools
+import json
+import logging
+import math
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+from ai import mcts_bot
+from ai.expectimax_bot import ExpectimaxBot
+from ai.mcts_bot import MCTSBot
+from core.game_manager import GameManager, BOT_TYPES
+
+Z_95 = 1.96
+DEFAULT_BOTS = ('bot_easy', 'bot_hard')
+# Ngân sách cố định cho bot tìm kiếm trong giải đấu (không phụ thuộc tốc độ máy)
+FIXED_BUDGETS = {ExpectimaxBot: {'time_budget': None, 'max_depth': 2},
+                 MCTSBot: {'time_budget': None, 'workers': 1, 'max_iterations': 200}}
+
+
+def wilson_interval(wins, total, z=Z_95):
+    """Khoảng tin cậy Wilson cho tỉ lệ wins/total."""
+    if total == 0:
+        return (0.0, 0.0)
+    p = wins / total
+    denom = 1 + z * z / total
+    center = (p + z * z / (2 * total)) / denom
+    margin = z * math.sqrt(p * (1 - p) / total + z * z / (4 * total * total)) / denom
+    return (max(0.0, center - margin), min(1.0, center + margin))
+
+
+def _init_worker():
+    # Bot ghi log INFO cho từng nước đi; tắt bớt trong tiến trình con
+    logging.getLogger().setLevel(logging.WARNING)
+    # Mỗi tiến trình đã là một ván: bot MCTS / ước lượng không mở thêm pool lồng nhau
+    mcts_bot.set_in_process(True)
+
+
+def _fix_budget(bot):
+    for bot_class, budget in FIXED_BUDGETS.items():
+        if isinstance(bot, bot_class):
+            for name, value in budget.items():
+                setattr(bot, name, value)
+
+
+def play_game(task):
+    """Chơi một ván (chạy trong tiến trình con). task = (seating, seed, max_plies)."""
+    seating, seed, max_plies = task
+    gm = GameManager(num_players=len(seating), player_types=list(seating), seed=seed)
+    for bot in gm.bots.values():
+        _fix_budget(bot)
+    plies = 0
+    while gm.winner is None and plies < max_plies:
+        gm.run_bot_turn()
+        plies += 1
+    return seating, seed, gm.winner, plies
+
+
+def build_tasks(bots, player_counts, games, seed, max_plies):
+    tasks = []
+    game_no = 0
+    for num_players in player_counts:
+        for seating in itertools.product(bots, repeat=num_players):
+            for _ in range(games):
+                tasks.append((seating, seed + game_no, max_plies))
+                game_no += 1
+    return tasks
+
+
+def run_tournament(bots, player_counts=(2, 3, 4), games=100, workers=None, seed=0, max_plies=5000):
+    """Chạy toàn bộ giải đấu, trả về dict thống kê (xem summarize)."""
+    for bot in bots:
+        if bot not in BOT_TYPES:
+            raise ValueError(f"Bot không hợp lệ: {bot}. Hỗ trợ: {', '.join(BOT_TYPES)}")
+    tasks = build_tasks(bots, player_counts, games, seed, max_plies)
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(tasks) // (workers * 8))
+
+    logging.info("Giải đấu: %d ván trên %d tiến trình...", len(tasks), workers)
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        results = list(pool.map(play_game, tasks, chunksize=chunksize))
+    elapsed = time.perf_counter() - start
+    return summarize(results, elapsed)
+
+
+def summarize(results, elapsed):
+    """
+    Gom kết quả: theo bot (mỗi ván không phải mirror là một lần thử của từng bot có mặt) và theo
+    từng cách xếp ghế + ghế.
+    """
+    by_bot = defaultdict(lambda: {'games': 0, 'wins': 0, 'expected': 0.0})
+    mirror = 0
+    by_seating = defaultdict(lambda: {'games': 0, 'seat_wins': None, 'unfinished': 0, 'plies': 0})
+    unfinished = 0
+
+    for seating, _seed, winner, plies in results:
+        entry = by_seating[seating]
+        if entry['seat_wins'] is None:
+            entry['seat_wins'] = [0] * len(seating)
+        entry['games'] += 1
+        entry['plies'] += plies
+        if winner is None:
+            entry['unfinished'] += 1
+            unfinished += 1
+            continue
+        entry['seat_wins'][winner] += 1
+        if len(set(seating)) == 1:
+            mirror += 1  # bot luôn "thắng" chính nó: không có thông tin so sánh
+            continue
+        # Một ván là một lần thử của mỗi bot có mặt; kỳ vọng nếu ngang sức = số ghế / num_players
+        for bot in set(seating):
+            by_bot[bot]['games'] += 1
+            by_bot[bot]['expected'] += seating.count(bot) / len(seating)
+            if seating[winner] == bot:
+                by_bot[bot]['wins'] += 1
+
+    report = {'games': len(results), 'unfinished': unfinished, 'mirror_games': mirror, 'elapsed_sec': elapsed,
+              'games_per_sec': len(results) / elapsed if elapsed > 0 else 0.0,
+              'bots': {}, 'seatings': []}
+    for bot, stats in sorted(by_bot.items()):
+        low, high = wilson_interval(stats['wins'], stats['games'])
+        report['bots'][bot] = {'games': stats['games'], 'wins': stats['wins'],
+                               'win_rate': stats['wins'] / stats['games'] if stats['games'] else 0.0,
+                               'ci95': [low, high],
+                               'expected_if_equal': stats['expected'] / stats['games'] if stats['games'] else 0.0}
+    for seating, entry in sorted(by_seating.items(), key=lambda kv: (len(kv[0]), kv[0])):
+        finished = entry['games'] - entry['unfinished']
+        seats = []
+        for seat, wins in enumerate(entry['seat_wins']):
+            low, high = wilson_interval(wins, finished)
+            seats.append({'seat': seat, 'bot': seating[seat], 'wins': wins,
+                          'win_rate': wins / finished if finished else 0.0, 'ci95': [low, high]})
+        report['seatings'].append({'seating': list(seating), 'games': entry['games'],
+                                   'unfinished': entry['unfinished'],
+                                   'avg_plies': entry['plies'] / entry['games'], 'seats': seats})
+    return report
+
+
+def format_report(report):
+    lines = [f"Tổng: {report['games']} ván ({report['unfinished']} ván chưa xong) trong "
+             f"{report['elapsed_sec']:.1f}s = {report['games_per_sec']:.1f} games/sec", "",
+             f"Theo bot (theo ván, bỏ {report['mirror_games']} ván mirror):"]
+    for bot, s in report['bots'].items():
+        lines.append(f"  {bot:<10} thắng {s['wins']}/{s['games']} = {s['win_rate']:.3f} "
+                     f"[{s['ci95'][0]:.3f}, {s['ci95'][1]:.3f}] (ngang sức: {s['expected_if_equal']:.3f})")
+    lines.append("")
+    lines.append("Theo cách xếp ghế:")
+    for entry in report['seatings']:
+        seats = "  ".join(f"P{s['seat'] + 1}={s['win_rate']:.3f}[{s['ci95'][0]:.3f},{s['ci95'][1]:.3f}]"
+                          for s in entry['seats'])
+        lines.append(f"  {' vs '.join(entry['seating']):<45} {entry['games']:>5} ván, "
+                     f"TB {entry['avg_plies']:.0f} lần gieo  {seats}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Giải đấu bot Ludo chạy headless trên nhiều tiến trình.")
+    parser.add_argument('--bots', nargs='+', default=list(DEFAULT_BOTS), choices=BOT_TYPES,
+                        help="Các loại bot tham gia (mặc định: các bot nhanh).")
+    parser.add_argument('--players', nargs='+', type=int, default=[2, 3, 4], choices=[2, 3, 4],
+                        help="Số người chơi mỗi ván.")
+    parser.add_argument('--games', type=int, default=100, help="Số ván cho mỗi cách xếp ghế.")
+    parser.add_argument('--workers', type=int, default=None, help="Số tiến trình (mặc định: số lõi CPU).")
+    parser.add_argument('--seed', type=int, default=0, help="Seed gốc; ván thứ i dùng seed + i.")
+    parser.add_argument('--max-plies', type=int, default=5000, help="Giới hạn số lần gieo mỗi ván.")
+    parser.add_argument('--json', default=None, help="Ghi báo cáo JSON ra file này.")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s')
+    report = run_tournament(args.bots, args.players, args.games, args.workers, args.seed, args.max_plies)
+    print(format_report(report))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,423 @@
+# ai/winprob.py
+"""
+Ước lượng xác suất thắng của từng ghế cho một thế cờ bất kỳ (GameState hoặc GameManager đang chơi).
+
+- Tàn cuộc mọi ghế đều đã "đua về đích" (ai.tablebase.is_race): tính chính xác từ RaceTablebase.
+  Mỗi ghế đi theo nước tối ưu tra trong tablebase (như bot), số lượt cần để về đích hết là một phân
+  phối (quy hoạch động trên các trạng thái đạt được, xem _TurnDistribution); các ghế độc lập nên
+  ghép theo thứ tự lượt là ra xác suất về đích đầu tiên. Chỉ kết quả này (và ván đã có người thắng)
+  mang exact=True; giải không kịp hạn chót, không có tablebase / NumPy hay phần đuôi bị cắt sau
+  MAX_TURNS lượt quá EXACT_TOLERANCE thì exact=False.
+- Ngược lại: Monte Carlo. Playout giống MCTSBot (heuristic HardBot + một phần nước ngẫu nhiên),
+  chạy theo lô ngắn trên pool tiến trình dùng chung với MCTSBot (mcts_bot.get_pool, giữ lại giữa
+  các lần gọi). Dừng khi sai số chuẩn lớn nhất trong các ghế <= target_se (sau ít nhất
+  min_rollouts ván) hoặc tới hạn chót; không bao giờ chờ quá hạn chót.
+
+    estimator = WinProbabilityEstimator(time_budget=0.5, target_se=0.01)
+    result = estimator.estimate(gm)          # hoặc estimate(state, player_map)
+    result.probabilities                     # [p_ghế_0, p_ghế_1, ...], tổng = 1
+"""
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+
+try:
+    import numpy as np
+except ImportError:  # không có NumPy: bỏ qua lời giải chính xác, chỉ dùng Monte Carlo
+    np = None
+
+from ai import tablebase
+from ai.mcts_bot import (MAX_PLAYOUT_PLIES, RESULT_MARGIN, _engine, _legal_moves, _playout_move,
+                         get_pool, shutdown_pool, use_pool)
+from core.board import LAST_INDEX
+from core.state import GameState
+
+TARGET_SE = 0.01          # sai số chuẩn mục tiêu của mỗi xác suất
+MIN_ROLLOUTS = 200        # số ván tối thiểu trước khi xét dừng sớm
+BATCH_TIME = 0.05         # giây cho mỗi lô playout trong tiến trình con
+MAX_TURNS = 256           # độ dài phân phối số lượt (phần đuôi còn lại < 1e-9 với thế đua thực tế)
+MAX_RACE_STATES = 20000   # quá số trạng thái này thì bỏ lời giải chính xác, dùng Monte Carlo
+                          # (cũng là trần của memo: mỗi trạng thái một mảng MAX_TURNS float64)
+EXACT_TOLERANCE = 1e-9    # phần xác suất tối đa bị cắt sau MAX_TURNS lượt để vẫn coi là chính xác
+DONE = (LAST_INDEX,) * 4
+
+
+class WinEstimate:
+    """
+    Kết quả ước lượng: probabilities theo ghế, std_errors (0 nếu chính xác), rollouts (số ván
+    Monte Carlo), exact (True chỉ với lời giải tablebase của thế đua hoặc ván đã kết thúc) và elapsed (giây).
+    """
+    __slots__ = ('probabilities', 'std_errors', 'rollouts', 'exact', 'elapsed')
+
+    def __init__(self, probabilities, std_errors, rollouts, exact, elapsed=0.0):
+        self.probabilities = probabilities
+        self.std_errors = std_errors
+        self.rollouts = rollouts
+        self.exact = exact
+        self.elapsed = elapsed
+
+    @property
+    def std_error(self):
+        return max(self.std_errors) if self.std_errors else 0.0
+
+    def __repr__(self):
+        probs = ', '.join(f'{p:.3f}' for p in self.probabilities)
+        if self.exact:
+            source = 'chính xác'
+        elif self.rollouts:
+            source = f'{self.rollouts} playout, se {self.std_error:.4f}'
+        else:
+            source = f'xấp xỉ, sai số <= {self.std_error:.1e}'
+        return f"WinEstimate([{probs}], {source}, {self.elapsed:.3f}s)"
+
+
+# --- Lời giải chính xác cho thế đua về đích ---
+class _TurnDistribution:
+    """
+    H[S][t] = xác suất tập vị trí S về đích hết trong lượt thứ t + 1 (t = 0: lượt đang bắt đầu),
+    khi đi theo nước tối ưu của tablebase. Với mỗi mặt d của lần gieo đầu lượt:
+    không đi được: d = 6 gieo lại (cùng lượt), khác 6 mất lượt (dời H[S] một lượt);
+    đi tới S': về đích hết -> t = 0; 6 hoặc về đích một quân -> H[S'] (cùng lượt); còn lại dời H[S'].
+    Gọi k = 1 nếu mặt 6 không đi được, a = (số mặt khác 6 không đi được) / (6 - k):
+    H[S] = a * dời(H[S]) + B / (6 - k)  =>  H[S] = B / (6 - k) chập với dãy a^j.
+    """
+
+
+    def __init__(self, table, max_turns=MAX_TURNS, max_states=MAX_RACE_STATES):
+        self.table = table
+        self.max_turns = max_turns
+        self.max_states = max_states
+        self.memo = {}
+        self._powers = {}
+
+    def _step(self, positions, dice):
+        """(S' hoặc None nếu không đi được, còn trong lượt này không) theo nước tối ưu của tablebase."""
+        source = self.table.best_source(positions, dice)
+        if source is None:
+            return None, dice == 6
+        target = 0 if source == -1 else source + dice
+        after = list(positions)
+        after[after.index(source)] = target
+        return tuple(sorted(after)), dice == 6 or target == LAST_INDEX
+
+    def solve(self, positions, deadline=None):
+        """
+        Phân phối (mảng NumPy MAX_TURNS phần tử) của positions, None nếu quá max_states trạng thái
+        hoặc quá deadline (time.perf_counter(); các trạng thái đã giải vẫn giữ trong memo).
+        """
+        positions = tuple(sorted(positions))
+        known = self.memo.get(positions)
+        if known is not None:
+            return known
+        # Gom các trạng thái đạt được; mọi nước đi đều tăng tổng vị trí nên giải theo tổng giảm dần
+        pending, stack = set(), [positions]
+        while stack:
+            current = stack.pop()
+            if current in pending or current in self.memo or current == DONE:
+                continue
+            pending.add(current)
+            if len(pending) > self.max_states:
+                return None
+            if deadline is not None and len(pending) % 256 == 0 and time.perf_counter() >= deadline:
+                return None
+            for dice in range(1, 7):
+                after, _ = self._step(current, dice)
+                if after is not None:
+                    stack.append(after)
+        if len(self.memo) + len(pending) > self.max_states:
+            self.memo.clear()
+            return self.solve(positions, deadline)
+        for count, current in enumerate(sorted(pending, key=sum, reverse=True)):
+            if deadline is not None and count % 256 == 255 and time.perf_counter() >= deadline:
+                return None
+            self.memo[current] = self._solve_one(current)
+        return self.memo[positions]
+
+    def _solve_one(self, positions):
+        turns = self.max_turns
+        total = np.zeros(turns)
+        stay = reroll = 0
+        for dice in range(1, 7):
+            after, same_turn = self._step(positions, dice)
+            if after is None:
+                if same_turn:
+                    reroll += 1
+                else:
+                    stay += 1
+            elif after == DONE:
+                total[0] += 1.0
+            elif same_turn:
+                total += self.memo[after]
+            else:
+                total[1:] += self.memo[after][:-1]
+        total /= 6 - reroll
+        if not stay:
+            return total
+        decay = stay / (6 - reroll)
+        powers = self._powers.get(decay)
+        if powers is None:
+            powers = self._powers[decay] = decay ** np.arange(turns)
+        return np.convolve(total, powers)[:turns]
+
+    def after_roll(self, positions, dice, deadline=None):
+        """Phân phối khi lần gieo đầu tiên của lượt hiện tại đã ra dice (None như solve)."""
+        positions = tuple(sorted(positions))
+        after, same_turn = self._step(positions, dice)
+        if after is None:
+            following = self.solve(positions, deadline)
+        elif after == DONE:
+            following = np.zeros(self.max_turns)
+            following[0] = 1.0
+            return following
+        else:
+            following = self.solve(after, deadline)
+        if following is None or same_turn:
+            return following
+        return np.concatenate(([0.0], following[:-1]))
+
+
+def race_probabilities(state, player_map, distribution, deadline=None):
+    """
+    (xác suất thắng theo ghế, phần xác suất bị cắt sau MAX_TURNS lượt) nếu mọi ghế đều đang đua về
+    đích (và giải kịp trước deadline), ngược lại None.
+    Ghế thứ r tính từ người đang tới lượt thắng ở lượt thứ t của mình nếu mọi ghế đi trước nó
+    chưa về đích sau t lượt và mọi ghế đi sau chưa về đích sau t - 1 lượt.
+    """
+    num_players = state.num_players
+    if not all(tablebase.is_race(state, player_map, slot) for slot in range(num_players)):
+        return None
+    order = [(state.turn + offset) % num_players for offset in range(num_players)]
+    dice = state.dice_value
+    finish = {}
+    for slot in order:
+        positions = state.player_positions(slot)
+        if slot == state.turn and dice is not None and dice > 0:
+            finish[slot] = distribution.after_roll(positions, dice, deadline)
+        else:
+            finish[slot] = distribution.solve(positions, deadline)
+        if finish[slot] is None:
+            return None
+    survive = {slot: 1.0 - np.cumsum(finish[slot]) for slot in order}       # P(chưa xong sau t + 1 lượt)
+    survive_before = {slot: np.concatenate(([1.0], survive[slot][:-1])) for slot in order}
+    probabilities = [0.0] * num_players
+    for rank, slot in enumerate(order):
+        alive = np.ones(distribution.max_turns)
+        for other_rank, other in enumerate(order):
+            if other != slot:
+                alive *= survive[other] if other_rank < rank else survive_before[other]
+        probabilities[slot] = float(np.dot(finish[slot], alive))
+    total = sum(probabilities)  # < 1 đúng bằng phần đuôi bị cắt sau MAX_TURNS lượt
+    return [p / total for p in probabilities], max(0.0, 1.0 - total)
+
+
+# --- Monte Carlo ---
+def run_rollouts(gm, deadline, rng, max_rollouts=None):
+    """
+    Playout từ gm.state tới hết ván, lặp tới deadline (time.monotonic()) hoặc đủ max_rollouts ván.
+    gm.state được khôi phục sau mỗi ván. Trả về (số ván thắng theo ghế, số ván);
+    ván quá MAX_PLAYOUT_PLIES lần gieo chia đều cho mọi ghế.
+    """
+    state = gm.state
+    num_players = state.num_players
+    wins = [0.0] * num_players
+    rollouts = 0
+    root_dice = state.dice_value  # lần gieo đầu của playout không nằm trong bản ghi hoàn tác
+    while time.monotonic() < deadline and (max_rollouts is None or rollouts < max_rollouts):
+        records = []
+        plies = 0
+        while state.winner is None and plies < MAX_PLAYOUT_PLIES:
+            if state.dice_value is None:
+                state.dice_value = rng.randint(1, 6)
+            slot = state.turn
+            moves = _legal_moves(state, slot, state.dice_value)
+            if moves:
+                records.append(gm.apply_move(slot, _playout_move(gm, slot, state.dice_value, moves, rng)))
+            else:
+                records.append(gm.apply_pass())
+            plies += 1
+        if state.winner is None:
+            for slot in range(num_players):
+                wins[slot] += 1.0 / num_players
+        else:
+            wins[state.winner] += 1.0
+        for record in reversed(records):
+            gm.undo_move(record)
+        state.dice_value = root_dice
+        rollouts += 1
+    return wins, rollouts
+
+
+def _worker_rollouts(task):
+    """Chạy trong tiến trình con (pool của MCTSBot). task = (state_bytes, seed, deadline, max_rollouts)."""
+    state_bytes, seed, deadline, max_rollouts = task
+    state = GameState.from_bytes(state_bytes)
+    gm = _engine(state.num_players)
+    gm.restore_state(state)
+    return run_rollouts(gm, deadline, random.Random(seed), max_rollouts)
+
+
+def _default_player_map(num_players):
+    return {slot: slot for slot in range(num_players)}
+
+
+class WinProbabilityEstimator:
+    """
+    Dịch vụ ước lượng xác suất thắng, an toàn khi gọi từ nhiều luồng (UI, bot, giải đấu).
+    time_budget: giây tối đa mỗi lần estimate (khi không truyền deadline).
+    workers=None dùng os.cpu_count(); workers=1 chạy playout ngay trong tiến trình hiện tại.
+    """
+
+    def __init__(self, time_budget=1.0, target_se=TARGET_SE, min_rollouts=MIN_ROLLOUTS, max_rollouts=None,
+                 workers=None, use_tablebase=True):
+        self.time_budget = time_budget
+        self.target_se = target_se
+        self.min_rollouts = min_rollouts
+        self.max_rollouts = max_rollouts
+        self.workers = workers or os.cpu_count() or 1
+        table = tablebase.get_default() if use_tablebase and np is not None else None
+        self._distribution = _TurnDistribution(table) if table is not None else None
+        self._lock = threading.Lock()  # bảo vệ memo của _distribution
+        self._rng = random.Random()
+
+    def estimate(self, source, player_map=None, deadline=None, seed=None):
+        """
+        Ước lượng cho source = GameManager (lấy state + player_map) hoặc GameState.
+        deadline theo time.perf_counter(); seed cố định để kết quả Monte Carlo tái lập được
+        (khi chạy trong tiến trình hiện tại). Trả về WinEstimate.
+        """
+        start = time.perf_counter()
+        if deadline is None:
+            deadline = start + self.time_budget
+        if hasattr(source, 'state'):
+            state, player_map = source.state.copy(), dict(source.player_map)
+        else:
+            state = source.copy()
+            player_map = player_map or _default_player_map(state.num_players)
+        num_players = state.num_players
+
+        if state.winner is not None:
+            probabilities = [1.0 if slot == state.winner else 0.0 for slot in range(num_players)]
+            return WinEstimate(probabilities, [0.0] * num_players, 0, True, time.perf_counter() - start)
+        if self._distribution is not None and all(tablebase.is_race(state, player_map, slot)
+                                                  for slot in range(num_players)):
+            # Thế đua: lời giải từ tablebase dùng tối đa nửa thời gian, phần còn lại để Monte Carlo nếu không kịp
+            exact_deadline = start + (deadline - start) / 2
+            with self._lock:
+                solution = race_probabilities(state, player_map, self._distribution, exact_deadline)
+            if solution is not None:
+                probabilities, tail = solution
+                exact = tail <= EXACT_TOLERANCE
+                return WinEstimate(probabilities, [0.0 if exact else tail] * num_players, 0, exact,
+                                   time.perf_counter() - start)
+
+        rng = random.Random(seed) if seed is not None else random.Random(self._rng.getrandbits(64))
+        wins, rollouts = self._monte_carlo(state, player_map, deadline, rng)
+        if not rollouts:  # hết giờ trước khi xong ván nào: chưa biết gì
+            probabilities = [1.0 / num_players] * num_players
+            return WinEstimate(probabilities, [0.5] * num_players, 0, False, time.perf_counter() - start)
+        probabilities = [w / rollouts for w in wins]
+        result = WinEstimate(probabilities, self._std_errors(probabilities, rollouts), rollouts, False,
+                             time.perf_counter() - start)
+        logging.debug(f"Ước lượng xác suất thắng: {result}")
+        return result
+
+    @staticmethod
+    def _std_errors(probabilities, rollouts):
+        return [(p * (1.0 - p) / rollouts) ** 0.5 for p in probabilities]
+
+    def _converged(self, wins, rollouts):
+        if self.max_rollouts is not None and rollouts >= self.max_rollouts:
+            return True
+        if rollouts < self.min_rollouts:
+            return False
+        return max(self._std_errors([w / rollouts for w in wins], rollouts)) <= self.target_se
+
+    def _batch_limit(self, rollouts):
+        return None if self.max_rollouts is None else self.max_rollouts - rollouts
+
+    def _monte_carlo(self, state, player_map, deadline, rng):
+        wins = [0.0] * state.num_players
+        rollouts = 0
+        wall_deadline = time.monotonic() + (deadline - time.perf_counter())  # tiến trình con so bằng time.monotonic()
+
+        # Tiến trình con dựng ván bằng GameManager mặc định nên chỉ dùng được với player_map mặc định
+        if use_pool(self.workers) and player_map == _default_player_map(state.num_players):
+            state_bytes = state.to_bytes()
+
+            def submit():
+                batch_deadline = min(time.monotonic() + BATCH_TIME, wall_deadline - RESULT_MARGIN)
+                return pool.submit(_worker_rollouts, (state_bytes, rng.getrandbits(32), batch_deadline,
+                                                      self._batch_limit(rollouts)))
+
+            try:
+                pool = get_pool(self.workers)
+                pending = {submit() for _ in range(self.workers)}
+                while pending:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        batch_wins, batch_rollouts = future.result()
+                        wins = [a + b for a, b in zip(wins, batch_wins)]
+                        rollouts += batch_rollouts
+                    if self._converged(wins, rollouts):
+                        break
+                    if wall_deadline - time.monotonic() > 2 * RESULT_MARGIN:
+                        pending.update(submit() for _ in done)
+                for future in pending:  # lô đang chạy tự dừng ở hạn chót của nó, kết quả bỏ đi
+                    future.cancel()
+                return wins, rollouts
+            except (BrokenProcessPool, OSError) as e:
+                logging.warning(f"Pool tiến trình lỗi ({e}), chạy playout trong tiến trình hiện tại.")
+                shutdown_pool()
+
+        from core.game_manager import GameManager  # tránh import vòng (GameManager dùng ai.*)
+        gm = GameManager(num_players=state.num_players)
+        gm.player_map = player_map
+        gm.restore_state(state)
+        while not self._converged(wins, rollouts) and time.perf_counter() < deadline:
+            batch_deadline = min(time.monotonic() + BATCH_TIME, wall_deadline)
+            batch_wins, batch_rollouts = run_rollouts(gm, batch_deadline, rng, self._batch_limit(rollouts))
+            wins = [a + b for a, b in zip(wins, batch_wins)]
+            rollouts += batch_rollouts
+        return wins, rollouts
+
+
+class BackgroundEstimate:
+    """
+    Chạy estimator.estimate trên luồng nền với ảnh chụp của gm lúc tạo (vòng lặp vẽ chỉ hỏi done / result).
+    """
+
+    def __init__(self, estimator, gm, deadline=None):
+        self.position_hash = gm.position_hash
+        self.result = None
+        self._state = gm.state.copy()
+        self._player_map = dict(gm.player_map)
+        self._thread = threading.Thread(target=self._run, args=(estimator, deadline), name="winprob", daemon=True)
+        self._thread.start()
+
+    def _run(self, estimator, deadline):
+        try:
+            self.result = estimator.estimate(self._state, self._player_map, deadline)
+        except Exception as e:  # lỗi ước lượng không được làm sập vòng lặp UI
+            logging.exception(f"Lỗi khi ước lượng xác suất thắng: {e}")
+
+    @property
+    def done(self):
+        return not self._thread.is_alive()
+
+
+_DEFAULT = None
+
+
+def get_default():
+    """Estimator dùng chung cho cả tiến trình (memo tablebase và pool tiến trình được dùng lại)."""
+    global _DEFAULT
+    if _DEFAULT is None:
+        _DEFAULT = WinProbabilityEstimator()
+    return _DEFAULT
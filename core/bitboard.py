@@ -0,0 +1,123 @@
+# core/bitboard.py
+"""
+Biểu diễn bitboard của thế cờ cho các vòng lặp nóng (bot tìm kiếm, mô phỏng).
+
+- Vòng ngoài: mỗi người chơi một số nguyên 52 bit, bit ring_id bật khi có quân đứng ở ô đó
+  (CellOccupancy.occupied), và một số 52 bit cho các ô có "tháp" >= 2 quân (CellOccupancy.towers).
+  GameManager cập nhật hai mảng này tăng dần cùng với bộ đếm ô.
+- Đường về đích / chuồng: số nguyên nhỏ theo người chơi (BitBoard.home, yard, finished).
+
+Đi d bước trên vòng ngoài là xoay trái d bit (ring_id tăng theo chiều đi), trừ các quân rẽ vào
+đường về đích (LANE_ENTRY_MASK). Nhờ đó câu hỏi kiểu "với mặt d, quân nào đá được ai" là vài phép
+dịch / AND trên cả bàn thay vì so từng quân.
+"""
+from core.board import RING_SIZE, HOME_LANE_START, LAST_INDEX, PATH_OFFSETS
+from core import rules
+
+RING_MASK = (1 << RING_SIZE) - 1
+SAFE_MASK = rules.SAFE_MASK
+
+# CELL_BIT[board_id][path_index + 1]: bit của ô vòng ngoài quân đang đứng (0: chuồng / đường về đích)
+CELL_BIT = tuple(
+    tuple(0 if i < 0 or ring[i] < 0 else 1 << ring[i] for i in range(-1, LAST_INDEX + 1))
+    for ring in rules.RING_CELL
+)
+
+# HOME_STEP[path_index + 1]: số bước đã đi trong đường về đích (0 nếu chưa vào, 6 = đã về đích)
+HOME_STEP = tuple(max(0, i - HOME_LANE_START + 1) for i in range(-1, LAST_INDEX + 1))
+
+# LANE_ENTRY_MASK[board_id][d]: các ô vòng ngoài mà đi d bước sẽ rẽ vào đường về đích (không còn trên vòng)
+LANE_ENTRY_MASK = tuple(
+    tuple(sum(1 << rules.RING_CELL[board_id][i] for i in range(max(0, HOME_LANE_START - d), HOME_LANE_START))
+          for d in range(7))
+    for board_id in range(len(PATH_OFFSETS))
+)
+
+
+def rotate(mask, steps):
+    """Dời mọi quân trên vòng ngoài tiến steps ô (xoay trái trong 52 bit)."""
+    steps %= RING_SIZE
+    return ((mask << steps) | (mask >> (RING_SIZE - steps))) & RING_MASK
+
+
+def popcount(mask):
+    return bin(mask).count('1')
+
+
+class BitBoard:
+    """
+    Ảnh chụp bitboard của một thế cờ (dựng từ GameState + CellOccupancy, không sao chép bộ đếm).
+    occupied/towers: bitboard vòng ngoài theo slot; home: tổng số bước trong đường về đích
+    (0..24), yard: số quân trong chuồng, finished: số quân đã về đích.
+    """
+    __slots__ = ('num_players', 'boards', 'occupied', 'towers', 'home', 'yard', 'finished')
+
+    def __init__(self, num_players, boards, occupied, towers, home, yard, finished):
+        self.num_players = num_players
+        self.boards = boards
+        self.occupied = occupied
+        self.towers = towers
+        self.home = home
+        self.yard = yard
+        self.finished = finished
+
+    @classmethod
+    def from_game(cls, state, occupancy, player_map):
+        num_players = state.num_players
+        home, yard, finished = [], [], []
+        for slot in range(num_players):
+            positions = state.player_positions(slot)
+            home.append(sum(HOME_STEP[i + 1] for i in positions))
+            yard.append(positions.count(-1))
+            finished.append(positions.count(LAST_INDEX))
+        boards = tuple(player_map.get(slot, slot) for slot in range(num_players))
+        return cls(num_players, boards, list(occupancy.occupied[:num_players]),
+                   list(occupancy.towers[:num_players]), home, yard, finished)
+
+    @classmethod
+    def from_state(cls, state, player_map):
+        """Dựng từ GameState (tự tính bitboard vòng ngoài, dùng khi không có CellOccupancy)."""
+        return cls.from_game(state, rules.CellOccupancy.from_state(state, player_map), player_map)
+
+    # --- Truy vấn ---
+    def singles(self, slot):
+        """Ô có đúng một quân của slot (có thể bị đá)."""
+        return self.occupied[slot] & ~self.towers[slot]
+
+    def opponents(self, slot):
+        """Ô có quân của bất kỳ đối thủ nào."""
+        mask = 0
+        for other in range(self.num_players):
+            if other != slot:
+                mask |= self.occupied[other]
+        return mask
+
+    def kick_mask(self, slot):
+        """
+        Các ô mà slot đi vào sẽ đá được một quân, đúng thứ tự của rules.kick_opponent:
+        đối thủ đầu tiên (theo thứ tự người chơi) có quân trên ô quyết định - quân lẻ thì bị đá,
+        tháp thì chặn. Ô an toàn không bao giờ đá được.
+        """
+        kick = seen = 0
+        for other in range(self.num_players):
+            if other == slot:
+                continue
+            kick |= self.singles(other) & ~seen
+            seen |= self.occupied[other]
+        return kick & ~SAFE_MASK
+
+    def blocked_mask(self, slot):
+        """Các ô slot đi vào không đá được vì đã có tháp của đối thủ (hoặc là ô an toàn có quân đối thủ)."""
+        return self.opponents(slot) & ~self.kick_mask(slot)
+
+    def capture_mask(self, slot, dice):
+        """
+        Ô đích (bit vòng ngoài) của các nước đá quân với mặt dice.
+        Ra quân không cần xét: ô xuất phát là ô an toàn.
+        """
+        movers = self.occupied[slot] & ~LANE_ENTRY_MASK[self.boards[slot]][dice]
+        return rotate(movers, dice) & self.kick_mask(slot)
+
+    def race_progress(self, slot):
+        """Tiến độ trong đường về đích: (home, finished) - số nguyên nhỏ cho hàm đánh giá."""
+        return self.home[slot], self.finished[slot]
@@ -1,11 +1,46 @@
 # core/board.py
-from utils.constants import CELL
+# Đường đi 52 ô vòng ngoài chuẩn (đã kiểm tra từ board_view.py)
+BASE_PATH = (
+    (6, 5), (6, 4), (6, 3), (6, 2), (6, 1), (6, 0),
+    (7, 0),
+    (8, 0), (8, 1), (8, 2), (8, 3), (8, 4), (8, 5),
+    (9, 6), (10, 6), (11, 6), (12, 6), (13, 6), (14, 6),
+    (14, 7),
+    (14, 8), (13, 8), (12, 8), (11, 8), (10, 8), (9, 8),
+    (8, 9), (8, 10), (8, 11), (8, 12), (8, 13), (8, 14),
+    (7, 14),
+    (6, 14), (6, 13), (6, 12), (6, 11), (6, 10), (6, 9),
+    (5, 8), (4, 8), (3, 8), (2, 8), (1, 8), (0, 8),
+    (0, 7),
+    (0, 6), (1, 6), (2, 6), (3, 6), (4, 6), (5, 6)
+)
+
+# player_id: 0=GREEN, 1=BLUE, 2=YELLOW, 3=RED
+# Vị trí (index trên BASE_PATH) của ô xuất phát từng người chơi:
+# - GREEN:  (1, 6)  -> index 47
+# - BLUE:   (8, 1)  -> index 8
+# - YELLOW: (13, 8) -> index 21
+# - RED:    (6, 13) -> index 34
+PATH_OFFSETS = {
+    0: 47,  # GREEN
+    1: 8,   # BLUE
+    2: 21,  # YELLOW
+    3: 34   # RED
+}
+
+RING_SIZE = len(BASE_PATH)      # 52 ô vòng ngoài
+HOME_LANE_START = 51            # index đầu tiên của đường về đích trên full path
+HOME_LANE_LENGTH = 6
+PATH_LENGTH = HOME_LANE_START + HOME_LANE_LENGTH  # 57 ô
+LAST_INDEX = PATH_LENGTH - 1    # 56 = về đích
+
+DEFAULT_CELL = 50  # kích thước ô (pixel) mặc định, trùng utils.constants.CELL
 
 class Board:
-    def __init__(self, start_x=0, start_y=0):
+    def __init__(self, start_x=0, start_y=0, cell=DEFAULT_CELL):
         self.start_x = start_x
         self.start_y = start_y
-        self.cell = CELL
+        self.cell = cell
         
         # Giữ nguyên đường đi 52 ô của bạn
         self.path_grid = self._make_base_path_from_view()
@@ -17,27 +52,13 @@ class Board:
             rotated_path = self._rotate_path_for_player(pid)
             home_lane = self.home_lanes[pid]
             # Đường đi logic của mỗi quân cờ là 51 ô vòng ngoài + 6 ô về đích
-            self.full_paths.append(rotated_path[:51] + home_lane)
+            self.full_paths.append(rotated_path[:HOME_LANE_START] + home_lane)
 
     def _make_base_path_from_view(self):
         """
         Sử dụng đường đi 52 ô chuẩn đã được kiểm tra từ board_view.py.
         """
-        path = [
-            (6, 5), (6, 4), (6, 3), (6, 2), (6, 1), (6, 0), 
-            (7, 0),
-            (8, 0), (8, 1), (8, 2), (8, 3), (8, 4), (8, 5),
-            (9, 6), (10, 6), (11, 6), (12, 6), (13, 6), (14, 6),
-            (14, 7),
-            (14, 8), (13, 8), (12, 8), (11, 8), (10, 8), (9, 8),
-            (8, 9), (8, 10), (8, 11), (8, 12), (8, 13), (8, 14),
-            (7, 14),
-            (6, 14), (6, 13), (6, 12), (6, 11), (6, 10), (6, 9),
-            (5, 8), (4, 8), (3, 8), (2, 8), (1, 8), (0, 8),
-            (0, 7),
-            (0, 6), (1, 6), (2, 6), (3, 6), (4, 6), (5, 6)
-        ]
-        return path
+        return list(BASE_PATH)
 
     def _rotate_path_for_player(self, player_id):
         """
@@ -45,19 +66,8 @@ class Board:
         LỖI NẰM Ở ĐÂY VÀ ĐÃ ĐƯỢC SỬA.
         """
         base = self.path_grid
-        # player_id: 0=GREEN, 1=BLUE, 2=YELLOW, 3=RED
-        # Tọa độ xuất phát và vị trí (index) chính xác của chúng:
-        # - GREEN:  (1, 6)  -> có index là 48 (trước đây ghi nhầm là 47)
-        # - BLUE:   (8, 1)  -> có index là 8
-        # - YELLOW: (13, 8) -> có index là 21
-        # - RED:    (6, 13) -> có index là 34
-        offsets = {
-            0: 47,  # GREEN <- ĐÃ SỬA TỪ 47 LÊN 48
-            1: 8,   # BLUE
-            2: 21,  # YELLOW
-            3: 34   # RED
-        }
-        offset = offsets.get(player_id, 0)
+        # Offset của từng người chơi xem PATH_OFFSETS
+        offset = PATH_OFFSETS.get(player_id, 0)
         return base[offset:] + base[:offset]
 
     def _make_home_lanes(self):
@@ -0,0 +1,154 @@
+# core/canonical.py
+"""
+Dạng chuẩn (canonical) của GameState theo hai phép đối xứng:
+- Xoay ghế: mọi ghế là bản xoay của nhau (Board._rotate_path_for_player), path_index đã là
+  toạ độ tương đối theo ghế, nên chỉ cần đánh số lại ghế bắt đầu từ người đang đi và ghi
+  kèm độ lệch ô xuất phát của từng ghế so với ghế đó (4 người: luôn 0, 13, 26, 39).
+- Hoán vị quân: 4 quân của một người như nhau, nên sắp xếp vị trí tăng dần.
+Ngoại lệ duy nhất của phép xoay ghế: ô có quân của hai đối thủ khác nhau (tháp của người này
+chặn người kia) - rules.kick_opponent xét đối thủ theo thứ tự ghế tuyệt đối.
+
+canonicalize() trả về khoá bytes (dùng cho dict/cache) kèm ánh xạ ngược để đổi nước đi
+giữa piece_id gốc và chỉ số quân trong dạng chuẩn. canonical_hash() là hash 64 bit không phụ
+thuộc thứ tự quân (cộng khoá thay vì XOR để hai quân cùng ô không triệt tiêu nhau),
+dùng cho bảng chuyển vị.
+"""
+import random
+
+from core.board import PATH_OFFSETS, RING_SIZE, LAST_INDEX
+from core.state import GameState, PIECES_PER_PLAYER, MAX_SEATS
+
+MASK64 = (1 << 64) - 1
+NUM_POSITIONS = LAST_INDEX + 2  # path_index -1..56
+
+_rng = random.Random(0x43414E4F)  # "CANO"
+# SEAT_POSITION_KEYS[ghế tương đối][path_index + 1]
+SEAT_POSITION_KEYS = tuple(tuple(_rng.getrandbits(64) for _ in range(NUM_POSITIONS)) for _ in range(MAX_SEATS))
+# OFFSET_KEYS[ghế tương đối][độ lệch ô xuất phát] (chỉ khác 0 với ván 2-3 người)
+OFFSET_KEYS = tuple(tuple(_rng.getrandbits(64) for _ in range(RING_SIZE)) for _ in range(MAX_SEATS))
+TURN_KEYS = tuple(_rng.getrandbits(64) for _ in range(MAX_SEATS))
+DICE_KEYS = tuple(_rng.getrandbits(64) for _ in range(8))      # dice_value + 1 (None = 0)
+WINNER_KEYS = tuple(_rng.getrandbits(64) for _ in range(MAX_SEATS + 1))  # ghế tương đối + 1 (None = 0)
+
+
+def _seats(num_players, slot):
+    return [(slot + k) % num_players for k in range(num_players)]
+
+
+def seat_offsets(player_map, seats):
+    """Độ lệch ô xuất phát (theo chiều đi) của từng ghế so với seats[0]."""
+    base = PATH_OFFSETS[player_map.get(seats[0], seats[0])]
+    return tuple((PATH_OFFSETS[player_map.get(s, s)] - base) % RING_SIZE for s in seats)
+
+
+class CanonicalForm:
+    """
+    Kết quả canonicalize:
+    - key: bytes (num_players, độ lệch từng ghế, lượt, xúc xắc, người thắng - lượt và người thắng
+      tính theo ghế tương đối - rồi vị trí đã sắp xếp của từng ghế tương đối).
+    - seats[k]: slot gốc của ghế tương đối k (seats[0] = ghế được xoay về đầu).
+    - orders[k][i]: piece_id gốc của quân thứ i (đã sắp xếp) của ghế tương đối k.
+    """
+    __slots__ = ('key', 'seats', 'orders', 'positions')
+
+    def __init__(self, key, seats, orders, positions):
+        self.key = key
+        self.seats = seats
+        self.orders = orders
+        self.positions = positions
+
+    def to_original(self, seat, index):
+        """(ghế tương đối, chỉ số quân chuẩn) -> (slot gốc, piece_id gốc)."""
+        return self.seats[seat], self.orders[seat][index]
+
+    def to_canonical(self, slot, piece_id):
+        """(slot gốc, piece_id gốc) -> (ghế tương đối, chỉ số quân chuẩn)."""
+        seat = self.seats.index(slot)
+        return seat, self.orders[seat].index(piece_id)
+
+    def original_move(self, index):
+        """Nước đi chuẩn (chỉ số quân của ghế đầu) -> piece_id gốc."""
+        return self.orders[0][index]
+
+    def canonical_move(self, piece_id):
+        """piece_id gốc của ghế đầu -> chỉ số quân chuẩn."""
+        return self.orders[0].index(piece_id)
+
+    def to_state(self):
+        """
+        GameState dạng chuẩn: ghế tương đối k nằm ở slot k, lượt và người thắng đã xoay theo.
+        Chơi tiếp được với player_map đồng nhất khi ván đủ 4 người (độ lệch ghế luôn 0/13/26/39).
+        """
+        num_players = self.key[0]
+        turn, dice, winner = self.key[1 + num_players:4 + num_players]
+        state = GameState(num_players)
+        for i, path_index in enumerate(self.positions):
+            slot, piece_id = divmod(i, PIECES_PER_PLAYER)
+            state.set_index(slot, piece_id, path_index)
+            if path_index == LAST_INDEX:
+                state.set_finished(slot, piece_id, True)
+        state.turn = turn
+        state.dice_value = None if dice == 0 else (-1 if dice == 7 else dice)
+        state.winner = None if winner == 255 else winner
+        return state
+
+
+def canonicalize(state, player_map, slot=None):
+    """Dạng chuẩn của state, xoay về slot (mặc định: người đang đi)."""
+    num_players = state.num_players
+    slot = state.turn if slot is None else slot
+    seats = _seats(num_players, slot)
+    positions = state.positions
+    orders = []
+    canonical_positions = []
+    for seat in seats:
+        base = seat * PIECES_PER_PLAYER
+        order = sorted(range(PIECES_PER_PLAYER), key=lambda i: positions[base + i])
+        orders.append(tuple(order))
+        canonical_positions.extend(positions[base + i] for i in order)
+    dice = state.dice_value
+    winner = state.winner
+    header = (num_players,) + seat_offsets(player_map, seats) + (
+        (state.turn - slot) % num_players,
+        0 if dice is None else (7 if dice == -1 else dice),
+        255 if winner is None else (winner - slot) % num_players)
+    key = bytes(header) + bytes(p + 1 for p in canonical_positions)
+    return CanonicalForm(key, tuple(seats), tuple(orders), tuple(canonical_positions))
+
+
+def canonical_hash(state, player_map, slot=None):
+    """
+    Hash 64 bit của dạng chuẩn (không cần sắp xếp: tổng khoá không phụ thuộc thứ tự quân).
+    Hai state có cùng dạng chuẩn khi xoay về cùng ghế tương đối luôn cho cùng hash.
+    """
+    num_players = state.num_players
+    slot = state.turn if slot is None else slot
+    positions = state.positions
+    base_offset = PATH_OFFSETS[player_map.get(slot, slot)]
+    h = TURN_KEYS[(state.turn - slot) % num_players]
+    dice = state.dice_value
+    h ^= DICE_KEYS[0 if dice is None else (7 if dice == -1 else dice)]
+    winner = state.winner
+    h ^= WINNER_KEYS[0 if winner is None else (winner - slot) % num_players + 1]
+    for k in range(num_players):
+        seat = (slot + k) % num_players
+        keys = SEAT_POSITION_KEYS[k]
+        h ^= OFFSET_KEYS[k][(PATH_OFFSETS[player_map.get(seat, seat)] - base_offset) % RING_SIZE]
+        start = seat * PIECES_PER_PLAYER
+        total = 0
+        for path_index in positions[start:start + PIECES_PER_PLAYER]:
+            total += keys[path_index + 1]
+        h ^= (total * 0x9E3779B97F4A7C15) & MASK64
+    return h
+
+
+def distinct_moves(state, slot, piece_ids):
+    """Bỏ các nước đi trùng nhau do hoán vị quân (hai quân cùng ô cho cùng một vị trí sau nước đi)."""
+    seen = set()
+    result = []
+    for piece_id in piece_ids:
+        path_index = state.get_index(slot, piece_id)
+        if path_index not in seen:
+            seen.add(path_index)
+            result.append(piece_id)
+    return result
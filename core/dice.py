@@ -1,9 +1,10 @@
 # core/dice.py
-import random
+from core.rng import GameRNG
 
 class Dice:
-    def __init__(self):
+    def __init__(self, rng=None):
         self.value = 1
+        self.rng = rng or GameRNG()
     def roll(self):
-        self.value = random.randint(1,6)
+        self.value = self.rng.roll()
         return self.value
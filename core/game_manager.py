@@ -1,21 +1,34 @@
 import logging
 from core.piece import Piece
-from core.board import Board
+from core.board import Board, LAST_INDEX
+from core.state import GameState
+from core.rng import GameRNG
+from core.movelog import MoveLog
+from core import record
 from . import rules
+from core import storage
 from ai.random_bot import RandomBot
 from ai.hard_bot import HardBot
-from utils.constants import WIDTH, HEIGHT, CELL
-import random
+from ai.expectimax_bot import ExpectimaxBot
+from ai.mcts_bot import MCTSBot
+from ai.learned_bot import LearnedBot
 import datetime 
-from utils import firebase_manager 
+
+# Các loại người chơi do máy điều khiển mà _init_bots hỗ trợ
+BOT_TYPES = ('bot_easy', 'bot_hard', 'bot_expert', 'bot_mcts', 'bot_learned')
 
 class GameManager:
-    def __init__(self, num_players=4, player_types=None, match_id_to_load=None, is_online=False):
+    def __init__(self, num_players=4, player_types=None, match_id_to_load=None, is_online=False, storage_backend=None,
+                 seed=None):
         
-        # 1. Khởi tạo Firebase
-        firebase_manager.initialize_firebase()
+        # 1. Tầng lưu trữ: adapter do ứng dụng đăng ký (Firebase), mặc định không lưu gì
+        self.storage = storage_backend or storage.get_default_storage()
+
+        # RNG riêng của ván (xúc xắc + lựa chọn ngẫu nhiên của bot); seed=None -> seed ngẫu nhiên, được ghi khi lưu
+        self.rng = GameRNG(seed)
         
-        self.board = Board(start_x=(WIDTH - CELL*15)//2, start_y=(HEIGHT - CELL*15)//2)
+        # Engine chỉ cần toạ độ lưới; vị trí pixel do BoardView tự tính
+        self.board = Board()
         
         # 2. Thuộc tính lưu/tải (Khởi tạo map ở đây để tránh lỗi Attribute Error)
         self.match_id = match_id_to_load
@@ -23,9 +36,11 @@ class GameManager:
         self.is_online = is_online
         self.player_map = {} 
         self.active_pids = []
+        self.state = GameState(num_players)
         
         # 3. Logic Khởi tạo / Tải
         if match_id_to_load is not None:
+            self.player_types = player_types or ['human'] * num_players
             self.is_loaded_successfully = self._load_game(match_id_to_load)
             if not self.is_loaded_successfully:
                 logging.error(f"Không thể tải game MatchID {match_id_to_load}. Bắt đầu game mới.")
@@ -35,9 +50,40 @@ class GameManager:
             
         self.last_move_info = None
 
+    # --- Lượt, xúc xắc, người thắng nằm trong GameState nén ---
+    @property
+    def turn(self):
+        return self.state.turn
+
+    @turn.setter
+    def turn(self, value):
+        self.state.turn = value
+
+    @property
+    def dice_value(self):
+        return self.state.dice_value
+
+    @dice_value.setter
+    def dice_value(self, value):
+        self.state.dice_value = value
+
+    @property
+    def winner(self):
+        return self.state.winner
+
+    @winner.setter
+    def winner(self, value):
+        self.state.winner = value
+
+    @property
+    def position_hash(self):
+        """Hash Zobrist 64 bit của vị trí hiện tại (cập nhật tăng dần trong self.state)."""
+        return self.state.zobrist
+
     def setup_game(self, num_players, player_types):
         self.num_players = num_players
         self.player_types = player_types or ['human'] * num_players
+        self.state = GameState(num_players)
         self.turn = 0
         self.dice_value = None
         self.winner = None
@@ -56,11 +102,14 @@ class GameManager:
         # --------------------------------------------------------
         
         self.players = self._init_players() # Gọi hàm khởi tạo quân cờ đã sửa
+        self.occupancy = rules.CellOccupancy.from_state(self.state, self.player_map)
+        self.threats = rules.ThreatMap(self.player_map)
         self.bots = self._init_bots()
         self.match_id = None
+        self.move_log = MoveLog.for_game(self)
 
     def _init_players(self):
-        """Khởi tạo quân cờ sử dụng BOARD ID thực tế."""
+        """Khởi tạo các view Piece (BOARD ID thực tế) trỏ vào self.state."""
         players = []
         
         for slot_id in range(self.num_players):
@@ -68,7 +117,7 @@ class GameManager:
             board_id = self.player_map.get(slot_id, slot_id)
             
             # QUAN TRỌNG: Khởi tạo quân cờ với BOARD ID thực tế
-            pieces = [Piece(board_id, piece_id) for piece_id in range(4)]
+            pieces = [Piece(board_id, piece_id, self.state, slot_id) for piece_id in range(4)]
             
             # Lưu trữ quân cờ theo Slot ID tuần tự (0, 1) trong self.players
             players.append(pieces)
@@ -84,6 +133,15 @@ class GameManager:
             elif ptype == 'bot_hard':
                 logging.info(f"Khởi tạo Bot Khó cho Người chơi {pid + 1}")
                 bots[pid] = HardBot(pid, self)
+            elif ptype == 'bot_expert':
+                logging.info(f"Khởi tạo Bot Chuyên gia (expectiminimax) cho Người chơi {pid + 1}")
+                bots[pid] = ExpectimaxBot(pid, self)
+            elif ptype == 'bot_mcts':
+                logging.info(f"Khởi tạo Bot MCTS (song song) cho Người chơi {pid + 1}")
+                bots[pid] = MCTSBot(pid, self)
+            elif ptype == 'bot_learned':
+                logging.info(f"Khởi tạo Bot Học máy cho Người chơi {pid + 1}")
+                bots[pid] = LearnedBot(pid, self)
         return bots
     
     def is_bot_turn(self):
@@ -91,14 +149,14 @@ class GameManager:
 
     # --- HÀM LƯU/TẢI GIỮ NGUYÊN (Cần sửa logic trong _apply_loaded_state) ---
     def save_current_state(self):
-        firebase_manager.save_game_state(self, is_loadable=True)
+        self.storage.save_game_state(self, is_loadable=True)
 
     def finish_game(self, winner_id):
-        firebase_manager.save_game_state(self, winner_id=winner_id, is_loadable=False)
+        self.storage.save_game_state(self, winner_id=winner_id, is_loadable=False)
         self.match_id = None 
 
     def _load_game(self, match_id):
-        loaded_data = firebase_manager.load_game_state(match_id)
+        loaded_data = self.storage.load_game_state(match_id)
         if loaded_data:
             return self._apply_loaded_state(loaded_data)
         return False
@@ -108,11 +166,13 @@ class GameManager:
         # đến lỗi hiển thị hiện tại. Tuy nhiên, nó cần được sửa sau này.)
         try:
             self.num_players = loaded_data['num_players']
+            self.setup_game(self.num_players, self.player_types) # Thiết lập lại map, types và state
+
             self.turn = loaded_data['turn']
             self.dice_value = loaded_data['dice_value']
             self.winner = None
-            
-            self.setup_game(self.num_players, self.player_types) # Thiết lập lại map và types
+            if loaded_data.get('rng'):
+                self.rng = GameRNG.from_dict(loaded_data['rng'])
 
             loaded_mode = loaded_data.get('mode', 'Offline')
             if loaded_mode == 'Bot':
@@ -121,23 +181,20 @@ class GameManager:
             else: 
                 self.player_types = ['human'] * self.num_players
             
-            self.players = []
-            saved_pieces_state = loaded_data['pieces_state']
-            if len(saved_pieces_state) != self.num_players:
-                logging.error("Lỗi state quân cờ: sai số lượng người chơi.")
+            if 'base' in loaded_data:
+                # Bản ghi snapshot + delta (core.record): dựng lại vị trí, log đầy đủ được ghi tiếp
+                state, self.move_log = record.rebuild(loaded_data)
+                self.state.assign(state)  # các view Piece vẫn trỏ vào self.state
+            elif not self._apply_pieces_state(loaded_data['pieces_state']):
                 return False
+            else:
+                # Log cũ (nếu bản lưu có) được ghi tiếp; không thì bắt đầu log từ vị trí vừa tải
+                if loaded_data.get('move_log'):
+                    self.move_log, _ = MoveLog.from_bytes(loaded_data['move_log'])
+                else:
+                    self.move_log = MoveLog.for_game(self)
 
-            for slot_id in range(self.num_players):
-                player_pieces_list = []
-                for piece_data in saved_pieces_state[slot_id]:
-                    # Giả định dữ liệu tải về đã lưu Board ID
-                    board_id = self.player_map.get(slot_id, slot_id)
-                    p = Piece(board_id, piece_data['id']) 
-                    p.path_index = piece_data['path_index']
-                    p.finished = piece_data['finished']
-                    player_pieces_list.append(p)
-                self.players.append(player_pieces_list)
-            
+            self.rebuild_occupancy()
             self.bots = self._init_bots()
             
             logging.info(f"Đã khôi phục game thành công. Lượt của P{self.turn + 1}.")
@@ -147,12 +204,42 @@ class GameManager:
             logging.exception(f"Lỗi nghiêm trọng khi áp dụng trạng thái đã tải: {e}")
             return False 
 
+    def _apply_pieces_state(self, saved_pieces_state):
+        """Bản lưu FinalState cũ: {'player_<slot>': [{'piece_id', 'path_index', 'finished'}]} hoặc list theo slot với 'id'."""
+        if isinstance(saved_pieces_state, dict):
+            saved_pieces_state = [saved_pieces_state.get(f'player_{slot}', []) for slot in range(len(saved_pieces_state))]
+        if len(saved_pieces_state) != self.num_players:
+            logging.error("Lỗi state quân cờ: sai số lượng người chơi.")
+            return False
+
+        # Ghi thẳng vào self.state qua các view Piece đã có sẵn
+        for slot_id in range(self.num_players):
+            for piece_data in saved_pieces_state[slot_id]:
+                p = self.players[slot_id][piece_data.get('id', piece_data.get('piece_id'))]
+                p.path_index = piece_data['path_index']
+                p.finished = piece_data['finished']
+        return True
+
+    def restore_state(self, state):
+        """
+        Thay trạng thái bằng bản sao của state (cùng số người chơi), dựng lại view Piece và chỉ mục ô.
+        Dùng cho engine headless (worker tìm kiếm, phát lại); view Piece cũ không còn trỏ vào state mới.
+        """
+        if state.num_players != self.num_players:
+            raise ValueError(f"State có {state.num_players} người chơi, GameManager có {self.num_players}")
+        self.state = state.copy()
+        self.players = self._init_players()
+        self.rebuild_occupancy()
+
+    def rebuild_occupancy(self):
+        """Dựng lại chỉ mục ô -> số quân sau khi state bị ghi từ bên ngoài (tải game, đồng bộ server)."""
+        self.occupancy.rebuild(self.state, self.player_map)
+
     def run_bot_turn(self):
-        dice_roll = random.randint(1, 6)
-        self.dice_value = dice_roll
-        
+        # Bot tự gieo bằng self.rng trong choose_move
         bot = self.bots[self.turn]
         piece_to_move = bot.choose_move()
+        dice_roll = self.dice_value
         
         if piece_to_move:
             kicked_piece_obj, just_finished, game_won = self.move_piece(piece_to_move) 
@@ -161,136 +248,184 @@ class GameManager:
             
             return ("đã di chuyển", kick_msg, dice_roll, just_finished, game_won)
         else:
-            self.last_move_info = {
-                "player_id": self.turn,
-                "dice": self.dice_value,
-                "piece_id": None,
-                "action": "cannot move"
-            }
-            if self.dice_value != 6:
-                self.next_turn()
-            return ("không thể đi", None, self.dice_value, False, False)
+            self.skip_move()
+            return ("không thể đi", None, dice_roll, False, False)
+
+    def skip_move(self):
+        """
+        Lần gieo không có nước đi (bot, người chơi, server): ghi log,
+        gieo được 6 thì gieo lại (xúc xắc về None), ngược lại chuyển lượt.
+        """
+        self.last_move_info = {
+            "player_id": self.turn,
+            "dice": self.dice_value,
+            "piece_id": None,
+            "action": "cannot move"
+        }
+        self.move_log.append(self.dice_value, None)
+        if self.dice_value != 6:
+            self.next_turn()
+        else:
+            self.dice_value = None
 
     def next_turn(self):
         self.turn = (self.turn + 1) % self.num_players
         self.dice_value = None
 
-    def _check_for_winner(self, player_id):
-        if not (0 <= player_id < len(self.players)):
-            return False
-        for piece in self.players[player_id]:
-            if not piece.finished:
-                return False
-        self.winner = player_id
-        logging.info(f"Người chơi {player_id + 1} đã chiến thắng!")
-        self.finish_game(player_id)
-        return True
-
     def get_movable_pieces(self, player_id, dice_value):
-        movable = []
-        
-        # SỬA: Dùng Board ID thực tế để lấy path_len
-        player_board_id = self.player_map.get(player_id, player_id) 
-        path_len = len(self.board.get_path_for_player(player_board_id)) 
-        last_cell_index = path_len - 1
-
-        for piece in self.players[player_id]:
-            if piece.finished:
-                continue
-            
-            if piece.path_index == -1 and dice_value == 6:
-                movable.append(piece)
-            
-            elif piece.path_index >= 0:
-                destination_index = piece.path_index + dice_value
-                if destination_index <= last_cell_index:
-                    movable.append(piece)
-        return movable
+        """Các quân của player_id đi được với dice_value (tra rules.MOVE_TABLE cho từng quân)."""
+        if dice_value not in (1, 2, 3, 4, 5, 6):
+            return []
+        table = rules.MOVE_TABLE[self.player_map.get(player_id, player_id)]
+        pieces = self.players[player_id]
+        state = self.state
+        finished = state.finished_mask >> (player_id * 4)
+        return [pieces[piece_id] for piece_id, path_index in enumerate(state.player_positions(player_id))
+                if table[(path_index + 1) * rules.DICE_SLOTS + dice_value] is not None and not finished >> piece_id & 1]
+
+    # --- NƯỚC ĐI CÓ THỂ HOÀN TÁC (dùng cho bot tìm kiếm, không lưu trữ / không log) ---
+    def apply_move(self, slot, piece_id):
+        """
+        Thực hiện nước đi hợp lệ của quân (slot, piece_id) với self.dice_value hiện tại,
+        gồm đá quân, về đích, thắng cuộc và chuyển lượt/xúc xắc.
+        Trả về bản ghi hoàn tác (tuple nhỏ) để truyền cho undo_move.
+        """
+        state = self.state
+        dice = state.dice_value
+        old_index = state.get_index(slot, piece_id)
+        if dice is None or dice == -1 or state.is_finished(slot, piece_id):
+            raise ValueError(f"Nước đi không hợp lệ: P{slot + 1} quân {piece_id + 1}, xúc xắc {dice}")
+        if old_index == -1:
+            if dice != 6:
+                raise ValueError(f"Quân {piece_id + 1} của P{slot + 1} cần gieo 6 để ra quân")
+            new_index = 0
+        else:
+            new_index = old_index + dice
+            if new_index > LAST_INDEX:
+                raise ValueError(f"Quân {piece_id + 1} của P{slot + 1} đi quá ô về đích")
+
+        old_turn = state.turn
+        old_winner = state.winner
+        board_id = self.player_map.get(slot, slot)
+
+        # 1. Di chuyển quân + cập nhật chỉ mục ô (chỉ 2 ô thay đổi)
+        state.set_index(slot, piece_id, new_index)
+        just_finished = new_index == LAST_INDEX
+        if just_finished:
+            state.set_finished(slot, piece_id, True)
+        self.occupancy.remove(rules.ring_cell_of(board_id, old_index), slot)
+        self.occupancy.add(rules.ring_cell_of(board_id, new_index), slot)
+
+        # 2. Đá quân (quân bị đá luôn đứng trên ô vòng ngoài = ô đích)
+        kicked = rules.kick_opponent(state, self.occupancy, self.player_map, slot, piece_id)
+        kicked_index = None
+        if kicked:
+            kicked_board_id = self.player_map.get(kicked[0], kicked[0])
+            kicked_index = rules.path_index_of_ring(kicked_board_id, rules.ring_cell_of(board_id, new_index))
+
+        # 3. Thắng cuộc / lượt tiếp theo
+        if just_finished and state.all_finished(slot):
+            state.winner = slot
+            state.dice_value = -1
+        elif dice == 6 or kicked is not None or just_finished:
+            state.dice_value = None
+        else:
+            state.turn = (old_turn + 1) % self.num_players
+            state.dice_value = None
+
+        return (slot, piece_id, old_index, kicked, kicked_index, old_turn, dice, old_winner)
+
+    def apply_pass(self):
+        """
+        Lượt gieo không có nước đi: gieo 6 thì gieo lại, ngược lại chuyển lượt.
+        Trả về bản ghi hoàn tác giống apply_move (piece_id = None).
+        """
+        state = self.state
+        record = (state.turn, None, None, None, None, state.turn, state.dice_value, state.winner)
+        if state.dice_value != 6:
+            state.turn = (state.turn + 1) % self.num_players
+        state.dice_value = None
+        return record
+
+    def undo_move(self, record):
+        """Khôi phục chính xác trạng thái trước apply_move / apply_pass (kể cả quân bị đá và hash)."""
+        slot, piece_id, old_index, kicked, kicked_index, old_turn, old_dice, old_winner = record
+        state = self.state
+        state.turn = old_turn
+        state.dice_value = old_dice
+        state.winner = old_winner
+        if piece_id is None:
+            return
+
+        board_id = self.player_map.get(slot, slot)
+        new_index = state.get_index(slot, piece_id)
+        if kicked:
+            kicked_slot, kicked_piece_id = kicked
+            state.set_index(kicked_slot, kicked_piece_id, kicked_index)
+            self.occupancy.add(rules.ring_cell_of(board_id, new_index), kicked_slot)
+        self.occupancy.remove(rules.ring_cell_of(board_id, new_index), slot)
+        self.occupancy.add(rules.ring_cell_of(board_id, old_index), slot)
+        state.set_finished(slot, piece_id, False)
+        state.set_index(slot, piece_id, old_index)
 
-    # --- SỬA LỖI TRỌNG TÂM TRONG MOVE_PIECE (KHẮC PHỤC ÁNH XẠ ĐƯỜNG ĐI) ---
     def move_piece(self, piece_to_move):
         if self.dice_value is None or self.dice_value == -1:
             logging.warning("Move_piece được gọi khi dice_value là None/GameOver")
             return (None, False, False)
 
+        if piece_to_move not in self.get_movable_pieces(piece_to_move.slot, self.dice_value):
+            logging.warning(f"Move_piece: quân {piece_to_move.id + 1} của P{piece_to_move.slot + 1} không đi được với {self.dice_value}")
+            return (None, False, None)
+
         dice_rolled = self.dice_value
-        
-        # 1. LẤY BOARD ID THỰC TẾ (Board ID: 0 hoặc 1)
-        player_board_id = self.player_map.get(piece_to_move.player_id, piece_to_move.player_id)
-        
-        # 2. Dùng Board ID THỰC TẾ để tính chiều dài đường đi
-        path_len = len(self.board.get_path_for_player(player_board_id))
-        
-        was_finished = piece_to_move.finished
         old_index = piece_to_move.path_index 
 
-        # 3. Thực hiện di chuyển với path_len ĐÚNG
-        piece_to_move.move(dice_rolled, path_len) 
-
-        new_index = piece_to_move.path_index 
-        just_finished_this_move = (not was_finished and piece_to_move.finished)
-
-        # 4. Truyền map vào hàm đá quân (giữ nguyên logic đã sửa)
-        kicked_piece_obj = rules.check_and_kick_opponent(
-            moving_piece=piece_to_move,
-            all_players_pieces=self.players,
-            board=self.board,
-            player_board_map=self.player_map
-        )
+        # Toàn bộ luật nằm ở apply_move (đi quân, đá quân, về đích, chuyển lượt)
+        record = self.apply_move(piece_to_move.slot, piece_to_move.id)
+        self.move_log.append(dice_rolled, piece_to_move.id)
+        kicked = record[3]
+        kicked_piece_obj = self.players[kicked[0]][kicked[1]] if kicked else None
+        just_finished_this_move = piece_to_move.finished
 
         self.last_move_info = {
             "player_id": piece_to_move.player_id,
             "dice": dice_rolled,
             "piece_id": piece_to_move.id,
             "from_index": old_index,
-            "to_index": new_index,
+            "to_index": piece_to_move.path_index,
             "action": "moved" if old_index >= 0 else "spawned",
             "kicked_piece": {"player_id": kicked_piece_obj.player_id} if kicked_piece_obj else None, 
             "finished": piece_to_move.finished
         }
 
-        game_has_winner = False
-        winner_id = None
-
-        if just_finished_this_move:
-            game_has_winner = self._check_for_winner(piece_to_move.player_id)
-            if game_has_winner:
-                winner_id = piece_to_move.player_id  # <-- Lưu đúng ID người thắng
-
-        # Các điều kiện cho lượt tiếp theo
-        if game_has_winner:
-            self.dice_value = -1
-        elif dice_rolled == 6 or kicked_piece_obj is not None or just_finished_this_move:
-            self.dice_value = None
-        else:
-            self.next_turn()
+        winner_id = self.winner
+        if winner_id is not None:
+            logging.info(f"Người chơi {winner_id + 1} đã chiến thắng!")
+            self.finish_game(winner_id)
 
         return (kicked_piece_obj, just_finished_this_move, winner_id)
 
 
 
     def get_destination_cell(self, piece, dice_value):
-        
-        # SỬA: Lấy Board ID thực tế của quân cờ
-        player_board_id = self.player_map.get(piece.player_id, piece.player_id) 
-        
-        if piece.path_index == -1 and dice_value == 6:
-            return self.board.get_spawn_cell(player_board_id) # SỬA: Dùng Board ID
-            
-        if piece.path_index >= 0:
-            path = self.board.get_path_for_player(player_board_id) # SỬA: Dùng Board ID
-            next_index = piece.path_index + dice_value
-            if next_index < len(path):
-                return path[next_index]
-        return None
+        """Ô lưới (x, y) mà piece sẽ tới với dice_value, None nếu không đi được."""
+        if dice_value not in (1, 2, 3, 4, 5, 6):
+            return None
+        player_board_id = self.player_map.get(piece.player_id, piece.player_id)
+        target = rules.MOVE_TABLE[player_board_id][rules.move_key(piece.path_index, dice_value)]
+        return target.cell if target is not None else None
 
     def find_piece_for_move(self, player_id, destination_cell):
-        """Tìm quân cờ có thể di chuyển đến ô đích."""
-        movable_pieces_list = self.get_movable_pieces(player_id, self.dice_value)
-        for piece in movable_pieces_list:
-            dest = self.get_destination_cell(piece, self.dice_value)
-            if dest == destination_cell:
-                return piece
+        """Tìm quân cờ có thể di chuyển đến ô đích (một lượt tra bảng cho 4 quân)."""
+        dice_value = self.dice_value
+        if dice_value not in (1, 2, 3, 4, 5, 6):
+            return None
+        table = rules.MOVE_TABLE[self.player_map.get(player_id, player_id)]
+        state = self.state
+        for piece_id, path_index in enumerate(state.player_positions(player_id)):
+            target = table[(path_index + 1) * rules.DICE_SLOTS + dice_value]
+            if target is not None and target.cell == destination_cell and not state.is_finished(player_id, piece_id):
+                return self.players[player_id][piece_id]
         return None
 
     def find_piece_by_id(self, player_id, piece_id):
@@ -0,0 +1,161 @@
+# core/movelog.py
+"""
+Nhật ký ván cờ dạng nhị phân và engine phát lại.
+
+Định dạng một log (little-endian):
+    MAGIC (4 byte) | seed (8) | num_players (1) | loại người chơi (1 byte/ghế) | board_id từng ghế (1 byte/ghế)
+    | GameState.to_bytes() lúc bắt đầu ghi (22 byte) | số lần gieo (4) | mỗi lần gieo 1 byte
+Một lần gieo = 1 byte: 3 bit thấp là xúc xắc (1..6), 3 bit tiếp theo là piece_id + 1 (0 = không đi được).
+Một ván 4 người (~500 lần gieo) chỉ khoảng nửa KB; nhiều log ghi nối tiếp vào một file bằng write_logs.
+
+Replay dựng lại vị trí sau bất kỳ lần gieo nào bằng cách chạy apply_move / apply_pass của
+GameManager headless, có checkpoint định kỳ để tua lùi/tới nhanh.
+"""
+import struct
+
+from core.state import GameState
+
+MAGIC = b'LDL1'
+HEADER = struct.Struct('<4sQB')
+COUNT = struct.Struct('<I')
+STATE_SIZE = 22
+
+# Loại người chơi -> mã 1 byte (giá trị lạ được ghi là 'human')
+PLAYER_TYPES = ('human', 'bot_easy', 'bot_hard', 'bot_expert', 'bot_mcts', 'bot_learned')
+CHECKPOINT_INTERVAL = 64
+
+
+def encode_ply(dice_value, piece_id):
+    return dice_value | ((0 if piece_id is None else piece_id + 1) << 3)
+
+
+def decode_ply(code):
+    """(dice_value, piece_id hoặc None nếu lượt đó không đi được)."""
+    piece = code >> 3
+    return code & 7, (None if piece == 0 else piece - 1)
+
+
+class MoveLog:
+    def __init__(self, seed, player_types, seating, initial_state):
+        self.seed = seed
+        self.player_types = list(player_types)
+        self.seating = list(seating)
+        self.initial_state = initial_state.to_bytes()
+        self.plies = bytearray()
+
+    @classmethod
+    def for_game(cls, gm):
+        """Log mới bắt đầu từ vị trí hiện tại của gm."""
+        seating = [gm.player_map.get(slot, slot) for slot in range(gm.num_players)]
+        return cls(gm.rng.seed, gm.player_types, seating, gm.state)
+
+    @property
+    def num_players(self):
+        return len(self.seating)
+
+    def __len__(self):
+        return len(self.plies)
+
+    def append(self, dice_value, piece_id):
+        self.plies.append(encode_ply(dice_value, piece_id))
+
+    def moves(self):
+        """Duyệt (dice_value, piece_id) theo thứ tự."""
+        for code in self.plies:
+            yield decode_ply(code)
+
+    # --- Nhị phân ---
+    def to_bytes(self):
+        types = bytes(PLAYER_TYPES.index(t) if t in PLAYER_TYPES else 0 for t in self.player_types)
+        return (HEADER.pack(MAGIC, self.seed & 0xFFFFFFFFFFFFFFFF, self.num_players) + types
+                + bytes(self.seating) + self.initial_state + COUNT.pack(len(self.plies)) + bytes(self.plies))
+
+    @classmethod
+    def from_bytes(cls, data, offset=0):
+        """Đọc một log tại offset. Trả về (MoveLog, offset ngay sau log)."""
+        magic, seed, num_players = HEADER.unpack_from(data, offset)
+        if magic != MAGIC:
+            raise ValueError("Dữ liệu không phải move log")
+        pos = offset + HEADER.size
+        types = [PLAYER_TYPES[code] if code < len(PLAYER_TYPES) else 'human' for code in data[pos:pos + num_players]]
+        pos += num_players
+        seating = list(data[pos:pos + num_players])
+        pos += num_players
+        initial_state = GameState.from_bytes(bytes(data[pos:pos + STATE_SIZE]))
+        pos += STATE_SIZE
+        (count,) = COUNT.unpack_from(data, pos)
+        pos += COUNT.size
+        log = cls(seed, types, seating, initial_state)
+        log.plies = bytearray(data[pos:pos + count])
+        return log, pos + count
+
+
+def write_logs(path, logs, append=True):
+    """Ghi nối tiếp nhiều log vào một file."""
+    with open(path, 'ab' if append else 'wb') as f:
+        for log in logs:
+            f.write(log.to_bytes())
+
+
+def read_logs(path):
+    """Duyệt các log trong file đã ghi bằng write_logs."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    offset = 0
+    while offset < len(data):
+        log, offset = MoveLog.from_bytes(data, offset)
+        yield log
+
+
+class Replay:
+    """
+    Phát lại một MoveLog trên GameManager headless.
+    seek(n) đưa bàn cờ về vị trí sau n lần gieo đầu tiên (0 = vị trí bắt đầu ghi).
+    """
+
+    def __init__(self, log, checkpoint_interval=CHECKPOINT_INTERVAL):
+        from core.game_manager import GameManager  # tránh import vòng (GameManager dùng MoveLog)
+
+        self.log = log
+        self.gm = GameManager(num_players=log.num_players, seed=log.seed)
+        self.gm.player_map = dict(enumerate(log.seating))  # ghế -> bàn cờ như lúc ghi
+        self.checkpoint_interval = checkpoint_interval
+        self._checkpoints = {0: GameState.from_bytes(log.initial_state)}
+        self.ply = 0
+        self.gm.restore_state(self._checkpoints[0])
+
+    @property
+    def state(self):
+        return self.gm.state
+
+    def __len__(self):
+        return len(self.log)
+
+    def add_checkpoint(self, ply, state):
+        """Thêm vị trí đã biết sau ply lần gieo (ví dụ snapshot trong bản lưu) để seek không phải phát lại từ đầu."""
+        self._checkpoints[ply] = state.copy()
+
+    def step(self):
+        """Đi tiếp một lần gieo. Trả về (dice_value, piece_id)."""
+        dice_value, piece_id = decode_ply(self.log.plies[self.ply])
+        gm = self.gm
+        gm.dice_value = dice_value
+        if piece_id is None:
+            gm.apply_pass()
+        else:
+            gm.apply_move(gm.turn, piece_id)
+        self.ply += 1
+        if self.ply % self.checkpoint_interval == 0 and self.ply not in self._checkpoints:
+            self._checkpoints[self.ply] = gm.state.copy()
+        return dice_value, piece_id
+
+    def seek(self, ply):
+        if not 0 <= ply <= len(self.log):
+            raise IndexError(f"Lần gieo {ply} nằm ngoài log (0..{len(self.log)})")
+        start = max(p for p in self._checkpoints if p <= ply)
+        if ply < self.ply or start > self.ply:
+            self.gm.restore_state(self._checkpoints[start])
+            self.ply = start
+        while self.ply < ply:
+            self.step()
+        return self.gm.state
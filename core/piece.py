@@ -1,10 +1,37 @@
-# core/piece.py
+from core.state import GameState
+
+
 class Piece:
-    def __init__(self, player_id, piece_id):
+    """
+    View mỏng trỏ vào một ô trong GameState.
+    path_index và finished được đọc/ghi trực tiếp trên mảng trạng thái nén,
+    nên mọi thay đổi qua Piece đều thấy ngay trong GameManager.state.
+    """
+    __slots__ = ('player_id', 'id', 'slot', 'state')
+
+    def __init__(self, player_id, piece_id, state=None, slot=None):
         self.player_id = player_id
         self.id = piece_id
-        self.path_index = -1  # -1 = còn trong chuồng
-        self.finished = False # Trạng thái đã về đích hay chưa
+        # Slot trong GameState (mặc định trùng player_id)
+        self.slot = player_id if slot is None else slot
+        # Quân cờ tạo riêng lẻ (không có GameManager) dùng một state riêng
+        self.state = state if state is not None else GameState(num_players=self.slot + 1)
+
+    @property
+    def path_index(self):
+        return self.state.get_index(self.slot, self.id)  # -1 = còn trong chuồng
+
+    @path_index.setter
+    def path_index(self, value):
+        self.state.set_index(self.slot, self.id, value)
+
+    @property
+    def finished(self):
+        return self.state.is_finished(self.slot, self.id)  # Trạng thái đã về đích hay chưa
+
+    @finished.setter
+    def finished(self, value):
+        self.state.set_finished(self.slot, self.id, value)
 
     # Trong file: core/piece.py
 
@@ -38,7 +65,6 @@ class Piece:
         return {
             "id": self.id,
             "player_id": self.player_id,
-            "position": self.position,
-            "state": self.state,
             "path_index": self.path_index,
+            "finished": self.finished,
         }
@@ -0,0 +1,75 @@
+# core/record.py
+"""
+Bản ghi ván dạng snapshot + delta cho tầng lưu trữ (thay cho FinalState đầy đủ mỗi lần lưu).
+
+Một bản ghi (dict 'Record' trong tài liệu ván) gồm:
+- base: MoveLog rỗng (seed, loại người chơi, ghế, vị trí bắt đầu ghi), không đổi trong cả ván;
+- plies: các lần gieo 1 byte/lần (core.movelog). Backend chỉ nối thêm phần chưa lưu;
+- snapshot: [ply, GameState.to_bytes()] (22 byte) của vị trí hiện tại. Backend chỉ giữ lại
+  mỗi SNAPSHOT_INTERVAL lần gieo (snapshot_due), khi kết thúc ván hoặc khi log không phát lại được;
+- turn, dice_value, rng, check (hash Zobrist vị trí hiện tại): vài chục byte, ghi đè mỗi lần lưu.
+Tải ván: phát lại các lần gieo sau snapshot gần nhất (rebuild); toàn bộ lịch sử nước đi
+xem lại được bằng replay().
+"""
+from core.movelog import MoveLog, Replay
+from core.state import GameState
+
+SNAPSHOT_INTERVAL = 64
+
+
+def capture(gm, mode, finished=False):
+    """Bản ghi vị trí hiện tại của gm (chỉ tham chiếu dữ liệu sẵn có, không sao chép trạng thái quân)."""
+    log = gm.move_log
+    base = MoveLog(log.seed, log.player_types, log.seating, GameState.from_bytes(log.initial_state))
+    return {
+        'num_players': gm.num_players,
+        'mode': mode,
+        'turn': gm.turn,
+        'dice_value': gm.dice_value,
+        'rng': gm.rng.to_dict(),
+        'base': base.to_bytes(),
+        'plies': bytes(log.plies),
+        'snapshot': [len(log), gm.state.to_bytes()],
+        'check': f"{gm.position_hash:016x}",
+        # Ván online nhận vị trí từ server, không qua log: luôn giữ snapshot
+        'replayable': not gm.is_online,
+        'finished': finished,
+    }
+
+
+def snapshot_due(ply, last_snapshot_ply, record):
+    """Backend có cần giữ snapshot của bản ghi này không (last_snapshot_ply: 0 nếu chưa có, base là ply 0)."""
+    if record.get('finished') or not record.get('replayable', True):
+        return ply != last_snapshot_ply
+    return ply - last_snapshot_ply >= SNAPSHOT_INTERVAL
+
+
+def load_log(record):
+    """MoveLog đầy đủ (base + mọi lần gieo) của bản ghi."""
+    log, _ = MoveLog.from_bytes(record['base'])
+    log.plies = bytearray(record['plies'])
+    return log
+
+
+def replay(record):
+    """Replay của cả ván, snapshot đã lưu dùng làm checkpoint."""
+    engine = Replay(load_log(record))
+    snapshot = record.get('snapshot')
+    if snapshot and 0 < snapshot[0] <= len(engine.log):
+        engine.add_checkpoint(snapshot[0], GameState.from_bytes(bytes(snapshot[1])))
+    return engine
+
+
+def rebuild(record):
+    """
+    (GameState, MoveLog) tại vị trí đã lưu: từ snapshot gần nhất phát lại các lần gieo sau nó.
+    Ném ValueError nếu vị trí dựng lại không khớp hash đã lưu.
+    """
+    engine = replay(record)
+    state = engine.seek(len(engine.log)).copy()
+    state.turn = record['turn']
+    state.dice_value = record['dice_value']
+    check = record.get('check')
+    if check and f"{state.zobrist:016x}" != check:
+        raise ValueError(f"Bản ghi hỏng: vị trí sau {len(engine.log)} lần gieo không khớp hash đã lưu")
+    return state, engine.log
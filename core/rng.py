@@ -0,0 +1,126 @@
+# core/rng.py
+"""
+Bộ sinh số ngẫu nhiên riêng của từng ván (GameManager.rng).
+
+- Seed được ghi vào bản lưu: cùng seed + cùng nước đi cho ra cùng ván (benchmark, phát lại).
+- Xúc xắc lấy từ bộ đệm sinh sẵn hàng loạt (NumPy nếu có, không thì random.Random),
+  mỗi lần gieo chỉ là một lần đọc list.
+- Luồng phụ (random/choice/getrandbits) cho lựa chọn của bot tách khỏi luồng xúc xắc,
+  nên bot đổi chiến thuật không làm lệch chuỗi xúc xắc.
+- Mỗi ván một đối tượng: các phòng trên server không còn chung trạng thái random toàn cục.
+"""
+import logging
+import random
+
+try:
+    import numpy as np
+except ImportError:  # engine vẫn chạy được khi không có NumPy
+    np = None
+
+DEFAULT_BUFFER = 4096
+AUX_STREAM = 1  # id luồng phụ khi tách seed
+_FACES = (1, 2, 3, 4, 5, 6)
+
+
+class GameRNG:
+    def __init__(self, seed=None, buffer_size=DEFAULT_BUFFER, use_numpy=True):
+        if seed is None:
+            seed = random.SystemRandom().getrandbits(63)
+        self.seed = seed
+        self.buffer_size = buffer_size
+        self.backend = 'numpy' if use_numpy and np is not None else 'python'
+        if self.backend == 'numpy':
+            self._dice_gen = np.random.default_rng([seed, 0])
+            self._aux_gen = np.random.default_rng([seed, AUX_STREAM])
+        else:
+            self._dice_gen = random.Random(seed)
+            self._aux_gen = random.Random(seed ^ (AUX_STREAM << 63))
+        self._dice, self._dice_pos = [], 0
+        self._aux, self._aux_pos = [], 0
+        self.rolls = 0      # số lần gieo đã dùng
+        self.aux_draws = 0  # số lần rút ở luồng phụ
+
+    # --- Bộ đệm ---
+    def _refill_dice(self):
+        if self.backend == 'numpy':
+            self._dice = self._dice_gen.integers(1, 7, size=self.buffer_size, dtype=np.int8).tolist()
+        else:
+            self._dice = self._dice_gen.choices(_FACES, k=self.buffer_size)
+        self._dice_pos = 0
+
+    def _refill_aux(self):
+        if self.backend == 'numpy':
+            self._aux = self._aux_gen.random(self.buffer_size).tolist()
+        else:
+            self._aux = [self._aux_gen.random() for _ in range(self.buffer_size)]
+        self._aux_pos = 0
+
+    # --- Xúc xắc ---
+    def roll(self):
+        """Gieo một lần (1..6)."""
+        if self._dice_pos >= len(self._dice):
+            self._refill_dice()
+        value = self._dice[self._dice_pos]
+        self._dice_pos += 1
+        self.rolls += 1
+        return value
+
+    def take(self, count):
+        """count lần gieo liên tiếp (cho mô phỏng cần cả loạt xúc xắc một lúc)."""
+        return [self.roll() for _ in range(count)]
+
+    # --- Luồng phụ cho bot ---
+    def random(self):
+        """Số thực trong [0, 1)."""
+        if self._aux_pos >= len(self._aux):
+            self._refill_aux()
+        value = self._aux[self._aux_pos]
+        self._aux_pos += 1
+        self.aux_draws += 1
+        return value
+
+    def choice(self, seq):
+        return seq[int(self.random() * len(seq))]
+
+    def getrandbits(self, k):
+        """k <= 52 bit ngẫu nhiên (dùng làm seed cho worker)."""
+        if k > 52:
+            raise ValueError("GameRNG.getrandbits chỉ hỗ trợ tối đa 52 bit")
+        return int(self.random() * (1 << k))
+
+    # --- Lưu / khôi phục ---
+    def to_dict(self):
+        return {'seed': self.seed, 'rolls': self.rolls, 'aux_draws': self.aux_draws,
+                'buffer_size': self.buffer_size, 'backend': self.backend}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Tạo lại RNG từ bản lưu và tua tới đúng vị trí cũ của hai luồng."""
+        backend = data.get('backend', 'numpy')
+        if backend == 'numpy' and np is None:
+            logging.warning("Bản lưu dùng RNG NumPy nhưng không có NumPy: chuỗi xúc xắc sau khi tải sẽ khác.")
+        rng = cls(data['seed'], data.get('buffer_size', DEFAULT_BUFFER), use_numpy=backend == 'numpy')
+        rng._skip_dice(data.get('rolls', 0))
+        rng._skip_aux(data.get('aux_draws', 0))
+        return rng
+
+    def _skip_dice(self, count):
+        self.rolls += count
+        while count:
+            if self._dice_pos >= len(self._dice):
+                self._refill_dice()
+            step = min(count, len(self._dice) - self._dice_pos)
+            self._dice_pos += step
+            count -= step
+
+    def _skip_aux(self, count):
+        self.aux_draws += count
+        while count:
+            if self._aux_pos >= len(self._aux):
+                self._refill_aux()
+            step = min(count, len(self._aux) - self._aux_pos)
+            self._aux_pos += step
+            count -= step
+
+    def __repr__(self):
+        return f"GameRNG(seed={self.seed}, rolls={self.rolls}, backend={self.backend})"
@@ -1,3 +1,9 @@
+from array import array
+from collections import namedtuple
+from itertools import combinations
+
+from core.board import Board, BASE_PATH, PATH_OFFSETS, RING_SIZE, HOME_LANE_START, PATH_LENGTH, LAST_INDEX
+
 SAFE_CELLS = [
     (1, 6),
     (8, 1),
@@ -5,80 +11,315 @@ SAFE_CELLS = [
     (6, 13)
 ]
 
-# --- HÀM CŨ NẰM TRONG core/rules.py ---
-def check_and_kick_opponent(moving_piece, all_players_pieces, board, player_board_map):
+# --- BẢNG TRA CỨU TÍNH SẴN ---
+# RING_CELL[board_id][path_index] -> id ô vòng ngoài toàn cục (0..51, là index trên BASE_PATH),
+# hoặc -1 nếu path_index nằm trên đường về đích (không ai đá được ở đó).
+RING_CELL = [
+    tuple((PATH_OFFSETS[board_id] + i) % RING_SIZE if i < HOME_LANE_START else -1
+          for i in range(PATH_LENGTH))
+    for board_id in range(len(PATH_OFFSETS))
+]
+
+# IS_SAFE_RING[ring_id] -> True nếu ô vòng ngoài đó là ô an toàn
+IS_SAFE_RING = tuple(cell in SAFE_CELLS for cell in BASE_PATH)
+# Cùng thông tin dạng bitboard: bit ring_id bật nếu ô đó an toàn (xem core.bitboard)
+SAFE_MASK = sum(1 << ring_id for ring_id, safe in enumerate(IS_SAFE_RING) if safe)
+
+
+# MOVE_TABLE[board_id][move_key(path_index, dice)] -> MoveTarget của nước đi, None nếu không hợp lệ
+# (còn trong chuồng mà không gieo 6, hoặc đi quá ô về đích). Sinh nước đi chỉ là tra bảng cho 4 quân.
+MoveTarget = namedtuple('MoveTarget', 'index cell ring enters_home_lane finishes safe')
+DICE_SLOTS = 7  # cột xúc xắc 1..6 (cột 0 bỏ trống)
+
+
+def move_key(path_index, dice_value):
+    return (path_index + 1) * DICE_SLOTS + dice_value
+
+
+def _build_move_table():
+    board = Board()
+    tables = []
+    for board_id in range(len(PATH_OFFSETS)):
+        path = board.get_path_for_player(board_id)
+        table = [None] * ((PATH_LENGTH + 1) * DICE_SLOTS)
+        for path_index in range(-1, PATH_LENGTH):
+            for dice_value in range(1, 7):
+                if path_index == -1:
+                    target = 0 if dice_value == 6 else None
+                else:
+                    target = path_index + dice_value if path_index + dice_value <= LAST_INDEX else None
+                if target is None:
+                    continue
+                ring = RING_CELL[board_id][target]
+                table[move_key(path_index, dice_value)] = MoveTarget(
+                    index=target, cell=path[target], ring=ring,
+                    enters_home_lane=path_index < HOME_LANE_START <= target,
+                    finishes=target == LAST_INDEX,
+                    safe=ring >= 0 and IS_SAFE_RING[ring])
+        tables.append(tuple(table))
+    return tuple(tables)
+
+
+MOVE_TABLE = _build_move_table()
+
+
+def ring_cell_of(board_id, path_index):
+    """Id ô vòng ngoài của quân ở path_index (-1 nếu còn trong chuồng hoặc ở đường về đích)."""
+    if path_index < 0:
+        return -1
+    return RING_CELL[board_id][path_index]
+
+
+def path_index_of_ring(board_id, ring_id):
+    """Ngược lại của RING_CELL: path_index trên đường của board_id đi qua ô vòng ngoài ring_id."""
+    return (ring_id - PATH_OFFSETS[board_id]) % RING_SIZE
+
+
+class CellOccupancy:
     """
-    Kiểm tra và đá quân đối thủ nếu nó đang đứng trên ô đích.
-    SỬA: Sử dụng player_board_map để ánh xạ vị trí đúng trong chế độ 2 người.
+    Chỉ mục số quân đứng trên từng ô vòng ngoài, tách theo người chơi.
+    counts[ring_id * 4 + slot] = số quân của slot trên ô ring_id.
+    Song song là bitboard 52 bit của từng người chơi (bit ring_id):
+    occupied[slot] = ô có >= 1 quân, towers[slot] = ô có "tháp" (>= 2 quân).
+    GameManager cập nhật chỉ mục này mỗi khi quân di chuyển / bị đá,
+    nhờ đó kiểm tra đá quân, tháp quân và ô an toàn chỉ là tra bảng / phép AND.
+    """
+    __slots__ = ('counts', 'occupied', 'towers')
+
+    SLOTS = 4
+
+    def __init__(self):
+        self.counts = bytearray(RING_SIZE * self.SLOTS)
+        self.occupied = [0] * self.SLOTS
+        self.towers = [0] * self.SLOTS
+
+    @classmethod
+    def from_state(cls, state, player_board_map):
+        occupancy = cls()
+        occupancy.rebuild(state, player_board_map)
+        return occupancy
+
+    def rebuild(self, state, player_board_map):
+        """Dựng lại toàn bộ chỉ mục từ GameState (sau khi tải game / đồng bộ từ server)."""
+        counts = self.counts
+        for i in range(len(counts)):
+            counts[i] = 0
+        self.occupied = [0] * self.SLOTS
+        self.towers = [0] * self.SLOTS
+        for slot in range(state.num_players):
+            ring = RING_CELL[player_board_map.get(slot, slot)]
+            for piece_id, path_index in enumerate(state.player_positions(slot)):
+                if path_index < 0 or state.is_finished(slot, piece_id):
+                    continue
+                cell = ring[path_index]
+                if cell >= 0:
+                    self.add(cell, slot)
+
+    def add(self, cell, slot):
+        if cell >= 0:
+            i = cell * self.SLOTS + slot
+            count = self.counts[i] + 1
+            self.counts[i] = count
+            if count == 1:
+                self.occupied[slot] |= 1 << cell
+            elif count == 2:
+                self.towers[slot] |= 1 << cell
+
+    def remove(self, cell, slot):
+        if cell >= 0:
+            i = cell * self.SLOTS + slot
+            count = self.counts[i] - 1
+            self.counts[i] = count
+            if count == 0:
+                self.occupied[slot] &= ~(1 << cell)
+            elif count == 1:
+                self.towers[slot] &= ~(1 << cell)
+
+    def count(self, cell, slot):
+        return self.counts[cell * self.SLOTS + slot] if cell >= 0 else 0
+
+    def opponents_at(self, cell, slot):
+        """Tổng số quân của các người chơi khác slot trên ô cell."""
+        if cell < 0:
+            return 0
+        base = cell * self.SLOTS
+        return sum(self.counts[base:base + self.SLOTS]) - self.counts[base + slot]
+
+    def is_tower(self, cell, slot):
+        """Ô cell có "tháp" (>= 2 quân) của slot hay không."""
+        return cell >= 0 and bool(self.towers[slot] >> cell & 1)
+
+    def copy(self):
+        clone = CellOccupancy.__new__(CellOccupancy)
+        clone.counts = bytearray(self.counts)
+        clone.occupied = list(self.occupied)
+        clone.towers = list(self.towers)
+        return clone
+
+
+# --- BẢN ĐỒ NGUY HIỂM (xác suất một ô bị đá ở lượt tới) ---
+# Một lượt gieo: d (1/6), 6 rồi d (1/36), 6-6-d (1/216), 6-6-6 (1/216, bỏ qua các lần gieo sau nữa).
+# Đối thủ có thể chia các lần gieo cho nhiều quân, nên quân cách ô k bước đá được ô đó nếu k là tổng
+# của một tập con các lần gieo; quân trong chuồng phải dùng một con 6 để ra quân trước.
+THREAT_REACH = 18       # khoảng cách xa nhất đá được (6 + 6 + 6)
+YARD_REACH = 12         # quân trong chuồng: ô xuất phát + tối đa 12 bước
+YARD_BIT = THREAT_REACH  # bit YARD_BIT + t - 1: có quân trong chuồng, ô cách ô xuất phát t bước
+
+
+def _subset_sums(rolls):
+    return {sum(c) for n in range(1, len(rolls) + 1) for c in combinations(rolls, n)}
+
+
+def _hit_mask(rolls):
+    mask = 0
+    for k in _subset_sums(rolls):
+        mask |= 1 << (k - 1)
+    if rolls[0] == 6 and len(rolls) > 1:
+        for t in _subset_sums(rolls[1:]):
+            mask |= 1 << (YARD_BIT + t - 1)
+    return mask
+
+
+# (xác suất, bitmask các khoảng cách đá được) cho mọi chuỗi gieo của một lượt
+THREAT_SEQUENCES = tuple(
+    [(1 / 6, _hit_mask((d,))) for d in range(1, 6)]
+    + [(1 / 36, _hit_mask((6, d))) for d in range(1, 6)]
+    + [(1 / 216, _hit_mask((6, 6, d))) for d in range(1, 6)]
+    + [(1 / 216, _hit_mask((6, 6, 6)))]
+)
+
+# THREAT_CONTRIB[board_id][path_index + 1] -> các (ô vòng ngoài, bit) mà quân ở path_index đe doạ
+THREAT_CONTRIB = []
+for _board_id in range(len(PATH_OFFSETS)):
+    _ring = RING_CELL[_board_id]
+    _contrib = [tuple((_ring[t], YARD_BIT + t - 1) for t in range(1, YARD_REACH + 1))]
+    for _index in range(PATH_LENGTH):
+        _contrib.append(tuple((_ring[_index + k], k - 1) for k in range(1, THREAT_REACH + 1)
+                              if _index < HOME_LANE_START and _index + k < HOME_LANE_START))
+    THREAT_CONTRIB.append(tuple(_contrib))
+
+
+class ThreatMap:
     """
+    Xác suất từng ô vòng ngoài bị mỗi người chơi đá trong lượt tới của họ.
+    masks[slot * RING_SIZE + cell] = bitmask khoảng cách (và ô sau chuồng) mà quân của slot
+    đang có tới ô đó, kèm bộ đếm để gỡ bỏ được; xác suất tra từ bitmask (có cache).
+    sync(state) chỉ cập nhật các quân đã đổi vị trí kể từ lần sync trước, nên gọi một lần
+    mỗi lần bot quyết định là đủ, không cần tính lại toàn bộ.
+    """
+    __slots__ = ('player_board_map', 'num_players', 'positions', 'counts', 'masks', 'probs', '_prob_cache', '_synced')
+
+    SLOTS = 4
+    BITS = YARD_BIT + YARD_REACH
+
+    def __init__(self, player_board_map):
+        self.player_board_map = player_board_map
+        self.num_players = 0
+        self.positions = array('b', [-2] * (self.SLOTS * 4))  # -2: chưa đồng bộ
+        self.counts = bytearray(self.SLOTS * RING_SIZE * self.BITS)
+        self.masks = [0] * (self.SLOTS * RING_SIZE)
+        self.probs = [0.0] * (self.SLOTS * RING_SIZE)
+        self._prob_cache = {0: 0.0}
+        self._synced = None  # bản sao state.positions ở lần sync trước
+
+    def _probability(self, mask):
+        prob = self._prob_cache.get(mask)
+        if prob is None:
+            prob = sum(p for p, hits in THREAT_SEQUENCES if hits & mask)
+            self._prob_cache[mask] = prob
+        return prob
+
+    def _update(self, slot, path_index, delta, dirty):
+        counts, masks = self.counts, self.masks
+        base = slot * RING_SIZE
+        for cell, bit in THREAT_CONTRIB[self.player_board_map.get(slot, slot)][path_index + 1]:
+            key = base + cell
+            i = key * self.BITS + bit
+            counts[i] += delta
+            if counts[i] == 0:
+                masks[key] &= ~(1 << bit)
+                dirty.add(key)
+            elif counts[i] == 1 and delta > 0:
+                masks[key] |= 1 << bit
+                dirty.add(key)
+
+    def sync(self, state):
+        """Đưa bản đồ về đúng state (chỉ xử lý các quân đã di chuyển)."""
+        if self._synced == state.positions and self.num_players == state.num_players:
+            return
+        self.num_players = state.num_players
+        dirty = set()
+        for i in range(state.num_players * 4):
+            old, new = self.positions[i], state.positions[i]
+            if old == new:
+                continue
+            slot = i // 4
+            if old != -2:
+                self._update(slot, old, -1, dirty)
+            self._update(slot, new, 1, dirty)
+            self.positions[i] = new
+        for key in dirty:
+            self.probs[key] = self._probability(self.masks[key])
+        self._synced = array('b', state.positions)
+
+    def threat(self, cell, slot):
+        """Xác suất quân của slot đứng ở ô cell bị ít nhất một đối thủ đá trước lượt sau của slot."""
+        if cell < 0 or IS_SAFE_RING[cell]:
+            return 0.0
+        safe = 1.0
+        for other in range(self.num_players):
+            if other != slot:
+                safe *= 1.0 - self.probs[other * RING_SIZE + cell]
+        return 1.0 - safe
 
-    moving_player_slot_id = moving_piece.player_id
-    # Lấy Board ID thực tế của quân đang di chuyển (ví dụ: 0 hoặc 2)
-    moving_player_board_id = player_board_map.get(moving_player_slot_id, moving_player_slot_id)
 
-    # 1. Lấy ô đích (sử dụng Board ID)
-    full_path = board.get_path_for_player(moving_player_board_id) # SỬA: Dùng Board ID
-    destination_cell = full_path[moving_piece.path_index]
+def kick_opponent(state, occupancy, player_board_map, slot, piece_id):
+    """
+    Phiên bản tra bảng của check_and_kick_opponent, làm việc trực tiếp trên GameState.
+    occupancy phải phản ánh vị trí mới của quân vừa đi.
+    Trả về (slot, piece_id) của quân bị đá (đã được đưa về chuồng) hoặc None.
+    """
+    # 1. Ô đích trên vòng ngoài (ô đường về đích không bao giờ bị đá)
+    destination = ring_cell_of(player_board_map.get(slot, slot), state.get_index(slot, piece_id))
+    if destination < 0:
+        return None
 
     # 2. Ô an toàn cố định -> không bị đá
-    if destination_cell in SAFE_CELLS:
+    bit = 1 << destination
+    if SAFE_MASK & bit:
         return None
-    
-    # --- BỔ SUNG LOGIC KHÔNG CHO CHỒNG QUÂN VÀ CHỈ ĐÁ MỘT QUÂN ---
-    # Logic Ludo chuẩn: Một ô chỉ có thể chứa 1 quân đối phương.
-    # Nếu đã có quân mình, quân đối phương không thể vào.
-    
-    # Kiểm tra số lượng quân mình tại ô đích (Nếu > 0, không được đá)
-    # Tuy nhiên, trong logic của bạn, quân cờ của bạn luôn di chuyển thành công trước khi đá.
-    # Ta chỉ cần kiểm tra quân đối thủ.
-    
-    # 3. Kiểm tra tất cả quân đối thủ
-    for opponent_pid_slot, opponent_pieces in enumerate(all_players_pieces):
-
-        if opponent_pid_slot == moving_piece.player_id:
-            continue  # không đá quân mình
-
-        # Lấy Board ID thực tế của đối thủ (ví dụ: 2 hoặc 0)
-        opponent_board_id = player_board_map.get(opponent_pid_slot, opponent_pid_slot) 
-        
-        # Đếm số lượng quân đối thủ đang đứng tại ô đích
-        opponents_on_destination = []
-        
-        for opponent_piece in opponent_pieces:
-
-            if opponent_piece.path_index < 0 or opponent_piece.finished:
-                continue
 
-            # Lấy đường đi đối thủ (sử dụng Board ID của đối thủ)
-            opponent_path = board.get_path_for_player(opponent_board_id) # SỬA: Dùng Board ID đối thủ
-            
-            # Kiểm tra an toàn: Quân đã vào đường về đích không bị đá
-            # Giả định đường về đích bắt đầu sau 51 ô trên đường chính.
-            if opponent_piece.path_index > len(board.path_grid) - 1:
-                 continue
-                 
-            opponent_cell = opponent_path[opponent_piece.path_index]
-
-            # 4. Nếu trùng ô
-            if opponent_cell == destination_cell:
-                opponents_on_destination.append(opponent_piece)
-        
-        # --- BỔ SUNG QUY TẮC CHỒNG QUÂN (Stacking Rule) ---
-        
-        # Nếu quân đối thủ >= 2 quân đang đứng cùng ô -> Ô đó an toàn (Không đá được)
-        if len(opponents_on_destination) >= 2:
-             # Đây là một "tháp" quân, không thể bị đá
-             return None 
-        
-        # Nếu có 1 quân đối thủ đứng ở đó -> Đá quân đó
-        if len(opponents_on_destination) == 1:
-            kicked_piece = opponents_on_destination[0]
-            
-            # Reset quân bị đá về chuồng
-            kicked_piece.path_index = -1
-            kicked_piece.finished = False
-
-            return kicked_piece
-
-    # 5. Không có quân nào bị đá
-    return None
\ No newline at end of file
+    # 3. Kiểm tra quân đối thủ theo thứ tự người chơi (bitboard: một phép AND mỗi người)
+    occupied = occupancy.occupied
+    for opponent_slot in range(state.num_players):
+        if opponent_slot == slot or not occupied[opponent_slot] & bit:
+            continue  # không đá quân mình / không có quân trên ô đích
+
+        # Nếu quân đối thủ >= 2 quân đang đứng cùng ô -> "tháp" quân, không đá được
+        if occupancy.towers[opponent_slot] & bit:
+            return None
+
+        # Có đúng 1 quân đối thủ -> quân đó đứng ở path_index suy ra từ ô, đá về chuồng
+        opponent_index = path_index_of_ring(player_board_map.get(opponent_slot, opponent_slot), destination)
+        opponent_piece_id = state.player_positions(opponent_slot).index(opponent_index)
+        state.reset_piece(opponent_slot, opponent_piece_id)
+        occupancy.remove(destination, opponent_slot)
+        return (opponent_slot, opponent_piece_id)
+
+    # 4. Không có quân nào bị đá
+    return None
+
+
+def check_and_kick_opponent(moving_piece, all_players_pieces, board, player_board_map):
+    """
+    Kiểm tra và đá quân đối thủ nếu nó đang đứng trên ô đích.
+    Giữ giao diện cũ (làm việc với Piece); logic nằm ở kick_opponent.
+    board được giữ lại cho tương thích, đường đi đã có trong bảng RING_CELL.
+    """
+    occupancy = CellOccupancy.from_state(moving_piece.state, player_board_map)
+    kicked = kick_opponent(moving_piece.state, occupancy, player_board_map,
+                           moving_piece.slot, moving_piece.id)
+    if kicked is None:
+        return None
+    kicked_slot, kicked_piece_id = kicked
+    return all_players_pieces[kicked_slot][kicked_piece_id]
@@ -0,0 +1,174 @@
+# core/simulator.py
+"""
+Bộ mô phỏng nhiều ván Ludo chạy song song bằng mảng NumPy.
+Mỗi bước (step) gieo xúc xắc cho MỌI ván chưa kết thúc cùng lúc, rồi tính
+quân đi được, chọn nước, đá quân, về đích và chuyển lượt bằng phép toán mảng,
+thay vì gọi GameManager.move_piece cho từng nước.
+Luật giống hệt GameManager + rules.kick_opponent:
+- ra quân khi gieo 6, về đích khi tới đúng index 56;
+- chỉ đá được 1 quân lẻ của đối thủ đầu tiên (theo thứ tự người chơi), "tháp" >= 2 quân chặn đá;
+- được đi tiếp khi gieo 6, đá quân hoặc về đích; gieo 6 mà không đi được thì gieo lại.
+Chính sách bot dùng chung tên loại người chơi của GameManager: 'bot_easy' (RandomBot), 'bot_hard' (HardBot).
+"""
+import numpy as np
+
+from core.board import HOME_LANE_START, LAST_INDEX
+from core import rules
+
+PIECES = 4
+POLICIES = ('bot_easy', 'bot_hard')
+
+# RING_TABLE[board_id, path_index + 1] -> id ô vòng ngoài (-1: chuồng / đường về đích)
+RING_TABLE = np.full((len(rules.RING_CELL), LAST_INDEX + 2), -1, dtype=np.int16)
+for _board_id, _ring in enumerate(rules.RING_CELL):
+    RING_TABLE[_board_id, 1:] = _ring
+# SAFE_TABLE[ring_id + 1] -> True nếu ô an toàn (ô -1 không an toàn nhưng cũng không đá được)
+SAFE_TABLE = np.zeros(len(rules.IS_SAFE_RING) + 1, dtype=bool)
+SAFE_TABLE[1:] = rules.IS_SAFE_RING
+
+
+def hard_bot_scores(current, new_index, dest_ring, opponents_on_dest):
+    """
+    Dạng vector hoá của HardBot._evaluate_move, bước 1-6 (bỏ bước 7 - bản đồ nguy hiểm - cho nhanh).
+    Mọi tham số có shape [G, 4] (G ván, 4 quân của người đang đi); trả về điểm [G, 4].
+    """
+    dest_safe = SAFE_TABLE[dest_ring + 1]
+    score = np.where(new_index == LAST_INDEX, 1000, 0)                          # 1. về đích
+    score += np.where(dest_safe, 0, 500 * opponents_on_dest)                   # 2. đá quân
+    score += np.where((new_index >= HOME_LANE_START) & (current < HOME_LANE_START), 100, 0)  # 3. vào đường về đích
+    score += np.where(current == -1, 50, 0)                                    # 4. ra quân
+    score += (new_index - current) * 2                                         # 5. tiến lên
+    score += np.where(dest_safe, 30, 0)                                        # 6. ô an toàn
+    return score
+
+
+class BatchSimulator:
+    """
+    Chạy num_games ván độc lập, mỗi ván num_players người chơi.
+    - policies: danh sách loại bot cho từng ghế ('bot_easy' hoặc 'bot_hard').
+    - seed: hạt giống cho numpy.random.Generator (kết quả tái lập được).
+    Kết quả sau run(): winners[g] (ghế thắng, -1 nếu chưa xong) và plies[g] (số lần gieo).
+    """
+
+    def __init__(self, num_games, num_players=4, policies=None, seed=None):
+        if not 2 <= num_players <= 4:
+            raise ValueError("num_players phải từ 2 đến 4")
+        policies = list(policies or ['bot_easy'] * num_players)
+        if len(policies) != num_players or any(p not in POLICIES for p in policies):
+            raise ValueError(f"policies phải gồm {num_players} phần tử thuộc {POLICIES}")
+
+        self.num_games = num_games
+        self.num_players = num_players
+        self.policies = policies
+        self.rng = np.random.default_rng(seed)
+
+        # Ghế i dùng Board ID i (giống player_map của GameManager)
+        self.seat_boards = np.arange(num_players)
+        self.seat_is_hard = np.array([p == 'bot_hard' for p in policies])
+
+        self.positions = np.full((num_games, num_players, PIECES), -1, dtype=np.int8)
+        self.turn = np.zeros(num_games, dtype=np.int8)
+        self.winners = np.full(num_games, -1, dtype=np.int8)
+        self.plies = np.zeros(num_games, dtype=np.int32)
+        self.captures = np.zeros((num_games, num_players), dtype=np.int32)
+
+    @property
+    def active(self):
+        return np.flatnonzero(self.winners < 0)
+
+    def step(self):
+        """Gieo một lần cho mọi ván chưa kết thúc. Trả về số ván còn đang chơi."""
+        games = self.active
+        if games.size == 0:
+            return 0
+        count = games.size
+        rows = np.arange(count)
+
+        turn = self.turn[games].astype(np.intp)
+        pos = self.positions[games].astype(np.int16)                 # [G, P, 4]
+        current = pos[rows, turn]                                    # [G, 4]
+        dice = self.rng.integers(1, 7, size=count, dtype=np.int16)   # [G]
+        dice_col = dice[:, None]
+
+        # --- Quân đi được và vị trí mới ---
+        in_yard = current == -1
+        movable = (in_yard & (dice_col == 6)) | ((current >= 0) & (current + dice_col <= LAST_INDEX))
+        new_index = np.where(in_yard, 0, current + dice_col)
+        new_index = np.where(movable, new_index, current)
+        has_move = movable.any(axis=1)
+
+        # --- Ô vòng ngoài của mọi quân, và của ô đích ---
+        ring_all = RING_TABLE[self.seat_boards[None, :, None], pos + 1]          # [G, P, 4]
+        my_board = self.seat_boards[turn][:, None]
+        dest_ring = RING_TABLE[my_board, new_index + 1]                          # [G, 4]
+        is_opponent = np.arange(self.num_players)[None, :] != turn[:, None]      # [G, P]
+
+        # --- Chọn nước ---
+        choice = np.argmax(np.where(movable, self.rng.random((count, PIECES)), -1.0), axis=1)
+        if self.seat_is_hard.any():
+            hard_games = np.flatnonzero(self.seat_is_hard[turn])
+            if hard_games.size:
+                opp_ring = np.where(is_opponent[hard_games, :, None], ring_all[hard_games], -1)
+                opp_ring = opp_ring.reshape(hard_games.size, 1, -1)              # [H, 1, P*4]
+                target = dest_ring[hard_games][:, :, None]                       # [H, 4, 1]
+                opponents_on_dest = ((opp_ring == target) & (target >= 0)).sum(axis=2)
+                scores = hard_bot_scores(current[hard_games], new_index[hard_games],
+                                         dest_ring[hard_games], opponents_on_dest)
+                scores = np.where(movable[hard_games], scores, np.iinfo(np.int32).min)
+                choice[hard_games] = np.argmax(scores, axis=1)
+
+        # --- Thực hiện nước đi ---
+        moved = np.flatnonzero(has_move)
+        mturn = turn[moved]
+        mchoice = choice[moved]
+        mnew = new_index[moved, mchoice]
+        pos[moved, mturn, mchoice] = mnew
+        just_finished = np.zeros(count, dtype=bool)
+        just_finished[moved] = mnew == LAST_INDEX
+
+        # --- Đá quân: đối thủ đầu tiên có quân trên ô đích; "tháp" chặn đá ---
+        kicked = np.zeros(count, dtype=bool)
+        target = dest_ring[moved, mchoice]
+        can_kick = (target >= 0) & ~SAFE_TABLE[target + 1]
+        if can_kick.any():
+            kg = moved[can_kick]
+            kt = target[can_kick]
+            hits = (ring_all[kg] == kt[:, None, None]) & is_opponent[kg][:, :, None]   # [K, P, 4]
+            per_seat = hits.sum(axis=2)                                               # [K, P]
+            occupied = per_seat > 0
+            first_seat = np.argmax(occupied, axis=1)
+            lone = occupied.any(axis=1) & (per_seat[np.arange(kg.size), first_seat] == 1)
+            if lone.any():
+                victims = kg[lone]
+                victim_seat = first_seat[lone]
+                victim_piece = np.argmax(hits[lone, victim_seat], axis=1)
+                pos[victims, victim_seat, victim_piece] = -1
+                kicked[victims] = True
+                self.captures[games[victims], turn[victims]] += 1
+
+        self.positions[games] = pos
+        self.plies[games] += 1
+
+        # --- Thắng cuộc ---
+        won = just_finished & (pos[rows, turn] == LAST_INDEX).all(axis=1)
+        self.winners[games[won]] = turn[won]
+
+        # --- Chuyển lượt ---
+        extra_turn = np.where(has_move, (dice == 6) | kicked | just_finished, dice == 6)
+        next_turn = np.where(extra_turn, turn, (turn + 1) % self.num_players)
+        self.turn[games] = next_turn
+        return int(np.count_nonzero(self.winners < 0))
+
+    def run(self, max_plies=5000):
+        """Chạy tới khi mọi ván kết thúc (hoặc đủ max_plies lần gieo). Trả về mảng winners."""
+        for _ in range(max_plies):
+            if self.step() == 0:
+                break
+        return self.winners
+
+    def win_rates(self):
+        """Tỉ lệ thắng của từng ghế trên các ván đã kết thúc."""
+        finished = self.winners[self.winners >= 0]
+        if finished.size == 0:
+            return np.zeros(self.num_players)
+        return np.bincount(finished, minlength=self.num_players) / finished.size
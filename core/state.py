@@ -0,0 +1,139 @@
+# core/state.py
+from array import array
+
+from core import zobrist
+
+MAX_SEATS = 4
+PIECES_PER_PLAYER = 4
+NUM_PIECES = MAX_SEATS * PIECES_PER_PLAYER  # 16 quân trên toàn bàn
+YARD_INDEX = -1  # path_index của quân còn trong chuồng
+
+
+class GameState:
+    """
+    Trạng thái ván cờ dạng nén, không chứa đối tượng Piece nào.
+    - positions: mảng int8 phẳng 16 phần tử, vị trí quân (slot, piece) nằm ở slot * 4 + piece.
+    - finished_mask: 16 bit, bit thứ slot * 4 + piece bật khi quân đó đã về đích.
+    - turn, dice_value, winner: giống các thuộc tính cùng tên của GameManager.
+    - zobrist: hash 64 bit (core.zobrist) của vị trí quân, bit về đích, lượt và xúc xắc,
+      được cập nhật tăng dần trong mọi setter bên dưới.
+    Sao chép trạng thái chỉ tốn một lần copy mảng 16 byte.
+    """
+    __slots__ = ('positions', 'finished_mask', 'num_players', '_turn', '_dice_value', 'winner', 'zobrist')
+
+    def __init__(self, num_players=4):
+        self.num_players = num_players
+        self.positions = array('b', [YARD_INDEX] * NUM_PIECES)
+        self.finished_mask = 0
+        self._turn = 0
+        self._dice_value = None
+        self.winner = None
+        self.zobrist = zobrist.compute_hash(self)
+
+    @property
+    def turn(self):
+        return self._turn
+
+    @turn.setter
+    def turn(self, value):
+        self.zobrist ^= zobrist.TURN_KEYS[self._turn] ^ zobrist.TURN_KEYS[value]
+        self._turn = value
+
+    @property
+    def dice_value(self):
+        return self._dice_value
+
+    @dice_value.setter
+    def dice_value(self, value):
+        self.zobrist ^= zobrist.dice_key(self._dice_value) ^ zobrist.dice_key(value)
+        self._dice_value = value
+
+    @staticmethod
+    def index_of(slot, piece_id):
+        return slot * PIECES_PER_PLAYER + piece_id
+
+    def get_index(self, slot, piece_id):
+        return self.positions[slot * PIECES_PER_PLAYER + piece_id]
+
+    def set_index(self, slot, piece_id, path_index):
+        i = slot * PIECES_PER_PLAYER + piece_id
+        keys = zobrist.PIECE_KEYS[i]
+        self.zobrist ^= keys[self.positions[i] + 1] ^ keys[path_index + 1]
+        self.positions[i] = path_index
+
+    def is_finished(self, slot, piece_id):
+        return bool(self.finished_mask >> (slot * PIECES_PER_PLAYER + piece_id) & 1)
+
+    def set_finished(self, slot, piece_id, finished):
+        i = slot * PIECES_PER_PLAYER + piece_id
+        bit = 1 << i
+        if bool(self.finished_mask & bit) != bool(finished):
+            self.finished_mask ^= bit
+            self.zobrist ^= zobrist.FINISHED_KEYS[i]
+
+    def reset_piece(self, slot, piece_id):
+        """Đưa quân về chuồng (dùng khi bị đá)."""
+        self.set_index(slot, piece_id, YARD_INDEX)
+        self.set_finished(slot, piece_id, False)
+
+    def player_positions(self, slot):
+        """Trả về bản sao 4 vị trí quân của một người chơi."""
+        start = slot * PIECES_PER_PLAYER
+        return self.positions[start:start + PIECES_PER_PLAYER]
+
+    def all_finished(self, slot):
+        nibble = (1 << PIECES_PER_PLAYER) - 1
+        return (self.finished_mask >> (slot * PIECES_PER_PLAYER)) & nibble == nibble
+
+    def copy(self):
+        clone = GameState.__new__(GameState)
+        clone.num_players = self.num_players
+        clone.positions = array('b', self.positions)
+        clone.finished_mask = self.finished_mask
+        clone._turn = self._turn
+        clone._dice_value = self._dice_value
+        clone.winner = self.winner
+        clone.zobrist = self.zobrist
+        return clone
+
+    def assign(self, other):
+        """Ghi đè trạng thái này bằng other tại chỗ (view Piece đang trỏ vào đối tượng này vẫn dùng được)."""
+        if other.num_players != self.num_players:
+            raise ValueError(f"State có {other.num_players} người chơi, cần {self.num_players}")
+        self.positions[:] = other.positions
+        self.finished_mask = other.finished_mask
+        self._turn = other._turn
+        self._dice_value = other._dice_value
+        self.winner = other.winner
+        self.zobrist = other.zobrist
+
+    # --- Chuyển sang/từ bytes (snapshot cho server hoặc worker mô phỏng) ---
+    def to_bytes(self):
+        """16 byte vị trí + 2 byte finished_mask + num_players, turn, dice, winner (mỗi thứ 1 byte)."""
+        dice = 0 if self.dice_value is None else self.dice_value
+        winner = -1 if self.winner is None else self.winner
+        header = array('b', [self.num_players, self.turn, dice, winner]).tobytes()
+        return self.positions.tobytes() + self.finished_mask.to_bytes(2, 'little') + header
+
+    @classmethod
+    def from_bytes(cls, data):
+        state = cls.__new__(cls)
+        state.positions = array('b')
+        state.positions.frombytes(data[:NUM_PIECES])
+        state.finished_mask = int.from_bytes(data[NUM_PIECES:NUM_PIECES + 2], 'little')
+        num_players, turn, dice, winner = array('b', data[NUM_PIECES + 2:NUM_PIECES + 6])
+        state.num_players = num_players
+        state._turn = turn
+        state._dice_value = None if dice == 0 else dice
+        state.winner = None if winner == -1 else winner
+        state.zobrist = zobrist.compute_hash(state)
+        return state
+
+    def __eq__(self, other):
+        if not isinstance(other, GameState):
+            return NotImplemented
+        return self.to_bytes() == other.to_bytes()
+
+    def __repr__(self):
+        return (f"GameState(turn={self.turn}, dice={self.dice_value}, "
+                f"positions={list(self.positions)}, finished={self.finished_mask:#06x})")
@@ -0,0 +1,30 @@
+# core/storage.py
+"""
+Điểm nối giữa engine và tầng lưu trữ.
+core không import Firebase; tầng ứng dụng (utils.firebase_manager) đăng ký
+adapter của mình qua set_default_storage() khi khởi động.
+Mặc định dùng NullStorage để server/worker mô phỏng chạy không cần mạng.
+"""
+
+
+class NullStorage:
+    """Adapter rỗng: không lưu gì, dùng cho engine chạy headless."""
+
+    def save_game_state(self, gm, winner_id=None, is_loadable=True):
+        return gm.match_id
+
+    def load_game_state(self, match_id):
+        return None
+
+
+_default_storage = NullStorage()
+
+
+def set_default_storage(storage):
+    """Đăng ký adapter lưu trữ dùng cho các GameManager tạo sau đó."""
+    global _default_storage
+    _default_storage = storage if storage is not None else NullStorage()
+
+
+def get_default_storage():
+    return _default_storage
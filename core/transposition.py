@@ -0,0 +1,122 @@
+# core/transposition.py
+"""
+Bảng chuyển vị (transposition table) có giới hạn kích thước, khoá bằng hash Zobrist
+của GameState. Dùng cho bot tìm kiếm và cache đánh giá nước đi.
+
+Bảng gồm 2^k bucket, mỗi bucket 2 entry. Chính sách thay thế (policy):
+- 'always':  dùng entry trống nếu có, không thì ghi đè entry đầu tiên của bucket.
+- 'depth':   chỉ ghi đè khi độ sâu mới >= độ sâu cũ, hoặc entry cũ thuộc lượt tìm kiếm trước.
+- 'two_tier': entry 0 giữ theo độ sâu ('depth'), entry 1 luôn ghi đè; entry bị đẩy khỏi
+             entry 0 được chuyển xuống entry 1.
+"""
+
+EXACT = 0        # giá trị chính xác
+LOWER_BOUND = 1  # giá trị thật >= value
+UPPER_BOUND = 2  # giá trị thật <= value
+
+POLICIES = ('always', 'depth', 'two_tier')
+
+
+class TTEntry:
+    __slots__ = ('key', 'depth', 'value', 'flag', 'move', 'generation')
+
+    def __init__(self, key, depth, value, flag, move, generation):
+        self.key = key
+        self.depth = depth
+        self.value = value
+        self.flag = flag
+        self.move = move
+        self.generation = generation
+
+    def __repr__(self):
+        return f"TTEntry(key={self.key:#018x}, depth={self.depth}, value={self.value}, flag={self.flag}, move={self.move})"
+
+
+class TranspositionTable:
+    def __init__(self, capacity=1 << 16, policy='two_tier'):
+        if policy not in POLICIES:
+            raise ValueError(f"policy phải thuộc {POLICIES}")
+        # Làm tròn số bucket lên lũy thừa của 2 để lấy index bằng phép AND
+        buckets = 1
+        while buckets * 2 < capacity:
+            buckets *= 2
+        self.policy = policy
+        self.mask = buckets - 1
+        self.slots = [None] * (buckets * 2)
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.replacements = 0
+
+    @property
+    def capacity(self):
+        return len(self.slots)
+
+    def __len__(self):
+        return sum(1 for entry in self.slots if entry is not None)
+
+    def new_search(self):
+        """Gọi khi bắt đầu một lần quyết định mới: entry cũ trở thành ứng viên bị thay thế."""
+        self.generation += 1
+
+    def clear(self):
+        self.slots = [None] * len(self.slots)
+        self.generation = 0
+        self.hits = self.misses = self.stores = self.replacements = 0
+
+    def get(self, key):
+        base = (key & self.mask) * 2
+        for entry in (self.slots[base], self.slots[base + 1]):
+            if entry is not None and entry.key == key:
+                self.hits += 1
+                return entry
+        self.misses += 1
+        return None
+
+    def store(self, key, depth, value, flag=EXACT, move=None):
+        base = (key & self.mask) * 2
+        slots = self.slots
+        self.stores += 1
+
+        # Cùng vị trí: cập nhật tại chỗ nếu không làm mất thông tin sâu hơn
+        for i in (base, base + 1):
+            entry = slots[i]
+            if entry is not None and entry.key == key:
+                if self.policy == 'always' or depth >= entry.depth or entry.generation != self.generation:
+                    entry.depth, entry.value, entry.flag = depth, value, flag
+                    entry.move, entry.generation = move, self.generation
+                return
+
+        new_entry = TTEntry(key, depth, value, flag, move, self.generation)
+        if self.policy == 'always':
+            self._put(base + 1 if slots[base] is not None and slots[base + 1] is None else base, new_entry)
+        elif self.policy == 'depth':
+            # Ưu tiên ô trống, rồi ô có độ sâu nhỏ hơn / cũ hơn
+            for i in (base, base + 1):
+                if slots[i] is None:
+                    slots[i] = new_entry
+                    return
+            victim = min((base, base + 1), key=lambda i: (slots[i].generation == self.generation, slots[i].depth))
+            old = slots[victim]
+            if old.generation != self.generation or depth >= old.depth:
+                self._put(victim, new_entry)
+        else:  # two_tier
+            old = slots[base]
+            if old is None or old.generation != self.generation or depth >= old.depth:
+                if old is not None:
+                    self._put(base + 1, old)
+                self._put(base, new_entry)
+            else:
+                self._put(base + 1, new_entry)
+
+    def _put(self, index, entry):
+        if self.slots[index] is not None:
+            self.replacements += 1
+        self.slots[index] = entry
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {'capacity': self.capacity, 'used': len(self), 'hits': self.hits, 'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'stores': self.stores, 'replacements': self.replacements}
@@ -0,0 +1,42 @@
+# core/zobrist.py
+"""
+Khoá Zobrist 64 bit cho GameState.
+Hash của một trạng thái = XOR khoá (quân, vị trí) của 16 quân, khoá bit về đích,
+khoá lượt đi và khoá giá trị xúc xắc đang chờ. GameState cập nhật hash tăng dần
+mỗi khi một trong các giá trị này đổi, nên so sánh hai trạng thái chỉ là so sánh một số nguyên.
+"""
+import random
+
+# Kích thước khớp với core.state (core.state import module này nên không import ngược lại)
+MAX_SEATS = 4
+NUM_PIECES = 16
+ZOBRIST_SEED = 0x4C55444F  # "LUDO" - cố định để hash giống nhau giữa các tiến trình
+NUM_POSITIONS = 58         # path_index -1..56
+
+_rng = random.Random(ZOBRIST_SEED)
+
+
+def _key():
+    return _rng.getrandbits(64)
+
+
+# PIECE_KEYS[piece_slot][path_index + 1] (piece_slot = slot * 4 + piece_id)
+PIECE_KEYS = tuple(tuple(_key() for _ in range(NUM_POSITIONS)) for _ in range(NUM_PIECES))
+FINISHED_KEYS = tuple(_key() for _ in range(NUM_PIECES))
+TURN_KEYS = tuple(_key() for _ in range(MAX_SEATS))
+# DICE_KEYS[dice_value + 1]: -1 (game over), None (chưa gieo, lưu ở index 1 như giá trị 0), 1..6
+DICE_KEYS = tuple(_key() for _ in range(8))
+
+
+def dice_key(dice_value):
+    return DICE_KEYS[(0 if dice_value is None else dice_value) + 1]
+
+
+def compute_hash(state):
+    """Tính lại hash từ đầu (dùng để kiểm tra hoặc sau khi ghi state hàng loạt)."""
+    h = TURN_KEYS[state.turn] ^ dice_key(state.dice_value)
+    for i, path_index in enumerate(state.positions):
+        h ^= PIECE_KEYS[i][path_index + 1]
+        if state.finished_mask >> i & 1:
+            h ^= FINISHED_KEYS[i]
+    return h
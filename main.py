@@ -7,4 +7,8 @@ if __name__ == "__main__":
     firebase_manager.initialize_firebase() 
     
     gui = LudoGUI()
-    gui.run()
+    try:
+        gui.run()
+    finally:
+        # Ghi nốt hàng đợi lưu và đồng bộ nốt lên Firebase trước khi thoát
+        firebase_manager.shutdown_sync()
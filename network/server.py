@@ -8,9 +8,9 @@ import string
 import traceback
 import logging
 from core.game_manager import GameManager
-from core.piece import Piece
 from network.protocol import *
 from utils.constants import MAX_PLAYERS
+from utils import firebase_manager
 
 # --- Cấu hình Logging ---
 logging.basicConfig(
@@ -449,7 +449,7 @@ def handle_client_thread(conn, addr):
                                         logging.warning("   Từ chối roll: Đã gieo rồi."); send_to_client(conn, {"type": MSG_TYPE_MOVE_INVALID, "payload": {"reason": "Đã gieo rồi."}}); continue
 
                                     try:
-                                        dice_roll = random.randint(1, 6); gm_instance.dice_value = dice_roll
+                                        dice_roll = gm_instance.rng.roll(); gm_instance.dice_value = dice_roll
                                         logging.info("   Room %s - P%d gieo %d", current_room_id, my_player_id + 1, dice_roll)
 
                                         # --- TÍNH TOÁN NƯỚC ĐI HỢP LỆ ---
@@ -480,10 +480,11 @@ def handle_client_thread(conn, addr):
 
                                         # Xử lý tự động chuyển lượt nếu không có nước đi
                                         if not movable_pieces:
-                                            # (Giữ nguyên logic chuyển lượt / reset xúc xắc như trước)
+                                            # skip_move: ghi log, chuyển lượt (khác 6) hoặc reset xúc xắc (gieo 6)
+                                            gm_instance.skip_move()
                                             if dice_roll != 6:
                                                 logging.info("   Không phải 6, chuẩn bị chuyển lượt...")
-                                                gm_instance.next_turn(); time.sleep(0.5)
+                                                time.sleep(0.5)
                                                 state_after_next = serialize_game_state_for_room(current_room_id)
                                                 if not state_after_next: raise ValueError("Serialize sau next_turn rỗng!")
                                                 broadcast_to_room(current_room_id, {"type": MSG_TYPE_GAME_STATE, "payload": state_after_next}) # Gửi state mới (dice=None)
@@ -492,7 +493,6 @@ def handle_client_thread(conn, addr):
                                                 broadcast_to_room(current_room_id, {"type": MSG_TYPE_YOUR_TURN, "payload": {"player_id": next_turn_player}})
                                             else:
                                                  logging.info("   Gieo 6 không đi được, reset xúc xắc...")
-                                                 gm_instance.dice_value = None
                                                  state_after_reset = serialize_game_state_for_room(current_room_id)
                                                  if not state_after_reset: raise ValueError("Serialize sau reset dice rỗng!")
                                                  broadcast_to_room(current_room_id, {"type": MSG_TYPE_GAME_STATE, "payload": state_after_reset}) # Gửi state mới (dice=None)
@@ -599,35 +599,40 @@ def handle_client_thread(conn, addr):
 # ... (Vòng lặp Server chính giữ nguyên) ...
 
 # --- Vòng lặp Server chính ---
-server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-try: # Thêm try-except cho bind
-    server_socket.bind((HOST, PORT))
-    server_socket.listen()
-    logging.info("✅ Server đang lắng nghe trên cổng %d...", PORT)
-
-    while True: # Vòng lặp chấp nhận kết nối
-        try:
-            conn, addr = server_socket.accept()
-            logging.info("Kết nối mới từ %s", addr[0])
-            thread = threading.Thread(target=handle_client_thread, args=(conn, addr), daemon=True)
-            thread.start()
-        except OSError as e: # Bắt lỗi khi server socket bị đóng (ví dụ khi Ctrl+C)
-             logging.warning("Lỗi accept: %s. Có thể server đang tắt.", e)
-             break # Thoát vòng lặp accept
-        except Exception as e:
-             logging.exception("Lỗi không mong muốn khi accept kết nối")
-
-except KeyboardInterrupt: logging.info("\nĐang tắt server...")
-except Exception as e: logging.exception("Lỗi nghiêm trọng ở vòng lặp server chính")
-finally:
-    logging.info("Đang đóng các kết nối client...")
-    with server_lock: all_conns = list(clients_room.keys())
-    for c in all_conns:
-        try: c.close()
-        except: pass
-    logging.info("Đang đóng socket server...")
-    server_socket.close()
-    logging.info("Server đã tắt.")
-    
-
+def main():
+    firebase_manager.initialize_firebase() # Đăng ký lưu trữ Firebase cho các GameManager của phòng
+    server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    try: # Thêm try-except cho bind
+        server_socket.bind((HOST, PORT))
+        server_socket.listen()
+        logging.info("✅ Server đang lắng nghe trên cổng %d...", PORT)
+
+        while True: # Vòng lặp chấp nhận kết nối
+            try:
+                conn, addr = server_socket.accept()
+                logging.info("Kết nối mới từ %s", addr[0])
+                thread = threading.Thread(target=handle_client_thread, args=(conn, addr), daemon=True)
+                thread.start()
+            except OSError as e: # Bắt lỗi khi server socket bị đóng (ví dụ khi Ctrl+C)
+                 logging.warning("Lỗi accept: %s. Có thể server đang tắt.", e)
+                 break # Thoát vòng lặp accept
+            except Exception as e:
+                 logging.exception("Lỗi không mong muốn khi accept kết nối")
+
+    except KeyboardInterrupt: logging.info("\nĐang tắt server...")
+    except Exception as e: logging.exception("Lỗi nghiêm trọng ở vòng lặp server chính")
+    finally:
+        logging.info("Đang đóng các kết nối client...")
+        with server_lock: all_conns = list(clients_room.keys())
+        for c in all_conns:
+            try: c.close()
+            except: pass
+        logging.info("Đang đóng socket server...")
+        server_socket.close()
+        logging.info("Server đã tắt.")
+
+
+if __name__ == "__main__":
+    # Pool tiến trình của bot MCTS khởi động bằng spawn: tiến trình con import lại module này
+    main()
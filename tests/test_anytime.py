@@ -0,0 +1,70 @@
+# tests/test_anytime.py
+"""Giao diện anytime: decide không để lại dấu vết trên ván, stop() trả lời ngay, luồng nền có RNG riêng."""
+import random
+import time
+
+from ai.anytime import AnytimeDecision
+from ai.expectimax_bot import ExpectimaxBot
+from ai.hard_bot import HardBot
+from ai.mcts_bot import MCTSBot
+from ai.random_bot import RandomBot
+from core.game_manager import GameManager
+
+
+def _midgame(seed):
+    gm = GameManager(num_players=3, player_types=['bot_easy'] * 3, seed=seed)
+    for _ in range(60):
+        if gm.winner is not None:
+            break
+        gm.run_bot_turn()
+    return gm
+
+
+def _bots(gm, slot):
+    return [RandomBot(slot, gm), HardBot(slot, gm), ExpectimaxBot(slot, gm, time_budget=0.02),
+            MCTSBot(slot, gm, time_budget=None, workers=1, max_iterations=30)]
+
+
+def test_decide_leaves_game_untouched():
+    gm = _midgame(1)
+    rng = random.Random(3)
+    for _ in range(6):
+        other = gm.state.copy()
+        for piece_id in range(4):
+            other.set_index(0, piece_id, rng.choice([-1, rng.randint(0, 50)]))
+        other.turn = 0
+        before, hash_before, dice_before = gm.state.to_bytes(), gm.state.zobrist, gm.dice_value
+        for bot in _bots(gm, 0):
+            for state in (gm.state, other):
+                dice = rng.randint(1, 6)
+                piece_id = bot.decide(state, dice)
+                gm_check = GameManager(num_players=3)
+                gm_check.restore_state(state)
+                legal = [piece.id for piece in gm_check.get_movable_pieces(0, dice)]
+                assert piece_id in legal if legal else piece_id is None
+                assert gm.state.to_bytes() == before and gm.state.zobrist == hash_before
+                assert gm.dice_value == dice_before
+
+
+def test_stop_returns_best_move_so_far():
+    gm = GameManager(num_players=2, seed=2)
+    for piece_id, path_index in enumerate([10, 20, 30, -1]):
+        gm.state.set_index(0, piece_id, path_index)
+    gm.rebuild_occupancy()
+    bot = ExpectimaxBot(0, gm, time_budget=30.0, max_depth=50)
+    dice = 3
+    rolls, draws = gm.rng.rolls, gm.rng.aux_draws
+    decision = AnytimeDecision(bot, gm, dice, time.perf_counter() + 30.0)
+    time.sleep(0.05)
+    start = time.perf_counter()
+    piece_id = decision.finish()
+    assert time.perf_counter() - start < 1.0
+    assert piece_id in [piece.id for piece in gm.get_movable_pieces(0, dice)]
+    # Luồng nền chỉ rút seed một lần từ luồng phụ, xúc xắc của ván không đổi
+    assert gm.rng.rolls == rolls and gm.rng.aux_draws == draws + 1
+
+    # stop() trước khi luồng kịp chạy vẫn có hiệu lực
+    decision = AnytimeDecision(bot, gm, dice, time.perf_counter() + 30.0)
+    decision.stop()
+    decision._thread.join(2.0)
+    assert decision.done and decision.best_move() is not None
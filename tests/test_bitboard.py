@@ -0,0 +1,76 @@
+# tests/test_bitboard.py
+"""BitBoard: các mặt nạ đá quân / bị chặn / ô đá được khớp với rules.kick_opponent trên GameManager."""
+import random
+
+import pytest
+
+from core import rules
+from core.bitboard import BitBoard, rotate
+from core.game_manager import GameManager
+
+
+def _scatter(gm, rng):
+    """Dồn quân vào ít ô để có đủ quân lẻ, tháp và ô có quân nhiều người."""
+    cells = rng.sample(range(52), 8)
+    for slot in range(gm.num_players):
+        board_id = gm.player_map.get(slot, slot)
+        for piece_id in range(4):
+            roll = rng.random()
+            path_index = -1 if roll < 0.1 else (rng.randint(51, 56) if roll < 0.2
+                                                else rules.path_index_of_ring(board_id, rng.choice(cells)))
+            gm.state.set_index(slot, piece_id, path_index)
+            gm.state.set_finished(slot, piece_id, path_index == 56)
+    gm.rebuild_occupancy()
+
+
+def _kicks_at(gm, slot, cell):
+    """Đặt tạm một quân của slot lên cell rồi hỏi rules.kick_opponent (trạng thái được khôi phục)."""
+    state, occupancy = gm.state.copy(), gm.occupancy.copy()
+    board_id = gm.player_map.get(slot, slot)
+    piece_id = 0
+    state.set_index(slot, piece_id, rules.path_index_of_ring(board_id, cell))
+    state.set_finished(slot, piece_id, False)
+    occupancy.rebuild(state, gm.player_map)
+    return rules.kick_opponent(state, occupancy, gm.player_map, slot, piece_id) is not None
+
+
+@pytest.mark.parametrize('num_players', [2, 3, 4])
+def test_masks_match_kick_opponent(num_players):
+    rng = random.Random(19 + num_players)
+    gm = GameManager(num_players=num_players)
+    for _ in range(60):
+        _scatter(gm, rng)
+        bits = BitBoard.from_state(gm.state, gm.player_map)
+        for slot in range(num_players):
+            kick, blocked, opponents = bits.kick_mask(slot), bits.blocked_mask(slot), bits.opponents(slot)
+            for cell in range(52):
+                if rules.path_index_of_ring(gm.player_map.get(slot, slot), cell) >= 51:
+                    continue  # ô ngay trước ô xuất phát: quân của slot rẽ vào đường về đích, không đứng được
+                expected = _kicks_at(gm, slot, cell)
+                assert bool(kick >> cell & 1) == expected
+                assert bool(blocked >> cell & 1) == (bool(opponents >> cell & 1) and not expected)
+
+
+@pytest.mark.parametrize('num_players', [2, 4])
+def test_capture_mask_matches_moves(num_players):
+    rng = random.Random(91 + num_players)
+    gm = GameManager(num_players=num_players)
+    for _ in range(150):
+        _scatter(gm, rng)
+        slot, dice = rng.randrange(num_players), rng.randint(1, 6)
+        gm.turn, gm.winner, gm.dice_value = slot, None, dice
+        expected = 0
+        for piece in gm.get_movable_pieces(slot, dice):
+            if piece.path_index < 0:
+                continue  # ra quân: ô xuất phát an toàn
+            record = gm.apply_move(slot, piece.id)
+            if record[3] is not None:
+                expected |= 1 << rules.ring_cell_of(gm.player_map.get(slot, slot), piece.path_index)
+            gm.undo_move(record)
+        assert BitBoard.from_state(gm.state, gm.player_map).capture_mask(slot, dice) == expected
+
+
+def test_rotate_wraps_around_the_ring():
+    assert rotate(1 << 51, 1) == 1
+    assert rotate(0b101, 52) == 0b101
+    assert rotate(1 << 50, 3) == 1 << 1
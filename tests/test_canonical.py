@@ -0,0 +1,105 @@
+# tests/test_canonical.py
+"""Dạng chuẩn: bất biến khi xoay ghế và hoán vị quân, và các thế cùng dạng chuẩn chơi tiếp như nhau."""
+import random
+
+from core import rules
+from core.canonical import canonical_hash, canonicalize, distinct_moves
+from core.game_manager import GameManager
+from core.state import GameState
+
+IDENTITY = {slot: slot for slot in range(4)}
+
+
+def _random_state(rng, num_players=4):
+    state = GameState(num_players)
+    for slot in range(num_players):
+        for piece_id in range(4):
+            path_index = rng.choice([-1, -1, 56] + list(range(56)))
+            state.set_index(slot, piece_id, path_index)
+            state.set_finished(slot, piece_id, path_index == 56)
+    state.turn = rng.randrange(num_players)
+    state.dice_value = rng.randint(1, 6)
+    return state
+
+
+def _transform(state, shift, perms):
+    """Ghế s -> ghế s + shift, quân i của ghế s -> quân perms[s][i]."""
+    num_players = state.num_players
+    out = GameState(num_players)
+    for slot in range(num_players):
+        target = (slot + shift) % num_players
+        for piece_id in range(4):
+            moved = perms[slot][piece_id]
+            out.set_index(target, moved, state.get_index(slot, piece_id))
+            out.set_finished(target, moved, state.is_finished(slot, piece_id))
+    out.turn = (state.turn + shift) % num_players
+    out.dice_value = state.dice_value
+    return out
+
+
+def _gm(state):
+    gm = GameManager(num_players=state.num_players)
+    gm.restore_state(state)
+    return gm
+
+
+def test_invariant_under_rotation_and_permutation():
+    rng = random.Random(16)
+    for _ in range(200):
+        state = _random_state(rng)
+        shift = rng.randrange(4)
+        perms = [rng.sample(range(4), 4) for _ in range(4)]
+        other = _transform(state, shift, perms)
+        assert canonicalize(other, IDENTITY).key == canonicalize(state, IDENTITY).key
+        assert canonical_hash(other, IDENTITY) == canonical_hash(state, IDENTITY)
+        # Xoay về cùng một ghế tương đối bất kỳ, không chỉ người đang đi
+        seat = rng.randrange(4)
+        assert (canonical_hash(other, IDENTITY, (seat + shift) % 4)
+                == canonical_hash(state, IDENTITY, seat))
+
+
+def test_distinct_positions_have_distinct_keys():
+    rng = random.Random(61)
+    seen = {}
+    for _ in range(500):
+        state = _random_state(rng)
+        form = canonicalize(state, IDENTITY)
+        assert canonicalize(form.to_state(), IDENTITY, 0).key == form.key
+        if form.key in seen:
+            assert canonical_hash(state, IDENTITY) == seen[form.key]
+        seen[form.key] = canonical_hash(state, IDENTITY)
+    assert len(set(seen.values())) == len(seen)
+
+
+def test_equivalent_positions_play_the_same():
+    rng = random.Random(7)
+    checked = 0
+    while checked < 150:
+        state = _random_state(rng)
+        shift = rng.randrange(4)
+        other = _transform(state, shift, [rng.sample(range(4), 4) for _ in range(4)])
+        gm, gm_other = _gm(state), _gm(other)
+        movable = gm.get_movable_pieces(state.turn, state.dice_value)
+        if not movable:
+            continue
+        # Cùng nước đi chuẩn trên hai thế tương đương cho hai thế mới vẫn tương đương
+        form, form_other = canonicalize(state, IDENTITY), canonicalize(other, IDENTITY)
+        piece = rng.choice(movable)
+        slot, slot_other = state.turn, other.turn
+        destination = rules.ring_cell_of(slot, 0 if piece.path_index == -1 else piece.path_index + state.dice_value)
+        if destination >= 0 and sum(1 for seat in range(4) if seat != slot
+                                    and gm.occupancy.count(destination, seat)) > 1:
+            continue  # quân của hai đối thủ chung ô: kick_opponent xét theo thứ tự ghế tuyệt đối
+        index = form.canonical_move(piece.id)
+        gm.apply_move(slot, form.original_move(index))
+        gm_other.apply_move(slot_other, form_other.original_move(index))
+        assert canonicalize(gm.state, IDENTITY, slot).key == canonicalize(gm_other.state, IDENTITY, slot_other).key
+        checked += 1
+
+
+def test_distinct_moves_skip_stacked_pieces():
+    state = GameState(2)
+    for piece_id, path_index in enumerate([10, 10, -1, 30]):
+        state.set_index(0, piece_id, path_index)
+    assert distinct_moves(state, 0, [0, 1, 3]) == [0, 3]
+    assert distinct_moves(state, 0, [1, 0, 2]) == [1, 2]
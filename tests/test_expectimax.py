@@ -0,0 +1,81 @@
+# tests/test_expectimax.py
+"""ExpectimaxBot: cắt tỉa Star1/Star2 + bảng chuyển vị cho cùng giá trị với expectiminimax vét cạn."""
+import random
+import time
+
+import pytest
+
+from ai.expectimax_bot import ExpectimaxBot
+from core.game_manager import GameManager
+
+
+def _brute_value(bot, depth):
+    """Expectiminimax không cắt tỉa, cùng hàm đánh giá (giá trị sau khi một nước đã đi)."""
+    gm = bot.gm
+    if gm.state.winner is not None or depth == 0:
+        return bot.evaluate()
+    total = 0.0
+    for dice in range(1, 7):
+        gm.state.dice_value = dice
+        slot = gm.state.turn
+        movable = gm.get_movable_pieces(slot, dice)
+        if not movable:
+            record = gm.apply_pass()
+            total += _brute_value(bot, depth - 1)
+            gm.undo_move(record)
+        else:
+            values = []
+            for piece in movable:
+                record = gm.apply_move(slot, piece.id)
+                values.append(_brute_value(bot, depth - 1))
+                gm.undo_move(record)
+            total += max(values) if slot == bot.player_id else min(values)
+        gm.state.dice_value = None
+    return total / 6
+
+
+def _random_position(gm, rng):
+    for slot in range(gm.num_players):
+        for piece_id in range(4):
+            path_index = rng.choice([-1, -1, 56] + list(range(0, 56)))
+            gm.state.set_index(slot, piece_id, path_index)
+            gm.state.set_finished(slot, piece_id, path_index == 56)
+    gm.rebuild_occupancy()
+
+
+@pytest.mark.parametrize('num_players', [2, 3])
+def test_search_matches_brute_force(num_players):
+    rng = random.Random(num_players)
+    gm = GameManager(num_players=num_players)
+    bot = ExpectimaxBot(0, gm, time_budget=None, max_depth=3)
+    checked = 0
+    while checked < 12:
+        _random_position(gm, rng)
+        gm.turn, gm.winner, gm.dice_value = 0, None, rng.randint(1, 6)
+        movable = gm.get_movable_pieces(0, gm.dice_value)
+        if len(movable) < 2:
+            continue
+        before, key = gm.state.copy(), gm.state.zobrist
+
+        piece_id = bot.search(gm.dice_value, time.perf_counter() + 60)
+        assert gm.state == before and gm.state.zobrist == key
+
+        values = {}
+        for piece in movable:
+            record = gm.apply_move(0, piece.id)
+            values[piece.id] = _brute_value(bot, bot.max_depth - 1)
+            gm.undo_move(record)
+        assert bot.last_search_depth == bot.max_depth
+        assert values[piece_id] == pytest.approx(max(values.values()))
+        checked += 1
+
+
+def test_takes_the_winning_move():
+    gm = GameManager(num_players=2)
+    for piece_id, path_index in enumerate([56, 40, 56, 53]):
+        gm.state.set_index(0, piece_id, path_index)
+        gm.state.set_finished(0, piece_id, path_index == 56)
+    gm.rebuild_occupancy()
+    gm.turn, gm.dice_value = 0, 3
+    bot = ExpectimaxBot(0, gm, time_budget=None, max_depth=3)
+    assert bot.search(3, time.perf_counter() + 60) == 3
@@ -0,0 +1,79 @@
+# tests/test_game_manager.py
+"""apply_move / apply_pass / undo_move của GameManager headless: hoàn tác trả về đúng vị trí, hash và chỉ mục ô."""
+import random
+
+import pytest
+
+from core import rules, zobrist
+from core.game_manager import GameManager
+
+
+def _occupancy(gm):
+    occupancy = gm.occupancy
+    return bytes(occupancy.counts), list(occupancy.occupied), list(occupancy.towers)
+
+
+def _playout(gm, rng, max_plies=3000):
+    """Chơi ngẫu nhiên; trước mỗi lần gieo thử apply -> undo mọi nước đi được."""
+    plies = 0
+    while gm.winner is None and plies < max_plies:
+        gm.dice_value = rng.randint(1, 6)
+        slot = gm.turn
+        movable = gm.get_movable_pieces(slot, gm.dice_value)
+        before, key, occupancy = gm.state.copy(), gm.position_hash, _occupancy(gm)
+        for piece in movable:
+            undo = gm.apply_move(slot, piece.id)
+            assert gm.state.zobrist == zobrist.compute_hash(gm.state)
+            gm.undo_move(undo)
+            assert gm.state == before
+            assert gm.position_hash == key
+            assert _occupancy(gm) == occupancy
+        if movable:
+            gm.apply_move(slot, rng.choice(movable).id)
+        else:
+            undo = gm.apply_pass()
+            gm.undo_move(undo)
+            assert gm.state == before and gm.position_hash == key
+            gm.apply_pass()
+        assert gm.state.zobrist == zobrist.compute_hash(gm.state)
+        assert _occupancy(gm) == _occupancy_from_scratch(gm)
+        plies += 1
+    return plies
+
+
+def _occupancy_from_scratch(gm):
+    occupancy = rules.CellOccupancy.from_state(gm.state, gm.player_map)
+    return bytes(occupancy.counts), list(occupancy.occupied), list(occupancy.towers)
+
+
+@pytest.mark.parametrize('num_players, seed', [(2, 1), (3, 7), (4, 11), (4, 2024)])
+def test_undo_restores_state_and_hash(num_players, seed):
+    gm = GameManager(num_players=num_players)
+    _playout(gm, random.Random(seed))
+    assert gm.winner is not None
+
+
+def test_undo_after_kick_restores_kicked_piece():
+    gm = GameManager(num_players=2)
+    board = [gm.player_map.get(slot, slot) for slot in range(2)]
+    # Quân 0 của P2 đứng trên ô vòng ngoài không an toàn, quân 0 của P1 đứng trước nó 3 ô
+    for target in range(1, 40):
+        cell = rules.ring_cell_of(board[1], target)
+        source = rules.path_index_of_ring(board[0], cell)
+        if not rules.IS_SAFE_RING[cell] and 3 <= source < 40:
+            break
+    gm.state.set_index(1, 0, target)
+    gm.state.set_index(0, 0, source - 3)
+    gm.rebuild_occupancy()
+    gm.state.turn = 0
+    gm.dice_value = 3
+    before, key, occupancy = gm.state.copy(), gm.position_hash, _occupancy(gm)
+
+    undo = gm.apply_move(0, 0)
+    assert undo[3] == (1, 0)
+    assert gm.state.get_index(1, 0) == -1
+    gm.undo_move(undo)
+    assert gm.state == before
+    assert gm.position_hash == key
+    assert _occupancy(gm) == occupancy
+
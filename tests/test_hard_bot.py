@@ -0,0 +1,68 @@
+# tests/test_hard_bot.py
+"""HardBot.evaluate_moves (bảng tính sẵn, một lượt cho 4 quân) so với chấm điểm trực tiếp từng nước."""
+import random
+
+from ai.hard_bot import HardBot
+from core import rules
+from core.board import Board
+from core.game_manager import GameManager
+
+BOARD = Board()
+
+
+def _direct_score(gm, slot, piece, dice, threats):
+    """Heuristic HardBot viết thẳng theo toạ độ ô (bước 1-6) cộng bản đồ nguy hiểm (bước 7)."""
+    board_id = gm.player_map.get(slot, slot)
+    path = BOARD.get_path_for_player(board_id)
+    new_index = 0 if piece.path_index == -1 else piece.path_index + dice
+    destination = path[new_index]
+    score = 1000 if new_index == 56 else 0
+    if destination not in rules.SAFE_CELLS:
+        for other, pieces in enumerate(gm.players):
+            if other == slot:
+                continue
+            other_path = BOARD.get_path_for_player(gm.player_map.get(other, other))
+            score += 500 * sum(1 for p in pieces if 0 <= p.path_index < 51 and other_path[p.path_index] == destination)
+    if new_index >= 51 and piece.path_index < 51:
+        score += 100
+    if piece.path_index == -1:
+        score += 50
+    score += (new_index - piece.path_index) * 2
+    if new_index < 51 and destination in rules.SAFE_CELLS:
+        score += 30
+
+    ring = rules.ring_cell_of(board_id, new_index)
+    mine = [rules.ring_cell_of(board_id, p.path_index) for p in gm.players[slot] if not p.finished]
+    if ring >= 0 and ring not in mine:
+        score -= HardBot.DANGER_WEIGHT * threats.threat(ring, slot)
+    current = rules.ring_cell_of(board_id, piece.path_index)
+    if current >= 0 and mine.count(current) == 1:
+        score += HardBot.DANGER_WEIGHT * threats.threat(current, slot)
+    return score
+
+
+def test_evaluate_moves_matches_direct_scoring():
+    rng = random.Random(12)
+    for num_players in (2, 3, 4):
+        gm = GameManager(num_players=num_players)
+        bots = [HardBot(slot, gm) for slot in range(num_players)]
+        for _ in range(150):
+            for slot in range(num_players):
+                for piece_id in range(4):
+                    path_index = rng.choice([-1, 56] + list(range(56)))
+                    gm.state.set_index(slot, piece_id, path_index)
+                    gm.state.set_finished(slot, piece_id, path_index == 56)
+            gm.rebuild_occupancy()
+            threats = rules.ThreatMap(gm.player_map)
+            threats.sync(gm.state)
+            slot, dice = rng.randrange(num_players), rng.randint(1, 6)
+            scores = bots[slot].evaluate_moves(dice)
+            movable = {piece.id for piece in gm.get_movable_pieces(slot, dice)}
+            for piece in gm.players[slot]:
+                if piece.id not in movable:
+                    assert scores[piece.id] is None
+                    continue
+                expected = _direct_score(gm, slot, piece, dice, threats)
+                assert abs(scores[piece.id] - expected) < 1e-9
+                new_index = 0 if piece.path_index == -1 else piece.path_index + dice
+                assert bots[slot]._evaluate_move(piece, new_index) == scores[piece.id]
@@ -0,0 +1,47 @@
+# tests/test_headless.py
+"""Engine chạy được không cần pygame / Firebase; lưu trữ đi qua adapter của core.storage."""
+import os
+import subprocess
+import sys
+
+from core import storage
+from core.game_manager import GameManager
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_engine_imports_without_ui_or_firebase():
+    code = ("import sys, core.game_manager, core.board, core.rules\n"
+            "print(','.join(m for m in ('pygame', 'pygame_gui', 'firebase_admin', 'pyrebase') if m in sys.modules))")
+    out = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == ''
+
+
+class RecordingStorage:
+    def __init__(self):
+        self.saves = []
+
+    def save_game_state(self, gm, winner_id=None, is_loadable=True):
+        self.saves.append((winner_id, is_loadable))
+        return 'm1'
+
+    def load_game_state(self, match_id):
+        return None
+
+
+def test_storage_adapter_is_pluggable():
+    gm = GameManager(num_players=2)
+    assert isinstance(gm.storage, storage.NullStorage)
+    gm.save_current_state()  # không làm gì, không cần mạng
+
+    recorder = RecordingStorage()
+    storage.set_default_storage(recorder)
+    try:
+        gm = GameManager(num_players=2)
+        gm.save_current_state()
+        gm.finish_game(1)
+    finally:
+        storage.set_default_storage(None)
+    assert recorder.saves == [(None, True), (1, False)]
+    assert isinstance(storage.get_default_storage(), storage.NullStorage)
+    assert GameManager(num_players=2, storage_backend=recorder).storage is recorder
@@ -0,0 +1,86 @@
+# tests/test_history.py
+"""firebase_manager: lưu / tải qua hàng ghi và lịch sử phân trang gộp bản cục bộ với Firestore (giả)."""
+import pytest
+
+from core import record
+from core.game_manager import GameManager
+from utils import firebase_manager
+from utils.fake_firestore import FakeFirestoreClient
+from utils.sqlite_backend import SQLiteBackend
+
+
+@pytest.fixture
+def local(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / 'history.db'))
+    firebase_manager.set_local_backend(backend)
+    yield backend
+    firebase_manager.shutdown_save_queue()
+    firebase_manager.set_local_backend(None)
+    backend.close()
+
+
+def _doc(i):
+    return {'is_loadable': i % 3 == 0, 'NumPlayers': 2, 'Mode': 'Bot',
+            'StartTime': f'2026-{1 + i % 5:02d}-01 10:00:00'}  # nhiều ván trùng StartTime
+
+
+def _all_pages(limit):
+    seen, cursor, sizes = [], None, []
+    while True:
+        page, cursor = firebase_manager.get_match_history_page(cursor, limit=limit)
+        seen += page
+        sizes.append(len(page))
+        if cursor is None:
+            return seen, sizes
+
+
+def test_save_then_load_rebuilds_position(local):
+    gm = GameManager(num_players=2, player_types=['bot_easy', 'bot_easy'], seed=3)
+    for ply in range(150):
+        if gm.winner is not None:
+            break
+        gm.run_bot_turn()
+        if ply % 10 == 0:
+            firebase_manager.save_game_state(gm)  # các lần lưu liên tiếp: chỉ nối thêm lần gieo mới
+    match_id = firebase_manager.save_game_state(gm)
+
+    state, log = record.rebuild(firebase_manager.load_game_state(match_id))  # có thể còn trong hàng ghi
+    assert state == gm.state
+    assert firebase_manager.flush_saves(5.0)
+    state, log = record.rebuild(firebase_manager.load_game_state(match_id))  # đọc từ SQLite
+    assert state == gm.state and log.plies == gm.move_log.plies
+    assert [m['MatchID'] for m in firebase_manager.get_match_history()] == [match_id]
+
+
+def test_local_pages_have_no_duplicates_or_gaps(local):
+    local.save_many([(f'L{i:03d}', _doc(i), True) for i in range(95)])
+    seen, sizes = _all_pages(limit=10)
+    assert sizes == [10] * 9 + [5]
+    assert sorted(m['MatchID'] for m in seen) == [f'L{i:03d}' for i in range(95)]
+
+
+def test_merged_pages_have_no_duplicates_or_gaps(local, monkeypatch):
+    local.save_many([(f'L{i:03d}', _doc(i), True) for i in range(60)])
+    client = FakeFirestoreClient()
+    matches = client.collection('ludo_matches')
+    for i in range(0, 60, 4):            # bản trên Firestore của ván cục bộ (cùng id)
+        matches.document(f'L{i:03d}').set(dict(_doc(i), Version=1))
+    for i in range(25):                  # ván chỉ có trên Firestore
+        matches.document(f'R{i:03d}').set(dict(_doc(i * 7), Version=1))
+    local.track_deletes = True
+    assert local.delete_match('L004')    # đã xoá cục bộ, tombstone chưa đồng bộ
+    # Không khởi động luồng đồng bộ: Firestore giữ nguyên trong lúc duyệt các trang
+    monkeypatch.setattr(firebase_manager, '_remote_backend', firebase_manager.FirestoreBackend(client))
+
+    seen, sizes = _all_pages(limit=9)
+    ids = [m['MatchID'] for m in seen]
+    expected = {f'L{i:03d}' for i in range(60)} - {'L004'} | {f'R{i:03d}' for i in range(25)}
+    assert len(ids) == len(set(ids))
+    assert set(ids) == expected
+    keys = [(m['StartTime'], m['MatchID']) for m in seen]
+    assert keys == sorted(keys, reverse=True)
+
+
+def test_bad_cursor_is_rejected(local):
+    with pytest.raises(ValueError):
+        firebase_manager.get_match_history_page('!!bad')
@@ -0,0 +1,65 @@
+# tests/test_mcts.py
+"""MCTSBot: tìm kiếm không làm đổi vị trí, tái lập được theo seed và trả lời đúng hạn khi dùng pool."""
+import random
+import time
+
+import pytest
+
+from ai import mcts_bot
+from ai.mcts_bot import MCTSBot, run_search
+from core.game_manager import GameManager
+
+
+def _position(seed, num_players=3):
+    rng = random.Random(seed)
+    gm = GameManager(num_players=num_players)
+    for slot in range(num_players):
+        for piece_id in range(4):
+            gm.state.set_index(slot, piece_id, rng.choice([-1, rng.randint(0, 55)]))
+    gm.rebuild_occupancy()
+    gm.turn, gm.dice_value = 0, 6
+    return gm
+
+
+def test_search_restores_state_and_counts_visits():
+    gm = _position(1)
+    before, key = gm.state.copy(), gm.state.zobrist
+    stats, iterations = run_search(gm, time.monotonic() + 60, random.Random(7), max_iterations=150)
+    assert gm.state == before and gm.state.zobrist == key
+    assert iterations == 150 and sum(visits for visits, _ in stats.values()) == 150
+    legal = {piece.id for piece in gm.get_movable_pieces(0, 6)}
+    assert set(stats) <= legal and all(0 <= wins <= visits for visits, wins in stats.values())
+
+    again, _ = run_search(gm, time.monotonic() + 60, random.Random(7), max_iterations=150)
+    assert again == stats
+
+
+def test_in_process_bot_picks_most_visited_move():
+    gm = _position(2)
+    before = gm.state.copy()
+    bot = MCTSBot(0, gm, time_budget=None, workers=1, max_iterations=100)
+    piece_id = bot.search(None)
+    assert gm.state == before and bot.last_iterations == 100
+    assert bot.last_stats[piece_id][0] == max(visits for visits, _ in bot.last_stats.values())
+
+
+def test_pool_search_answers_before_deadline():
+    gm = _position(3)
+    bot = MCTSBot(0, gm, time_budget=0.3, workers=2)
+    try:
+        for _ in range(2):  # lần đầu pool có thể chưa khởi động xong
+            start = time.perf_counter()
+            piece_id = bot.search(start + bot.time_budget)
+            elapsed = time.perf_counter() - start
+            assert piece_id in {piece.id for piece in gm.get_movable_pieces(0, 6)}
+            assert bot.last_iterations > 0
+            assert elapsed < bot.time_budget + 0.25
+    finally:
+        mcts_bot.shutdown_pool()
+
+
+@pytest.fixture(autouse=True)
+def _no_nested_pool_flag():
+    mcts_bot.set_in_process(False)
+    yield
+    mcts_bot.set_in_process(False)
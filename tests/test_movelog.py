@@ -0,0 +1,64 @@
+# tests/test_movelog.py
+"""MoveLog nhị phân và Replay: đọc / ghi không mất gì, phát lại tới đúng vị trí kể cả khi xếp ghế khác."""
+import pytest
+
+from core.game_manager import GameManager
+from core.movelog import MoveLog, Replay, decode_ply, encode_ply, read_logs, write_logs
+
+
+def _play(gm, max_plies=400):
+    """Chơi ngẫu nhiên bằng gm.rng, ghi lại từng lần gieo vào log mới bắt đầu từ vị trí hiện tại."""
+    log = MoveLog.for_game(gm)
+    while gm.winner is None and len(log) < max_plies:
+        gm.dice_value = gm.rng.roll()
+        movable = gm.get_movable_pieces(gm.turn, gm.dice_value)
+        piece_id = gm.rng.choice(movable).id if movable else None
+        log.append(gm.dice_value, piece_id)
+        if piece_id is None:
+            gm.apply_pass()
+        else:
+            gm.apply_move(gm.turn, piece_id)
+    return log
+
+
+def test_ply_encoding():
+    for dice in range(1, 7):
+        for piece_id in (None, 0, 1, 2, 3):
+            code = encode_ply(dice, piece_id)
+            assert 0 <= code < 256 and decode_ply(code) == (dice, piece_id)
+
+
+def test_bytes_round_trip(tmp_path):
+    logs = [_play(GameManager(num_players=n, player_types=['bot_easy'] * n, seed=n)) for n in (2, 3, 4)]
+    path = str(tmp_path / 'games.bin')
+    write_logs(path, logs[:2], append=False)
+    write_logs(path, logs[2:])
+    for original, loaded in zip(logs, read_logs(path), strict=True):
+        assert loaded.to_bytes() == original.to_bytes()
+        assert (loaded.seed, loaded.player_types, loaded.seating) == (original.seed, original.player_types, original.seating)
+        assert list(loaded.moves()) == list(original.moves())
+    with pytest.raises(ValueError):
+        MoveLog.from_bytes(b'XXXX' + bytes(20))
+
+
+def test_replay_reaches_same_position():
+    gm = GameManager(num_players=4, seed=5)
+    log = _play(gm)
+    replay = Replay(log, checkpoint_interval=16)
+    assert replay.seek(len(log)) == gm.state
+    assert replay.state.zobrist == gm.position_hash
+    # Tua lùi qua checkpoint rồi tới lại cho cùng vị trí
+    middle = replay.seek(len(log) // 2).copy()
+    assert replay.seek(len(log)) == gm.state
+    assert replay.seek(len(log) // 2) == middle
+    with pytest.raises(IndexError):
+        replay.seek(len(log) + 1)
+
+
+def test_replay_uses_recorded_seating():
+    gm = GameManager(num_players=2, seed=8)
+    gm.player_map = {0: 0, 1: 2}  # hai người ngồi đối diện
+    gm.rebuild_occupancy()
+    log = _play(gm, max_plies=600)
+    assert log.seating == [0, 2]
+    assert Replay(log).seek(len(log)) == gm.state
@@ -0,0 +1,86 @@
+# tests/test_record.py
+"""Bản ghi snapshot + delta: dựng lại vị trí, khi nào giữ snapshot, và các khối lần gieo trên Firestore (giả)."""
+import pytest
+
+from core import record
+from core.game_manager import GameManager
+from utils.fake_firestore import FakeFirestoreClient, FakeWriteBatch
+from utils.firebase_manager import FirestoreBackend
+
+
+def _document(gm, finished=False):
+    return {'Record': record.capture(gm, 'Bot', finished), 'is_loadable': not finished, 'NumPlayers': gm.num_players,
+            'Mode': 'Bot', 'StartTime': '2026-05-01 10:00:00'}
+
+
+def _game(seed=8):
+    return GameManager(num_players=3, player_types=['bot_easy'] * 3, seed=seed)
+
+
+def test_rebuild_matches_live_game():
+    gm = _game()
+    for ply in range(300):
+        if gm.winner is not None:
+            break
+        gm.run_bot_turn()
+        if ply % 37 == 0:
+            rec = record.capture(gm, 'Bot')
+            state, log = record.rebuild(rec)
+            assert state == gm.state and log.plies == gm.move_log.plies
+            rec['snapshot'] = None  # không có snapshot: phát lại từ base
+            assert record.rebuild(rec)[0] == gm.state
+
+    rec = record.capture(gm, 'Bot')
+    rec['check'] = f"{gm.position_hash ^ 1:016x}"
+    with pytest.raises(ValueError):
+        record.rebuild(rec)
+
+
+def test_snapshot_due():
+    rec = {'replayable': True, 'finished': False}
+    assert not record.snapshot_due(record.SNAPSHOT_INTERVAL - 1, 0, rec)
+    assert record.snapshot_due(record.SNAPSHOT_INTERVAL + 5, 5, rec)
+    assert record.snapshot_due(3, 0, dict(rec, finished=True))
+    assert not record.snapshot_due(3, 3, dict(rec, finished=True))
+    assert record.snapshot_due(1, 0, dict(rec, replayable=False))
+
+
+def test_firestore_writes_only_new_chunks(monkeypatch):
+    written = []
+    original_set = FakeWriteBatch.set
+
+    def spy_set(batch, reference, data):
+        written.append((reference.collection_name, reference.id))
+        original_set(batch, reference, data)
+    monkeypatch.setattr(FakeWriteBatch, 'set', spy_set)
+
+    client = FakeFirestoreClient()
+    backend = FirestoreBackend(client)
+    size = FirestoreBackend.CHUNK_PLIES
+    gm = _game()
+    saved = 0
+    while gm.winner is None and len(gm.move_log) < 5 * size:
+        for _ in range(25):
+            if gm.winner is None:
+                gm.run_bot_turn()
+        written.clear()
+        backend.save_match('M1', _document(gm))
+        chunks = sorted(doc_id for name, doc_id in written if name != 'ludo_matches')
+        first, last = saved // size, (len(gm.move_log) - 1) // size
+        assert chunks == [f"{index:05d}" for index in range(first, last + 1)]
+        assert ('ludo_matches', 'M1') in written
+        assert 'plies' not in client.documents()['M1']['Record']  # tài liệu ván không chứa các lần gieo
+        saved = len(gm.move_log)
+    assert saved > 2 * size
+
+    loaded = backend.load_match('M1')
+    assert bytes(loaded['Record']['plies']) == bytes(gm.move_log.plies)
+    assert record.rebuild(loaded['Record'])[0] == gm.state
+
+    # Ván bắt đầu log mới ngắn hơn: các khối thừa bị xoá
+    other = _game(seed=9)
+    other.run_bot_turn()
+    backend.save_match('M1', _document(other), create=True)
+    assert bytes(backend.load_match('M1')['Record']['plies']) == bytes(other.move_log.plies)
+    assert backend.delete_match('M1')
+    assert all(not docs for name, docs in client._data.items())
@@ -0,0 +1,53 @@
+# tests/test_rng.py
+"""GameRNG: cùng seed cùng ván, lưu / khôi phục giữa chừng, luồng phụ không làm lệch xúc xắc."""
+import pytest
+
+from core.game_manager import GameManager
+from core.rng import GameRNG
+
+
+@pytest.mark.parametrize('use_numpy', [True, False])
+def test_same_seed_same_dice(use_numpy):
+    first = GameRNG(123, buffer_size=64, use_numpy=use_numpy)
+    second = GameRNG(123, buffer_size=64, use_numpy=use_numpy)
+    rolls = first.take(500)
+    assert rolls == second.take(500)
+    assert set(rolls) == {1, 2, 3, 4, 5, 6}
+    assert GameRNG(124, buffer_size=64, use_numpy=use_numpy).take(500) != rolls
+
+
+@pytest.mark.parametrize('use_numpy', [True, False])
+def test_resume_from_saved_position(use_numpy):
+    rng = GameRNG(7, buffer_size=32, use_numpy=use_numpy)
+    rng.take(45)
+    for _ in range(70):
+        rng.random()
+    restored = GameRNG.from_dict(rng.to_dict())
+    assert restored.take(100) == rng.take(100)
+    assert [restored.random() for _ in range(50)] == [rng.random() for _ in range(50)]
+
+
+def test_aux_stream_does_not_shift_dice():
+    plain = GameRNG(99)
+    busy = GameRNG(99)
+    rolls = []
+    for _ in range(200):
+        rolls.append(busy.roll())
+        busy.choice([0, 1, 2])          # bot đổi chiến thuật: rút thêm ở luồng phụ
+        busy.getrandbits(40)
+    assert rolls == plain.take(200)
+    with pytest.raises(ValueError):
+        busy.getrandbits(60)
+
+
+def test_seeded_games_replay_exactly():
+    def play(seed):
+        gm = GameManager(num_players=3, player_types=['bot_easy', 'bot_hard', 'bot_easy'], seed=seed)
+        plies = 0
+        while gm.winner is None and plies < 3000:
+            gm.run_bot_turn()
+            plies += 1
+        return gm.winner, gm.state.to_bytes(), gm.rng.rolls
+
+    assert play(2024) == play(2024)
+    assert play(2024) != play(2025)
@@ -0,0 +1,182 @@
+# tests/test_rules.py
+"""Bảng tra cứu của core.rules so với cách tính trực tiếp trên toạ độ ô của Board."""
+import random
+
+import pytest
+
+from core import rules
+from core.board import PATH_OFFSETS, RING_SIZE, Board
+from core.game_manager import GameManager
+from core.piece import Piece
+from core.state import GameState
+
+BOARD = Board()
+
+
+def _path_scan_kick(moving_piece, all_players_pieces, player_board_map):
+    """Cách đá quân cũ: so toạ độ ô trên đường đi của từng quân đối thủ."""
+    moving_board = player_board_map.get(moving_piece.player_id, moving_piece.player_id)
+    destination = BOARD.get_path_for_player(moving_board)[moving_piece.path_index]
+    if destination in rules.SAFE_CELLS:
+        return None
+    for slot, pieces in enumerate(all_players_pieces):
+        if slot == moving_piece.player_id:
+            continue
+        path = BOARD.get_path_for_player(player_board_map.get(slot, slot))
+        on_destination = [p for p in pieces
+                          if p.path_index >= 0 and not p.finished and p.path_index <= len(BOARD.path_grid) - 1
+                          and path[p.path_index] == destination]
+        if len(on_destination) >= 2:
+            return None
+        if len(on_destination) == 1:
+            return on_destination[0]
+    return None
+
+
+class _Table:
+    """Bàn cờ tối thiểu (state, quân, ánh xạ ghế) như GameManager dựng."""
+
+    def __init__(self, num_players):
+        self.num_players = num_players
+        self.state = GameState(num_players)
+        self.players = [[Piece(slot, i, state=self.state) for i in range(4)] for slot in range(num_players)]
+        self.player_map = {slot: slot for slot in range(num_players)}
+        self.occupancy = rules.CellOccupancy()
+
+    def rebuild_occupancy(self):
+        self.occupancy.rebuild(self.state, self.player_map)
+
+
+def _scatter(gm, rng):
+    """Đặt quân ngẫu nhiên, dồn nhiều quân vào ít ô để có cả đá quân lẫn tháp quân."""
+    cells = rng.sample(range(52), 6)
+    for slot in range(gm.num_players):
+        board_id = gm.player_map.get(slot, slot)
+        for piece_id in range(4):
+            roll = rng.random()
+            if roll < 0.15:
+                path_index = -1
+            elif roll < 0.25:
+                path_index = rng.randint(51, 56)
+            else:
+                path_index = (rng.choice(cells) - PATH_OFFSETS[board_id]) % RING_SIZE
+            gm.state.set_index(slot, piece_id, path_index)
+            gm.state.set_finished(slot, piece_id, path_index == 56)
+    gm.rebuild_occupancy()
+
+
+@pytest.mark.parametrize('num_players', [2, 3, 4])
+def test_kick_matches_path_scan(num_players):
+    rng = random.Random(num_players)
+    gm = _Table(num_players)
+    kicks = towers = 0
+    for _ in range(1500):
+        _scatter(gm, rng)
+        slot = rng.randrange(num_players)
+        mover = gm.players[slot][rng.randrange(4)]
+        if mover.path_index < 0:
+            continue
+        expected = _path_scan_kick(mover, gm.players, gm.player_map)
+        expected = None if expected is None else (expected.slot, expected.id)
+        before = gm.state.copy()
+        kicked = rules.check_and_kick_opponent(mover, gm.players, BOARD, gm.player_map)
+        assert (None if kicked is None else (kicked.slot, kicked.id)) == expected
+        if expected is not None:
+            kicks += 1
+            assert gm.state.get_index(*expected) == -1
+            gm.state.set_index(*expected, before.get_index(*expected))
+        else:
+            cell = rules.ring_cell_of(gm.player_map.get(slot, slot), mover.path_index)
+            towers += gm.occupancy.opponents_at(cell, slot) > 1
+        assert gm.state == before
+    assert kicks > 50 and towers > 0
+
+
+# --- Bản đồ nguy hiểm ---
+SEQUENCES = ([(1 / 6, (d,)) for d in range(1, 6)] + [(1 / 36, (6, d)) for d in range(1, 6)]
+             + [(1 / 216, (6, 6, d)) for d in range(1, 6)] + [(1 / 216, (6, 6, 6))])
+
+
+def _lands_on(board_id, path_index, rolls, cell):
+    """Quân ở path_index có dùng một phần các lần gieo (theo thứ tự) để dừng đúng ô cell được không."""
+    if not rolls:
+        return False
+    first, rest = rolls[0], rolls[1:]
+    if _lands_on(board_id, path_index, rest, cell):  # lần gieo này dành cho quân khác
+        return True
+    if path_index == -1:
+        return first == 6 and _lands_on(board_id, 0, rest, cell)
+    target = path_index + first
+    if target >= 51:
+        return False
+    return rules.RING_CELL[board_id][target] == cell or _lands_on(board_id, target, rest, cell)
+
+
+def _brute_threat(state, player_map, cell, slot):
+    if rules.IS_SAFE_RING[cell]:
+        return 0.0
+    safe = 1.0
+    for other in range(state.num_players):
+        if other == slot:
+            continue
+        board_id = player_map.get(other, other)
+        positions = [p for i, p in enumerate(state.player_positions(other)) if not state.is_finished(other, i)]
+        hit = sum(prob for prob, rolls in SEQUENCES
+                  if any(_lands_on(board_id, p, rolls, cell) for p in positions))
+        safe *= 1.0 - hit
+    return 1.0 - safe
+
+
+@pytest.mark.parametrize('num_players', [2, 4])
+def test_threat_map_matches_enumeration(num_players):
+    rng = random.Random(10 + num_players)
+    gm = GameManager(num_players=num_players)
+    threats = rules.ThreatMap(gm.player_map)
+    for _ in range(25):
+        _scatter(gm, rng)
+        threats.sync(gm.state)  # cập nhật tăng dần từ lần trước
+        fresh = rules.ThreatMap(gm.player_map)
+        fresh.sync(gm.state)
+        assert threats.masks == fresh.masks
+        for cell in range(52):
+            for slot in range(num_players):
+                expected = _brute_threat(gm.state, gm.player_map, cell, slot)
+                assert threats.threat(cell, slot) == pytest.approx(expected)
+
+
+# --- Bảng nước đi ---
+def test_move_table_matches_board_paths():
+    for board_id in range(4):
+        path = BOARD.get_path_for_player(board_id)
+        for path_index in range(-1, 57):
+            for dice in range(1, 7):
+                target = rules.MOVE_TABLE[board_id][rules.move_key(path_index, dice)]
+                if path_index == -1:
+                    expected = 0 if dice == 6 else None
+                else:
+                    expected = path_index + dice if path_index + dice <= 56 else None
+                if expected is None:
+                    assert target is None
+                    continue
+                assert target.index == expected and target.cell == path[expected]
+                assert target.ring == rules.ring_cell_of(board_id, expected)
+                assert target.finishes == (expected == 56)
+                assert target.enters_home_lane == (path_index < 51 <= expected)
+                assert target.safe == (expected < 51 and path[expected] in rules.SAFE_CELLS)
+
+
+def test_movable_pieces_match_piece_rules():
+    rng = random.Random(13)
+    gm = GameManager(num_players=4)
+    for _ in range(300):
+        _scatter(gm, rng)
+        slot, dice = rng.randrange(4), rng.randint(1, 6)
+        gm.dice_value = dice
+        expected = [p for p in gm.players[slot] if not p.finished
+                    and (p.path_index + dice <= 56 if p.path_index >= 0 else dice == 6)]
+        assert gm.get_movable_pieces(slot, dice) == expected
+        path = BOARD.get_path_for_player(gm.player_map.get(slot, slot))
+        for piece in expected:
+            cell = path[0 if piece.path_index == -1 else piece.path_index + dice]
+            assert gm.get_destination_cell(piece, dice) == cell
+            assert gm.find_piece_for_move(slot, cell) is not None
@@ -0,0 +1,88 @@
+# tests/test_save_queue.py
+"""WriteBehindQueue: gộp theo key, đọc lại bản đang chờ, bỏ khi đầy, thử lại khi ghi lỗi, flush / close."""
+import threading
+
+from utils.save_queue import WriteBehindQueue
+
+
+class _Writer:
+    """write_func ghi lại các lần gọi; chặn lần ghi đầu tiên tới khi release()."""
+
+    def __init__(self, fail=0):
+        self.calls = []
+        self.fail = fail
+        self.started = threading.Event()
+        self.gate = threading.Event()
+
+    def __call__(self, key, payload, create):
+        self.started.set()
+        self.gate.wait(5.0)
+        if self.fail:
+            self.fail -= 1
+            raise IOError("mất mạng")
+        self.calls.append((key, payload, create))
+
+
+def _blocked_queue(writer, **kwargs):
+    """Hàng có sẵn một lần ghi 'a' đang bị chặn, các submit sau đều nằm chờ."""
+    queue = WriteBehindQueue(writer, retry_delay=0.0, **kwargs)
+    queue.submit('a', 0, create=True)
+    assert writer.started.wait(5.0)
+    return queue
+
+
+def test_saves_of_one_key_coalesce():
+    writer = _Writer()
+    queue = _blocked_queue(writer)
+    assert queue.submit('b', 1, create=True)
+    assert queue.submit('b', 2)
+    assert queue.submit('b', 3)
+    assert queue.pending_payload('b') == 3
+    assert queue.pending_payload('a') == 0  # đang ghi vẫn đọc lại được
+    writer.gate.set()
+    assert queue.flush(5.0)
+    assert writer.calls == [('a', 0, True), ('b', 3, True)]  # create của lần đầu được giữ lại
+    stats = queue.stats()
+    assert stats['coalesced'] == 2 and stats['written'] == 2 and stats['depth'] == 0
+    assert queue.pending_payload('b') is None
+    assert queue.close()
+
+
+def test_full_queue_drops_new_keys_only():
+    writer = _Writer()
+    queue = _blocked_queue(writer, maxsize=2, put_timeout=0.01)
+    assert queue.submit('b', 1) and queue.submit('c', 1)
+    assert not queue.submit('d', 1)  # hàng đầy: ván mới bị bỏ
+    assert queue.submit('c', 2)      # lưu tiếp ván đang chờ luôn được
+    queue.discard('b')
+    writer.gate.set()
+    assert queue.close(5.0)
+    assert writer.calls == [('a', 0, True), ('c', 2, False)]
+    assert queue.stats()['dropped'] == 1
+    assert not queue.submit('e', 1)  # đã đóng
+
+
+def test_failed_write_is_retried():
+    writer = _Writer(fail=2)
+    writer.gate.set()
+    queue = WriteBehindQueue(writer, max_attempts=3, retry_delay=0.0)
+    queue.submit('a', 'x', create=True)
+    assert queue.flush(5.0)
+    assert writer.calls == [('a', 'x', True)]
+
+    writer.fail = 5
+    queue.submit('b', 'y')
+    assert queue.flush(5.0)
+    assert ('b', 'y', False) not in writer.calls
+    assert queue.stats()['failed'] == 1
+    queue.close()
+
+
+def test_newer_save_keeps_create_of_failed_write():
+    writer = _Writer(fail=1)
+    queue = _blocked_queue(writer, max_attempts=1)
+    queue.submit('a', 1)  # bản mới hơn tới trong lúc lần tạo đang ghi (và sẽ lỗi)
+    writer.gate.set()
+    assert queue.flush(5.0)
+    assert writer.calls == [('a', 1, True)]
+    queue.close()
@@ -0,0 +1,62 @@
+# tests/test_simulator.py
+"""BatchSimulator: mỗi lần gieo của mọi ván là một nước đi hợp lệ theo GameManager."""
+import numpy as np
+import pytest
+
+from core.game_manager import GameManager
+from core.simulator import BatchSimulator
+
+
+def _load(gm, positions, turn, dice):
+    for slot in range(gm.num_players):
+        for piece_id in range(4):
+            piece = gm.players[slot][piece_id]
+            piece.path_index = int(positions[slot, piece_id])
+            piece.finished = piece.path_index == 56
+    gm.rebuild_occupancy()
+    gm.turn, gm.winner, gm.dice_value = turn, None, dice
+
+
+def _outcomes(gm, positions, turn):
+    """Mọi (vị trí, lượt, người thắng) có thể sau một lần gieo từ positions (mọi mặt xúc xắc, mọi quân)."""
+    outcomes = set()
+    for dice in range(1, 7):
+        _load(gm, positions, turn, dice)
+        movable = [piece.id for piece in gm.get_movable_pieces(turn, dice)]
+        if not movable:  # gieo 6 mà không đi được thì gieo lại
+            outcomes.add((bytes(gm.state.positions), turn if dice == 6 else (turn + 1) % gm.num_players, -1))
+        for piece_id in movable:
+            _load(gm, positions, turn, dice)
+            _, _, winner = gm.move_piece(gm.players[turn][piece_id])
+            outcomes.add((bytes(gm.state.positions), gm.turn, -1 if winner is None else winner))
+    return outcomes
+
+
+def _as_state_bytes(positions, num_players):
+    flat = np.full(16, -1, dtype=np.int8)
+    flat[:num_players * 4] = positions.reshape(-1)
+    return flat.tobytes()
+
+
+@pytest.mark.parametrize('num_players, policy', [(2, 'bot_easy'), (3, 'bot_hard'), (4, 'bot_hard')])
+def test_every_step_is_a_legal_move(num_players, policy):
+    sim = BatchSimulator(12, num_players, [policy] * num_players, seed=num_players)
+    gm = GameManager(num_players=num_players)
+    for _ in range(100):
+        games = sim.active
+        before = sim.positions[games].copy(), sim.turn[games].copy()
+        sim.step()
+        for row, g in enumerate(games):
+            result = (_as_state_bytes(sim.positions[g], num_players), int(sim.turn[g]), int(sim.winners[g]))
+            assert result in _outcomes(gm, before[0][row], int(before[1][row]))
+
+
+def test_batches_finish_and_are_reproducible():
+    first = BatchSimulator(200, 4, ['bot_hard', 'bot_easy'] * 2, seed=5)
+    second = BatchSimulator(200, 4, ['bot_hard', 'bot_easy'] * 2, seed=5)
+    assert (first.run() == second.run()).all()
+    assert (first.winners >= 0).all()
+    assert first.win_rates().sum() == pytest.approx(1.0)
+    # HardBot thắng RandomBot rõ rệt
+    rates = first.win_rates()
+    assert rates[0] + rates[2] > 0.6
@@ -0,0 +1,118 @@
+# tests/test_sqlite_backend.py
+"""SQLiteBackend: chuyển lược đồ từ file cũ, tombstone của outbox đồng bộ và phân trang lịch sử theo khoá."""
+import json
+import sqlite3
+
+from utils.sqlite_backend import SCHEMA_VERSION, SQLiteBackend
+
+# Lược đồ của data/game_history.db trước khi có user_version (MatchID số nguyên)
+LEGACY_SCHEMA = """
+CREATE TABLE GameMatches (
+    MatchID INTEGER PRIMARY KEY AUTOINCREMENT,
+    Mode TEXT NOT NULL, NumPlayers INTEGER NOT NULL,
+    StartTime TEXT NOT NULL, EndTime TEXT,
+    WinnerPlayerID INTEGER
+);
+CREATE TABLE GameActions (
+    ActionID INTEGER PRIMARY KEY AUTOINCREMENT,
+    MatchID INTEGER NOT NULL, PlayerID INTEGER NOT NULL,
+    ActionType TEXT NOT NULL, Detail TEXT,
+    Timestamp TEXT NOT NULL,
+    FOREIGN KEY (MatchID) REFERENCES GameMatches (MatchID)
+);
+CREATE TABLE SavedGames (
+    SavedGameID INTEGER PRIMARY KEY AUTOINCREMENT,
+    MatchID INTEGER UNIQUE NOT NULL,
+    Turn INTEGER NOT NULL,
+    DiceValue INTEGER,
+    PiecesState TEXT NOT NULL,
+    LastUpdated TEXT NOT NULL,
+    FOREIGN KEY (MatchID) REFERENCES GameMatches (MatchID)
+);
+"""
+
+PIECES = [[{"id": i, "player_id": p, "path_index": -1 if i else 6 * p, "finished": False} for i in range(4)]
+          for p in range(2)]
+
+
+def _legacy_db(path):
+    conn = sqlite3.connect(path)
+    conn.executescript(LEGACY_SCHEMA)
+    conn.executemany("INSERT INTO GameMatches (Mode, NumPlayers, StartTime, EndTime, WinnerPlayerID) VALUES (?, ?, ?, ?, ?)", [
+        ('Bot', 2, '2025-11-14 22:38:42', None, None),                     # đang chơi, có bản lưu
+        ('Offline', 4, '2025-11-15 09:00:00', '2025-11-15 09:40:00', 2),   # đã kết thúc
+        ('Online', 3, '2025-11-15 09:00:00', None, None),                  # không có bản lưu
+    ])
+    conn.execute("INSERT INTO SavedGames (MatchID, Turn, DiceValue, PiecesState, LastUpdated) VALUES (?, ?, ?, ?, ?)",
+                 (1, 1, 6, json.dumps(PIECES), '2025-11-14 22:38:50'))
+    conn.executemany("INSERT INTO GameActions (MatchID, PlayerID, ActionType, Detail, Timestamp) VALUES (?, ?, ?, ?, ?)",
+                     [(1, 1, 'roll', 'Gieo được: 6', '2025-11-14 22:38:44'),
+                      (2, 2, 'win', None, '2025-11-15 09:40:00')])
+    conn.commit()
+    conn.close()
+
+
+def test_migrate_v0_keeps_rows(tmp_path):
+    path = str(tmp_path / 'legacy.db')
+    _legacy_db(path)
+    backend = SQLiteBackend(path)
+
+    history = backend.list_matches(10)
+    assert [m['MatchID'] for m in history] == ['3', '2', '1']
+    playing = backend.load_match('1')
+    assert playing['Mode'] == 'Bot' and playing['is_loadable']
+    assert playing['FinalState']['pieces_state'] == PIECES
+    assert (playing['FinalState']['turn'], playing['FinalState']['dice_value']) == (1, 6)
+    finished = backend.load_match(2)
+    assert finished['WinnerPlayerID'] == 2 and finished['EndTime'] == '2025-11-15 09:40:00'
+    assert not finished['is_loadable']
+    assert 'FinalState' not in backend.load_match('3')
+
+    # Mỗi ván cũ là Version 1 chưa đồng bộ: đẩy lên Firestore một lần
+    assert backend.pending_count() == 3
+    assert all(doc['Version'] == 1 for _, doc in backend.pending_changes())
+    conn = backend._conn
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+    assert conn.execute("SELECT COUNT(*) FROM GameActions").fetchone()[0] == 2
+    backend.close()
+
+    # Mở lại không chuyển lần nữa, DeviceID giữ nguyên
+    reopened = SQLiteBackend(path)
+    assert reopened.device_id == backend.device_id
+    assert [m['MatchID'] for m in reopened.list_matches(10)] == ['3', '2', '1']
+    reopened.close()
+
+
+def test_delete_tombstone_only_when_needed(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / 'history.db'))
+    doc = {'is_loadable': True, 'NumPlayers': 2, 'Mode': 'Bot', 'StartTime': '2026-01-01 10:00:00'}
+    backend.save_many([('a', doc, True), ('b', doc, True)])
+    backend.mark_synced([('b', 1)])
+
+    assert backend.delete_match('a')          # chưa từng đẩy lên: không cần tombstone
+    assert backend.delete_match('b')
+    assert not backend.delete_match('missing')
+    assert backend.pending_deletes() == ['b']
+    backend.close()
+
+
+def test_history_pages_have_no_duplicates_or_gaps(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / 'history.db'))
+    # Nhiều ván trùng StartTime: trang phải cắt giữa các ván cùng thời điểm mà không lặp / sót
+    ids = [f'm{i:03d}' for i in range(101)]
+    backend.save_many([(match_id, {'is_loadable': i % 2 == 0, 'NumPlayers': 2, 'Mode': 'Bot',
+                                   'StartTime': f'2026-01-{1 + i % 4:02d} 10:00:00'}, True)
+                       for i, match_id in enumerate(ids)])
+
+    seen, after = [], None
+    while True:
+        page = backend.list_matches(7, after)
+        seen += page
+        if len(page) < 7:
+            break
+        after = (page[-1]['StartTime'], page[-1]['MatchID'])
+
+    keys = [(m['StartTime'], m['MatchID']) for m in seen]
+    assert keys == sorted(keys, reverse=True)
+    assert sorted(m['MatchID'] for m in seen) == ids
+    backend.close()
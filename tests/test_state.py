@@ -0,0 +1,60 @@
+# tests/test_state.py
+"""GameState nén: bytes, sao chép và view Piece trỏ vào cùng một mảng."""
+import random
+
+import pytest
+
+from core.piece import Piece
+from core.state import GameState
+
+
+def _random_state(rng, num_players):
+    state = GameState(num_players)
+    for slot in range(num_players):
+        for piece_id in range(4):
+            path_index = rng.randint(-1, 56)
+            state.set_index(slot, piece_id, path_index)
+            state.set_finished(slot, piece_id, path_index == 56)
+    state.turn = rng.randrange(num_players)
+    state.dice_value = rng.choice([None, 1, 2, 3, 4, 5, 6])
+    state.winner = rng.choice([None, 0])
+    return state
+
+
+@pytest.mark.parametrize('num_players', [2, 3, 4])
+def test_bytes_round_trip(num_players):
+    rng = random.Random(num_players)
+    for _ in range(200):
+        state = _random_state(rng, num_players)
+        data = state.to_bytes()
+        assert len(data) == 22
+        restored = GameState.from_bytes(data)
+        assert restored == state
+        assert list(restored.positions) == list(state.positions)
+        assert (restored.turn, restored.dice_value, restored.winner) == (state.turn, state.dice_value, state.winner)
+
+
+def test_copy_and_assign_are_independent():
+    state = _random_state(random.Random(1), 4)
+    before = state.to_bytes()
+    clone = state.copy()
+    clone.set_index(0, 0, 10 if state.get_index(0, 0) != 10 else 11)
+    assert state.to_bytes() == before and clone != state
+    other = GameState(4)
+    other.assign(state)
+    assert other == state
+    other.set_index(1, 2, 5 if state.get_index(1, 2) != 5 else 6)
+    assert state.to_bytes() == before
+    with pytest.raises(ValueError):
+        GameState(2).assign(state)
+
+
+def test_pieces_are_views_on_the_state():
+    state = GameState(2)
+    piece = Piece(1, 2, state=state)
+    piece.path_index = 7
+    assert state.get_index(1, 2) == 7
+    state.set_index(1, 2, 56)
+    state.set_finished(1, 2, True)
+    assert piece.path_index == 56 and piece.finished
+    assert piece.to_dict() == {'id': 2, 'player_id': 1, 'path_index': 56, 'finished': True}
@@ -0,0 +1,94 @@
+# tests/test_sync.py
+"""SyncEngine: phân xử khi hai máy sửa cùng một ván, kéo bản mới hơn, đẩy tombstone và thử lại khi mất mạng."""
+import shutil
+
+import pytest
+
+from utils.fake_firestore import FakeFirestoreClient, FakeFirestoreError
+from utils.firebase_manager import FirestoreBackend
+from utils.persistence import precedence
+from utils.sqlite_backend import SQLiteBackend
+from utils.sync import SyncEngine
+
+
+def _doc(mode):
+    return {'is_loadable': False, 'NumPlayers': 2, 'Mode': mode, 'StartTime': '2026-05-01 10:00:00'}
+
+
+@pytest.fixture
+def devices(tmp_path):
+    opened = []
+
+    def open_device(name, **kwargs):
+        backend = SQLiteBackend(str(tmp_path / f'{name}.db'), **kwargs)
+        opened.append(backend)
+        return backend
+    yield open_device
+    for backend in opened:
+        backend.close()
+
+
+def _modes(client):
+    return {match_id: doc['Mode'] for match_id, doc in client.documents().items()}
+
+
+def test_equal_versions_pick_the_same_winner_in_any_order(tmp_path, devices):
+    a, b = devices('a'), devices('b')
+    assert a.device_id != b.device_id
+    a.save_match('M1', _doc('A'), create=True)
+    b.save_match('M1', _doc('B'), create=True)  # cùng Version 1 trên hai máy
+    (_, doc_a), = a.pending_changes()
+    (_, doc_b), = b.pending_changes()
+    winner = 'A' if precedence(doc_a) > precedence(doc_b) else 'B'
+    for backend in (a, b):
+        backend.close()
+    for name in ('a', 'b'):  # bản sao giữ nguyên DeviceID / UpdatedAt cho thứ tự ngược lại
+        shutil.copy(tmp_path / f'{name}.db', tmp_path / f'{name}2.db')
+
+    for first, second in [(devices('a'), devices('b')), (devices('b2'), devices('a2'))]:
+        client = FakeFirestoreClient()
+        remote = FirestoreBackend(client)
+        SyncEngine(first, remote).sync_once()
+        SyncEngine(second, remote).sync_once()
+        assert _modes(client) == {'M1': winner}
+        assert second.load_match('M1')['Mode'] == winner
+        assert second.pending_count() == 0
+
+
+def test_higher_remote_version_is_pulled(devices):
+    a, b = devices('a'), devices('b')
+    client = FakeFirestoreClient()
+    remote = FirestoreBackend(client)
+    for _ in range(3):
+        a.save_match('M1', _doc('A'))
+    SyncEngine(a, remote).sync_once()
+    b.save_match('M1', _doc('B'), create=True)
+    engine = SyncEngine(b, remote)
+    assert engine.sync_once() == 1
+    assert b.load_match('M1')['Mode'] == 'A' and b.pending_count() == 0
+    assert engine.stats()['pulled'] == 1 and engine.stats()['conflicts'] == 1
+    assert _modes(client) == {'M1': 'A'}
+
+
+def test_deletes_and_network_errors(devices):
+    local = devices('a', track_deletes=True)
+    client = FakeFirestoreClient()
+    engine = SyncEngine(local, FirestoreBackend(client), base_delay=0.01, max_delay=0.02)
+    local.save_match('M1', _doc('A'), create=True)
+    local.save_match('M2', _doc('A'), create=True)
+
+    client.fail_next()
+    with pytest.raises(FakeFirestoreError):
+        engine.sync_once()
+    assert local.pending_count() == 2 and client.documents() == {}  # outbox còn nguyên
+
+    engine.start()
+    assert engine.flush(5.0)
+    assert set(client.documents()) == {'M1', 'M2'}
+    assert local.delete_match('M1')
+    local.save_match('M2', _doc('B'))
+    client.fail_next(2)  # luồng nền thử lại với backoff
+    assert engine.flush(5.0)
+    assert _modes(client) == {'M2': 'B'}
+    assert engine.stop() and local.pending_count() == 0
+    assert engine.stats()['failures'] >= 2
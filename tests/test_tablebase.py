@@ -0,0 +1,100 @@
+# tests/test_tablebase.py
+"""Tablebase đua về đích: đánh số trạng thái, nhận diện thế đua và giá trị so với lặp giá trị vét cạn."""
+import os
+from itertools import combinations_with_replacement
+
+import pytest
+
+from ai import tablebase
+from core.game_manager import GameManager
+
+
+@pytest.fixture(scope='module')
+def table(tmp_path_factory):
+    path = tablebase.DEFAULT_PATH
+    if not os.path.exists(path):  # file không nằm trong git: tạo bản tạm (khoảng 20 giây)
+        path = str(tmp_path_factory.mktemp('tablebase') / 'race.bin')
+        tablebase.generate(path)
+    return tablebase.RaceTablebase(path)
+
+
+def test_state_index_is_a_bijection():
+    indices = {tablebase.state_index(positions)
+               for positions in combinations_with_replacement(range(-1, 57), 4)}
+    assert indices == set(range(tablebase.NUM_STATES))
+    assert tablebase.state_index((3, -1, 56, 10)) == tablebase.state_index((56, 10, 3, -1))
+
+
+def _value_iteration(states):
+    """
+    Lặp giá trị trực tiếp trên tập trạng thái đóng: T(S) = số lượt kỳ vọng còn phải bắt đầu thêm
+    khi đang chuẩn bị gieo trong lượt hiện tại; expected_turns = 1 + T.
+    """
+    done = (56, 56, 56, 56)
+    extra = {s: 0.0 for s in states}
+    for _ in range(2000):
+        delta = 0.0
+        for s in states:
+            if s == done:
+                continue
+            total = 0.0
+            for dice in range(1, 7):
+                options = []
+                for i, p in enumerate(s):
+                    if p == 56 or (p == -1 and dice != 6) or p + dice > 56:
+                        continue
+                    after = tuple(sorted(s[:i] + (0 if p == -1 else p + dice,) + s[i + 1:]))
+                    if after == done:
+                        options.append(0.0)
+                    elif dice == 6 or p + dice == 56:  # được gieo tiếp trong lượt
+                        options.append(extra[after])
+                    else:
+                        options.append(1.0 + extra[after])
+                if options:
+                    total += min(options)
+                else:
+                    total += extra[s] if dice == 6 else 1.0 + extra[s]
+            new = total / 6
+            delta = max(delta, abs(new - extra[s]))
+            extra[s] = new
+        if delta < 1e-9:
+            break
+    return {s: 1.0 + v for s, v in extra.items()}
+
+
+def test_single_piece_values(table):
+    states = [tuple(sorted((p, 56, 56, 56))) for p in range(-1, 57)]
+    expected = _value_iteration(states)
+    for s in states:
+        if s != (56, 56, 56, 56):
+            assert table.expected_turns(s) == pytest.approx(expected[s], rel=1e-5)
+
+
+def test_two_piece_values_and_moves(table):
+    states = [tuple(sorted((a, b, 56, 56))) for a, b in combinations_with_replacement(range(44, 57), 2)]
+    expected = _value_iteration(states)
+    for s in states:
+        if s == (56, 56, 56, 56):
+            continue
+        assert table.expected_turns(s) == pytest.approx(expected[s], rel=1e-5)
+        for dice in range(1, 7):
+            source = table.best_source(s, dice)
+            legal = [p for p in s if p != 56 and p + dice <= 56]
+            assert (source is None) == (not legal)
+
+
+def test_is_race_and_best_move(table):
+    gm = GameManager(num_players=2)
+    for piece_id, path_index in enumerate([52, 54, 56, 50]):
+        gm.state.set_index(0, piece_id, path_index)
+        gm.state.set_finished(0, piece_id, path_index == 56)
+    gm.rebuild_occupancy()
+    # Quân P1 ở ô 50 vẫn còn trên vòng ngoài, đối thủ còn trong chuồng có thể tới
+    assert not tablebase.is_race(gm.state, gm.player_map, 0)
+    assert table.best_move(gm, 0, 2) is None
+    gm.state.set_index(0, 3, 51)
+    gm.rebuild_occupancy()
+    assert tablebase.is_race(gm.state, gm.player_map, 0)
+    piece_id = table.best_move(gm, 0, 2)
+    assert gm.state.get_index(0, piece_id) == table.best_source(gm.state.player_positions(0), 2)
+    assert table.best_move(gm, 0, 6) is None  # không quân nào đi được 6 bước
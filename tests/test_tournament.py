@@ -0,0 +1,40 @@
+# tests/test_tournament.py
+"""Giải đấu: thống kê theo ván, bỏ ván mirror, khoảng Wilson và ván chơi lại được theo seed."""
+import pytest
+
+from ai import tournament
+
+
+def test_wilson_interval():
+    assert tournament.wilson_interval(0, 0) == (0.0, 0.0)
+    low, high = tournament.wilson_interval(50, 100)
+    assert low == pytest.approx(0.4038, abs=1e-4) and high == pytest.approx(0.5962, abs=1e-4)
+    low, high = tournament.wilson_interval(0, 10)
+    assert low == 0.0 and 0.0 < high < 0.35
+
+
+def test_summarize_counts_games_not_seats():
+    a, b = 'bot_easy', 'bot_hard'
+    results = [((a, b), 0, 1, 100),        # b thắng
+               ((a, b), 1, 0, 90),         # a thắng
+               ((a, a, b), 2, 1, 120),     # a thắng ván 3 người (một lần thử, không phải hai)
+               ((b, b), 3, 0, 80),         # mirror: không tính cho bot
+               ((a, b), 4, None, 5000)]    # chưa xong
+    report = tournament.summarize(results, elapsed=2.0)
+
+    assert report['games'] == 5 and report['unfinished'] == 1 and report['mirror_games'] == 1
+    assert report['games_per_sec'] == pytest.approx(2.5)
+    assert report['bots'][a]['games'] == 3 and report['bots'][a]['wins'] == 2
+    assert report['bots'][b]['games'] == 3 and report['bots'][b]['wins'] == 1
+    assert report['bots'][a]['expected_if_equal'] == pytest.approx((0.5 + 0.5 + 2 / 3) / 3)
+    seating = next(s for s in report['seatings'] if s['seating'] == [a, a, b])
+    assert [s['wins'] for s in seating['seats']] == [0, 1, 0]
+    assert tournament.format_report(report)
+
+
+def test_games_replay_from_seed():
+    tasks = tournament.build_tasks(['bot_easy', 'bot_hard'], [2], games=2, seed=40, max_plies=3000)
+    assert len(tasks) == 8 and len({seed for _, seed, _ in tasks}) == 8
+    first = [tournament.play_game(task) for task in tasks[:3]]
+    assert first == [tournament.play_game(task) for task in tasks[:3]]
+    assert all(winner is not None for _, _, winner, _ in first)
@@ -0,0 +1,75 @@
+# tests/test_winprob.py
+"""Ước lượng xác suất thắng: lời giải thế đua so với playout trên GameManager, Monte Carlo và ván đã kết thúc."""
+import random
+import time
+
+from ai import winprob
+from ai.winprob import WinProbabilityEstimator, race_probabilities, run_rollouts
+from core.game_manager import GameManager
+
+
+class _ForcedTable:
+    """Thay tablebase cho thế chỉ còn một quân mỗi người: nước đi luôn bị ép."""
+
+    def best_source(self, positions, dice):
+        for p in sorted(set(positions), reverse=True):
+            if p != 56 and (p + dice <= 56 if p >= 0 else dice == 6):
+                return p
+        return None
+
+
+def _race(num_players, last_pieces, turn=0):
+    """Mỗi ghế còn đúng một quân ở last_pieces[slot], ba quân kia đã về đích."""
+    gm = GameManager(num_players=num_players, player_types=['bot_easy'] * num_players)
+    for slot, path_index in enumerate(last_pieces):
+        for piece_id in range(4):
+            index = path_index if piece_id == 0 else 56
+            gm.state.set_index(slot, piece_id, index)
+            gm.state.set_finished(slot, piece_id, index == 56)
+    gm.state.turn = turn
+    gm.rebuild_occupancy()
+    return gm
+
+
+def test_race_solution_matches_playouts():
+    for num_players, last_pieces in [(2, [51, 53]), (3, [52, 44, 54]), (2, [55, 54])]:
+        gm = _race(num_players, last_pieces, turn=1)
+        distribution = winprob._TurnDistribution(_ForcedTable())
+        solution = race_probabilities(gm.state, gm.player_map, distribution)
+        assert solution is not None, last_pieces
+        probabilities, tail = solution
+        assert abs(sum(probabilities) - 1.0) < 1e-9 and tail < 1e-9
+
+        before = gm.state.to_bytes()
+        wins, rollouts = run_rollouts(gm, time.monotonic() + 60, random.Random(num_players), max_rollouts=20000)
+        assert gm.state.to_bytes() == before
+        for slot in range(num_players):
+            assert abs(wins[slot] / rollouts - probabilities[slot]) < 0.02, (last_pieces, slot)
+
+
+def test_race_with_rolled_dice():
+    # Ghế 0 đã gieo đúng số bước còn lại: chắc chắn thắng
+    gm = _race(2, [53, 51])
+    gm.state.dice_value = 3
+    probabilities, _ = race_probabilities(gm.state, gm.player_map, winprob._TurnDistribution(_ForcedTable()))
+    assert probabilities == [1.0, 0.0]
+
+
+def test_estimator_labels_exact_only_for_race_and_finished_games():
+    estimator = WinProbabilityEstimator(time_budget=5.0, workers=1, min_rollouts=50, max_rollouts=200,
+                                        use_tablebase=False)
+    estimator._distribution = winprob._TurnDistribution(_ForcedTable())
+
+    race = estimator.estimate(_race(2, [51, 53]))
+    assert race.exact and race.rollouts == 0
+
+    gm = _race(2, [51, 53])
+    gm.winner = gm.state.winner = 1
+    finished = estimator.estimate(gm)
+    assert finished.exact and finished.probabilities == [0.0, 1.0]
+
+    gm = GameManager(num_players=3, player_types=['bot_easy'] * 3)
+    first = estimator.estimate(gm.state, gm.player_map, seed=5)
+    assert not first.exact and first.rollouts == 200
+    assert abs(sum(first.probabilities) - 1.0) < 1e-9
+    assert estimator.estimate(gm.state, gm.player_map, seed=5).probabilities == first.probabilities
@@ -0,0 +1,68 @@
+# tests/test_zobrist.py
+"""Hash Zobrist tăng dần và bảng chuyển vị có giới hạn."""
+import pytest
+
+from core import zobrist
+from core.game_manager import GameManager
+from core.state import GameState
+from core.transposition import TranspositionTable, EXACT, LOWER_BOUND
+
+
+def test_incremental_hash_matches_full_hash():
+    gm = GameManager(num_players=4, player_types=['bot_easy'] * 4)
+    plies = 0
+    while gm.winner is None and plies < 3000:
+        gm.run_bot_turn()
+        plies += 1
+        assert gm.state.zobrist == zobrist.compute_hash(gm.state)
+    assert gm.winner is not None
+
+
+def test_hash_depends_on_position_not_history():
+    first, second = GameState(2), GameState(2)
+    first.set_index(0, 0, 5)
+    first.set_index(1, 3, 12)
+    second.set_index(1, 3, 12)
+    second.set_index(0, 0, 9)
+    second.set_index(0, 0, 5)
+    assert first.zobrist == second.zobrist
+    second.dice_value = 6
+    assert first.zobrist != second.zobrist
+    second.dice_value = None
+    second.turn = 1
+    assert first.zobrist != second.zobrist
+    first.set_finished(0, 1, True)
+    assert first.zobrist == zobrist.compute_hash(first)
+
+
+def _colliding_keys(table, count):
+    """count khoá khác nhau rơi vào cùng một bucket."""
+    return [(i * (table.mask + 1)) | 3 for i in range(1, count + 1)]
+
+
+def test_two_tier_keeps_deep_entry_and_always_slot():
+    table = TranspositionTable(capacity=64, policy='two_tier')
+    deep, shallow, newer = _colliding_keys(table, 3)
+    table.store(deep, 6, 1.0)
+    table.store(shallow, 1, 2.0, LOWER_BOUND)
+    table.store(newer, 2, 3.0)
+    assert table.get(deep).depth == 6          # entry theo độ sâu được giữ
+    assert table.get(shallow) is None          # entry luôn ghi đè bị thay
+    assert table.get(newer).value == 3.0
+
+    table.new_search()                          # entry của lượt trước nhường chỗ
+    table.store(shallow, 1, 4.0)
+    assert table.get(shallow).value == 4.0 and table.get(deep) is not None
+    assert len(table) <= table.capacity
+
+
+@pytest.mark.parametrize('policy', ['always', 'depth', 'two_tier'])
+def test_table_is_bounded(policy):
+    table = TranspositionTable(capacity=128, policy=policy)
+    for key in range(10000):
+        table.store(key * 0x9E3779B97F4A7C15 & (2 ** 64 - 1), key % 5, float(key), EXACT, key % 4)
+    assert len(table) <= table.capacity == 128
+    stats = table.stats()
+    assert stats['stores'] == 10000 and stats['used'] == len(table)
+    with pytest.raises(ValueError):
+        TranspositionTable(policy='lru')
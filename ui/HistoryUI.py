@@ -1,9 +1,59 @@
+import logging
+import threading
 import pygame
 import pygame_gui
 from utils import firebase_manager
 from utils.constants import WIDTH, HEIGHT
 from datetime import datetime
 
+# Tải trang tiếp khi phần đã cuộn tới cách cuối danh sách chưa tới 20%
+LOAD_MORE_THRESHOLD = 0.2
+BUTTON_HEIGHT = 50
+SPACING = 10
+DELETE_BUTTON_WIDTH = 50
+DATE_FORMAT_IN = '%Y-%m-%d %H:%M:%S'
+
+
+class HistoryRequest:
+    """Gọi một hàm của firebase_manager trên luồng nền; vòng lặp vẽ chỉ hỏi done / result / error."""
+
+    def __init__(self, func, *args, name="history-request"):
+        self.result = None
+        self.error = None
+        self._func = func
+        self._args = args
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _call(self):
+        return self._func(*self._args)
+
+    def _run(self):
+        try:
+            self.result = self._call()
+        except Exception as e:
+            logging.exception(f"Lỗi khi truy cập lịch sử ({self._thread.name}): {e}")
+            self.error = e
+
+    @property
+    def done(self):
+        return not self._thread.is_alive()
+
+
+class HistoryPageRequest(HistoryRequest):
+    """Tải một trang lịch sử (firebase_manager.get_match_history_page) trên luồng nền."""
+
+    def __init__(self, cursor=None):
+        self.cursor = cursor
+        self.matches = []
+        self.next_cursor = None
+        super().__init__(firebase_manager.get_match_history_page, cursor, name="history-page")
+
+    def _call(self):
+        self.matches, self.next_cursor = super()._call()
+        return self.matches
+
+
 class HistoryUI:
     def __init__(self, screen, manager):
         self.screen = screen
@@ -54,22 +104,6 @@ class HistoryUI:
             manager=self.manager
         )
 
-        # --- Lấy lịch sử và lọc trùng lặp ---
-        raw_history = firebase_manager.get_match_history(limit=100)
-        unique_matches = {}
-        for match in raw_history:
-            match_id = match.get('MatchID')
-            if match_id:
-                # Nếu đã có, chỉ giữ bản kết thúc
-                if match_id in unique_matches:
-                    if not unique_matches[match_id]['is_loadable'] and match.get('is_loadable'):
-                        continue
-                    if unique_matches[match_id]['is_loadable'] and not match.get('is_loadable'):
-                        unique_matches[match_id] = match
-                else:
-                    unique_matches[match_id] = match
-        self.history_data = list(unique_matches.values())
-
         # --- Scroll container ---
         scroll_top = 100 
         scroll_bottom = HEIGHT - 100 
@@ -78,55 +112,69 @@ class HistoryUI:
             relative_rect=pygame.Rect((50, scroll_top, WIDTH - 100, container_height)),
             manager=self.manager
         )
-        
-        # --- Tạo nút lịch sử & Xóa ---
+        self.status_label = pygame_gui.elements.UILabel(
+            relative_rect=pygame.Rect((50, scroll_bottom - 40, WIDTH - 100, 30)),
+            text='Đang tải lịch sử...',
+            manager=self.manager
+        )
+
+        # --- Nút lịch sử & Xóa: thêm dần theo từng trang ---
+        self.history_data = []
         self.buttons = []
         self.delete_buttons = {}
-        button_height = 50
-        spacing = 10
-        delete_button_width = 50
-        main_button_width = self.scroll_container.relative_rect.width - 20 - delete_button_width - spacing
-        date_format_in = '%Y-%m-%d %H:%M:%S'
-
-        for i, match in enumerate(self.history_data):
-            match_id = match['MatchID']
-            status = "Đang chơi" if match.get('is_loadable') else "Kết thúc"
-            mode = match.get('Mode', 'Offline')
-
-            # Xử lý WinnerPlayerID đúng
-            winner_id = match.get('WinnerPlayerID')
-            if winner_id is None or winner_id == '-':
-                winner = 'Chưa xác định'
-            else:
-                winner_id = int(winner_id)
-                if winner_id < match.get('NumPlayers', 0):
-                    if mode == 'Bot' and winner_id != 0:
-                        winner = f'Bot {winner_id}'
-                    elif mode == 'Bot' and winner_id == 0:
-                        winner = 'Player 1'
-                    else:
-                        winner = f'Player {winner_id + 1}'
+        self.main_button_width = self.scroll_container.relative_rect.width - 20 - DELETE_BUTTON_WIDTH - SPACING
+
+        # Trang đầu tải trên luồng nền: màn hình vẽ được ngay, trang sau tải khi cuộn gần cuối
+        self.next_cursor = None
+        self.page_request = HistoryPageRequest()
+        # Xoá / tải một ván cũng chạy trên luồng nền: (loại, ván, HistoryRequest), mỗi lúc một thao tác
+        self.action = None
+
+    def _row_text(self, match):
+        match_id = match['MatchID']
+        status = "Đang chơi" if match.get('is_loadable') else "Kết thúc"
+        mode = match.get('Mode', 'Offline')
+
+        # Xử lý WinnerPlayerID đúng
+        winner_id = match.get('WinnerPlayerID')
+        if winner_id is None or winner_id == '-':
+            winner = 'Chưa xác định'
+        else:
+            winner_id = int(winner_id)
+            if winner_id < match.get('NumPlayers', 0):
+                if mode == 'Bot' and winner_id != 0:
+                    winner = f'Bot {winner_id}'
+                elif mode == 'Bot' and winner_id == 0:
+                    winner = 'Player 1'
                 else:
-                    winner = 'Chưa xác định'
+                    winner = f'Player {winner_id + 1}'
+            else:
+                winner = 'Chưa xác định'
 
-            # Xử lý thời gian
-            timestamp_str = match.get('StartTime')
-            dt_str = '-'
-            if isinstance(timestamp_str, str) and timestamp_str:
-                try:
-                    dt_object = datetime.strptime(timestamp_str, date_format_in)
-                    dt_str = dt_object.strftime('%d/%m/%Y %H:%M:%S')
-                except ValueError:
-                    dt_str = 'Lỗi định dạng'
+        # Xử lý thời gian
+        timestamp_str = match.get('StartTime')
+        dt_str = '-'
+        if isinstance(timestamp_str, str) and timestamp_str:
+            try:
+                dt_object = datetime.strptime(timestamp_str, DATE_FORMAT_IN)
+                dt_str = dt_object.strftime('%d/%m/%Y %H:%M:%S')
+            except ValueError:
+                dt_str = 'Lỗi định dạng'
 
-            text = f"ID: {match_id} | Mode: {mode} | Status: {status} | Winner: {winner} | Thời gian: {dt_str}"
+        return f"ID: {match_id} | Mode: {mode} | Status: {status} | Winner: {winner} | Thời gian: {dt_str}"
+
+    def _add_rows(self, matches):
+        """Thêm nút cho các ván của trang vừa tải (mỗi MatchID một dòng, do API lịch sử đảm bảo)."""
+        for match in matches:
+            i = len(self.history_data)
+            self.history_data.append(match)
 
             # Nút chính
             btn = pygame_gui.elements.UIButton(
                 relative_rect=pygame.Rect(
-                    (0, i*(button_height + spacing), main_button_width, button_height)
+                    (0, i*(BUTTON_HEIGHT + SPACING), self.main_button_width, BUTTON_HEIGHT)
                 ),
-                text=text,
+                text=self._row_text(match),
                 manager=self.manager,
                 container=self.scroll_container,
                 object_id="#history_item"
@@ -136,19 +184,42 @@ class HistoryUI:
             # Nút xóa
             delete_btn = pygame_gui.elements.UIButton(
                 relative_rect=pygame.Rect(
-                    (main_button_width + spacing, i*(button_height + spacing), delete_button_width, button_height)
+                    (self.main_button_width + SPACING, i*(BUTTON_HEIGHT + SPACING), DELETE_BUTTON_WIDTH, BUTTON_HEIGHT)
                 ),
                 text='Xóa',
                 manager=self.manager,
                 container=self.scroll_container,
                 object_id="#delete_history_item"
             )
-            self.delete_buttons[delete_btn] = match_id
+            self.delete_buttons[delete_btn] = match['MatchID']
 
         # --- Cập nhật scroll ---
-        total_height = len(self.history_data) * (button_height + spacing)
+        total_height = len(self.history_data) * (BUTTON_HEIGHT + SPACING)
         self.scroll_container.set_scrollable_area_dimensions((self.scroll_container.relative_rect.width, total_height))
 
+    def _near_bottom(self):
+        bar = getattr(self.scroll_container, 'vert_scroll_bar', None)
+        if bar is None:
+            return True  # danh sách chưa đầy khung: tải thêm
+        return bar.start_percentage + bar.visible_percentage >= 1 - LOAD_MORE_THRESHOLD
+
+    def _poll_history(self):
+        request = self.page_request
+        if request is not None:
+            if not request.done:
+                return
+            self.page_request = None
+            if request.error is not None:
+                self.status_label.set_text('Không tải được lịch sử.')
+                return
+            self._add_rows(request.matches)
+            self.next_cursor = request.next_cursor
+            if self.history_data:
+                self.status_label.hide()
+            else:
+                self.status_label.set_text('Chưa có ván nào.')
+        if self.next_cursor is not None and self._near_bottom():
+            self.page_request = HistoryPageRequest(self.next_cursor)
 
     def handle_events(self, event):
         self.manager.process_events(event)
@@ -158,43 +229,62 @@ class HistoryUI:
                 self.is_running = False
                 self.next_screen = 'menu'
             
+            elif self.action is not None:
+                return  # đang xoá / tải một ván: bỏ qua thao tác mới
+
             # XỬ LÝ SỰ KIỆN XÓA
             elif event.ui_element in self.delete_buttons:
                 match_id_to_delete = self.delete_buttons[event.ui_element]
-                
-                # Gọi hàm xóa dữ liệu khỏi Firebase
-                firebase_manager.delete_match_history(match_id_to_delete)
-                print(f"Đã xóa lịch sử trận đấu: {match_id_to_delete}")
-                
-                # Tải lại màn hình lịch sử để cập nhật giao diện
-                self.is_running = False
-                self.next_screen = 'history' 
-                
+                self._start_action('delete', match_id_to_delete,
+                                   HistoryRequest(firebase_manager.delete_match_history, match_id_to_delete,
+                                                  name="history-delete"), 'Đang xóa...')
+
             # XỬ LÝ SỰ KIỆN NÚT CHÍNH (Tiếp tục/Xem lại)
             else:
                 for i, btn in enumerate(self.buttons):
                     if event.ui_element == btn:
                         match = self.history_data[i]
-                        match_id = match['MatchID']
-                        
-                        # Tải trạng thái game
-                        final_state = firebase_manager.load_game_state(match_id)
-                        
-                        if final_state:
-                            if match.get('is_loadable'):
-                                # Trận Đang chơi -> Tiếp tục
-                                self.next_screen = ('resume_game', match_id, final_state)
-                            else:
-                                # Trận Kết thúc -> Xem lại (view)
-                                self.next_screen = ('view_game', match_id, final_state) 
-                            
-                            self.is_running = False
-                        else:
-                            print(f"Lỗi: Không thể tải trạng thái trận đấu {match_id}.")
+                        self._start_action('load', match,
+                                           HistoryRequest(firebase_manager.load_game_state, match['MatchID'],
+                                                          name="history-load"), 'Đang tải ván...')
+                        break
+
+    def _start_action(self, kind, target, request, text):
+        self.action = (kind, target, request)
+        self.status_label.set_text(text)
+        self.status_label.show()
+
+    def _poll_action(self):
+        if self.action is None or not self.action[2].done:
+            return
+        kind, target, request = self.action
+        self.action = None
+        if kind == 'delete':
+            if request.error is None:
+                logging.info(f"Đã xóa lịch sử trận đấu: {target}")
+            # Tải lại màn hình lịch sử để cập nhật giao diện
+            self.is_running = False
+            self.next_screen = 'history'
+            return
+        match_id = target['MatchID']
+        final_state = request.result
+        if not final_state:
+            logging.error(f"Không thể tải trạng thái trận đấu {match_id}.")
+            self.status_label.set_text('Không thể tải ván này.')
+            return
+        if target.get('is_loadable'):
+            # Trận Đang chơi -> Tiếp tục
+            self.next_screen = ('resume_game', match_id, final_state)
+        else:
+            # Trận Kết thúc -> Xem lại (view)
+            self.next_screen = ('view_game', match_id, final_state)
+        self.is_running = False
 
     def draw(self):
         self.screen.blit(self.background, (0, 0))
         self.manager.draw_ui(self.screen)
 
     def update(self, time_delta):
+        self._poll_history()
+        self._poll_action()
         self.manager.update(time_delta)
\ No newline at end of file
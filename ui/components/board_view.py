@@ -2,7 +2,7 @@ import pygame
 from core import rules
 from utils.constants import (
     WIDTH, HEIGHT, RED, BLUE, GREEN, YELLOW, WHITE, BLACK,
-    PLAYER_COLORS, DICE_POSITIONS, FONT, CELL
+    PLAYER_COLORS, DICE_POSITIONS, CELL
 )
 from ui.components.dice_view import DiceView
 
@@ -249,7 +249,8 @@ class BoardView:
                 if 0 <= current < len(self.dices):
                     dice_of_current_player = self.dices[current]
                     if dice_of_current_player.clicked((mx, my)):
-                        val = dice_of_current_player.roll()
+                        val = self.gm.rng.roll()
+                        dice_of_current_player.set_value(val)
                         if self.sound_manager: self.sound_manager.play_sfx('dice')
                         self.last_roll = val; self.msg = f"Người {current+1} gieo được {val}"
                         self.gm.dice_value = val; self.highlight_cells.clear()
@@ -262,8 +263,7 @@ class BoardView:
                                 if dest_cell: self.highlight_cells.append(dest_cell)
                         else:
                             self.msg += ": Không có nước đi."
-                            if val != 6: self.gm.next_turn()
-                            else: self.gm.dice_value = None
+                            self.gm.skip_move()
                         return
 
             # --- 2️⃣ Bấm chọn ô đã được highlight để di chuyển quân ---
@@ -1,10 +1,14 @@
 import pygame
 import random
+import time
 import logging
 from core.game_manager import GameManager
+from ai.anytime import AnytimeDecision
+from ai import winprob
 from ui.components.board_view import BoardView
 from network.client import get_current_game_state
 from utils import firebase_manager
+from utils.constants import HEIGHT, BLACK
 
 class GameUI:
     def __init__(self, screen, num_players, player_types, sound_manager):
@@ -20,6 +24,12 @@ class GameUI:
 
         self.bot_turn_timer = 0
         self.bot_turn_delay = 1.0  # 1 giây chờ bot đi
+        self.bot_think_time = 2.0  # tối đa 2 giây suy nghĩ mỗi lượt (bot nghĩ trên luồng nền)
+        self.bot_decision = None   # AnytimeDecision đang chạy
+        self.win_estimate_time = 0.5  # giây tối đa cho mỗi lần ước lượng xác suất thắng
+        self.win_estimate = None      # BackgroundEstimate đang chạy
+        self.win_text = ""
+        self._estimated_hash = None
 
         try:
             self.font_small = pygame.font.Font('assets/fonts/Sans_Flex.ttf', 20)
@@ -55,54 +65,37 @@ class GameUI:
     # --- Cập nhật mỗi frame ---
     def update(self, time_delta):
         # --- OFFLINE: Bot đi tự động ---
-        if self.game_manager.is_bot_turn():
+        if self.bot_decision is not None:
+            # Bot đang nghĩ trên luồng nền: chỉ lấy nước đi khi xong hoặc hết giờ
+            decision = self.bot_decision
+            if decision.done or time.perf_counter() >= decision.deadline:
+                self.bot_decision = None
+                piece_id = decision.finish()
+                chosen_piece = None if piece_id is None else self.game_manager.players[self.game_manager.turn][piece_id]
+                self._apply_bot_move(chosen_piece, decision.dice_value)
+        elif self.game_manager.is_bot_turn():
             self.bot_turn_timer += time_delta
             if self.bot_turn_timer >= self.bot_turn_delay:
                 self.bot_turn_timer = 0
                 bot = self.game_manager.get_current_bot()
-                chosen_piece = bot.choose_move()
-                dice_rolled = self.game_manager.dice_value
+                dice_rolled = self.game_manager.rng.roll()
+                self.game_manager.dice_value = dice_rolled
 
                 # Hiệu ứng gieo xúc xắc
-                if dice_rolled is not None:
-                    for _ in range(5):
-                        fake_value = random.randint(1, 6)
-                        self.board_view.update_dice_display(self.game_manager.turn, fake_value)
-                        pygame.time.delay(50)
-                    self.board_view.update_dice_display(self.game_manager.turn, dice_rolled)
-
-                if chosen_piece is not None:
-                    kicked_piece, just_finished, winner_id = self.game_manager.move_piece(chosen_piece)
-
-                    if winner_id is not None:
-                        # --- Trận đấu kết thúc ---
-                        msg = f"P{winner_id + 1} đã THẮNG CUỘC!"
-                        if self.sound_manager:
-                            self.sound_manager.play_sfx('win')  # Phát âm thanh kết thúc
-                        # Lưu ngay kết thúc game
-                        firebase_manager.save_game_state(
-                            self.game_manager,
-                            winner_id=winner_id,
-                            is_loadable=False
-                        )
-                    else:
-                        # --- Lượt bình thường ---
-                        msg = f"Bot (P{self.game_manager.turn + 1}) gieo được {dice_rolled}."
-                        if kicked_piece:
-                            msg += f" Đã đá quân P{kicked_piece.player_id + 1}!"
-                            if self.sound_manager: self.sound_manager.play_sfx('kick')
-                        elif just_finished:
-                            msg += " Đã về 1 quân!"
-                            if self.sound_manager: self.sound_manager.play_sfx('done')
-                        else:
-                            piece_id = chosen_piece.id if hasattr(chosen_piece, 'id') else '?'
-                            msg += f" Đã di chuyển quân {piece_id + 1}."
-                            if self.sound_manager: self.sound_manager.play_sfx('move')
+                for _ in range(5):
+                    fake_value = random.randint(1, 6)
+                    self.board_view.update_dice_display(self.game_manager.turn, fake_value)
+                    pygame.time.delay(50)
+                self.board_view.update_dice_display(self.game_manager.turn, dice_rolled)
+
+                if self.game_manager.get_movable_pieces(self.game_manager.turn, dice_rolled):
+                    think_time = min(getattr(bot, 'time_budget', None) or self.bot_think_time, self.bot_think_time)
+                    self.bot_decision = AnytimeDecision(bot, self.game_manager, dice_rolled,
+                                                        time.perf_counter() + think_time)
                 else:
-                    msg = f"Bot (P{self.game_manager.turn + 1}) gieo được {dice_rolled} : không có nước đi." \
-                        if dice_rolled else f"Bot (P{self.game_manager.turn + 1}) không có nước đi."
-                    self.game_manager.next_turn()
-                self.board_view.msg = msg
+                    self._apply_bot_move(None, dice_rolled)
+
+        self._update_win_estimate()
 
         # --- NGƯỜI CHƠI: Xử lý tương tự (nếu cần) ---
         # Nếu bạn có luồng người chơi thật, bạn cũng nên xử lý winner_id và sound tương tự
@@ -114,12 +107,66 @@ class GameUI:
             self.update_game_state(state)
 
 
+    def _update_win_estimate(self):
+        """Ước lượng lại xác suất thắng (luồng nền) mỗi khi thế cờ đổi và không có bot đang nghĩ."""
+        task = self.win_estimate
+        if task is not None:
+            if not task.done:
+                return
+            self.win_estimate = None
+            if task.result is not None:
+                self.win_text = "Xác suất thắng: " + "  ".join(
+                    f"P{slot + 1} {p:.0%}" for slot, p in enumerate(task.result.probabilities))
+        if self.online_state or self.bot_decision is not None:
+            return
+        if self.game_manager.position_hash != self._estimated_hash:
+            self._estimated_hash = self.game_manager.position_hash
+            self.win_estimate = winprob.BackgroundEstimate(winprob.get_default(), self.game_manager,
+                                                           time.perf_counter() + self.win_estimate_time)
+
+    def _apply_bot_move(self, chosen_piece, dice_rolled):
+        """Thực hiện nước đi bot đã chọn (None = không có nước đi) và cập nhật thông báo, âm thanh."""
+        if chosen_piece is not None:
+            kicked_piece, just_finished, winner_id = self.game_manager.move_piece(chosen_piece)
+
+            if winner_id is not None:
+                # --- Trận đấu kết thúc ---
+                msg = f"P{winner_id + 1} đã THẮNG CUỘC!"
+                if self.sound_manager:
+                    self.sound_manager.play_sfx('win')  # Phát âm thanh kết thúc
+                # Lưu ngay kết thúc game
+                firebase_manager.save_game_state(
+                    self.game_manager,
+                    winner_id=winner_id,
+                    is_loadable=False
+                )
+            else:
+                # --- Lượt bình thường ---
+                msg = f"Bot (P{self.game_manager.turn + 1}) gieo được {dice_rolled}."
+                if kicked_piece:
+                    msg += f" Đã đá quân P{kicked_piece.player_id + 1}!"
+                    if self.sound_manager: self.sound_manager.play_sfx('kick')
+                elif just_finished:
+                    msg += " Đã về 1 quân!"
+                    if self.sound_manager: self.sound_manager.play_sfx('done')
+                else:
+                    piece_id = chosen_piece.id if hasattr(chosen_piece, 'id') else '?'
+                    msg += f" Đã di chuyển quân {piece_id + 1}."
+                    if self.sound_manager: self.sound_manager.play_sfx('move')
+        else:
+            msg = f"Bot (P{self.game_manager.turn + 1}) gieo được {dice_rolled} : không có nước đi." \
+                if dice_rolled else f"Bot (P{self.game_manager.turn + 1}) không có nước đi."
+            self.game_manager.skip_move()
+        self.board_view.msg = msg
+
     # --- Vẽ mỗi frame ---
     def draw(self):
         if self.online_state:
             self.board_view.draw_from_state(self.online_state)
         else:
             self.board_view.draw()
+            if self.win_text:
+                self.screen.blit(self.font_small.render(self.win_text, True, BLACK), (12, HEIGHT - 64))
 
     # --- Cập nhật trạng thái game từ server ---
     def update_game_state(self, state):
@@ -137,6 +184,7 @@ class GameUI:
                     piece = self.game_manager.players[i][j]
                     piece.path_index = piece_state.get('path_index', piece.path_index)
                     piece.finished = piece_state.get('finished', piece.finished)
+            self.game_manager.rebuild_occupancy()
 
         if dice_value is not None and hasattr(self.board_view, 'update_dice_display'):
             self.board_view.update_dice_display(current_turn, dice_value)
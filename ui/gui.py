@@ -7,7 +7,7 @@ firebase_manager.initialize_firebase()
 
 from utils.constants import WIDTH, HEIGHT
 from utils.sound_manager import SoundManager
-from core.auth_manager import AuthManager
+from utils.auth_manager import AuthManager
 
 # Import các View
 from .menu_view import MenuView
@@ -1,7 +1,7 @@
 import pygame
 import pygame_gui
 from utils.constants import WIDTH, HEIGHT
-from core.auth_manager import AuthManager
+from utils.auth_manager import AuthManager
 from utils.ui_utils import draw_gradient_background, get_font
 
 class RegisterView:
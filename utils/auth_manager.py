@@ -1,4 +1,4 @@
-# core/auth_manager.py
+# utils/auth_manager.py
 import pyrebase
 import logging
 from datetime import datetime # Cần import datetime
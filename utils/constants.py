@@ -1,7 +1,4 @@
 # utils/constants.py
-import pygame
-pygame.font.init()
-
 WIDTH, HEIGHT = 1100, 830
 CENTER = (WIDTH//2, HEIGHT//2)
 CELL = 50
@@ -18,9 +15,6 @@ BLACK = (0,0,0)
 
 PLAYER_COLORS = [GREEN, BLUE, YELLOW, RED]  # theo chiều kim đồng hồ
 
-FONT = pygame.font.SysFont("Arial", 18)
-BIG_FONT = pygame.font.SysFont("Arial", 22, bold=True)
-
 # vị trí xúc xắc (x,y)
 # vị trí xúc xắc (x,y)
 # vị trí xúc xắc (x,y)
@@ -0,0 +1,215 @@
+# utils/fake_firestore.py
+"""
+Firestore giả trong bộ nhớ để chạy và thử đồng bộ (utils.sync) khi không có mạng / firebase_admin.
+
+Chỉ gồm phần API mà FirestoreBackend dùng: collection().document() với get / set / update / delete,
+subcollection (document().collection()), order_by().start_after().limit().stream(), get_all() và
+batch() (commit nguyên tử). Có thể giả lập độ trễ mỗi round trip (latency) và lỗi mạng:
+fail_next(n) làm n round trip tiếp theo lỗi, fail_rate lỗi ngẫu nhiên.
+
+    client = FakeFirestoreClient(latency=0.05)
+    firebase_manager.set_remote_backend(FirestoreBackend(client))
+"""
+import copy
+import functools
+import random
+import threading
+import time
+
+
+class FakeFirestoreError(Exception):
+    """Lỗi mạng / dịch vụ giả lập."""
+
+
+class NotFound(FakeFirestoreError):
+    """update() trên tài liệu không tồn tại (như google.api_core.exceptions.NotFound)."""
+
+
+class FakeSnapshot:
+    def __init__(self, reference, data):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return copy.deepcopy(self._data)
+
+
+class FakeDocumentReference:
+    def __init__(self, client, collection, doc_id):
+        self._client = client
+        self.collection_name = collection
+        self.id = doc_id
+
+    def get(self):
+        self._client._round_trip()
+        return FakeSnapshot(self, self._client._read(self.collection_name, self.id))
+
+    def set(self, data):
+        self._client._round_trip()
+        self._client._apply([('set', self, data)])
+
+    def update(self, data):
+        self._client._round_trip()
+        self._client._apply([('update', self, data)])
+
+    def delete(self):
+        self._client._round_trip()
+        self._client._apply([('delete', self, None)])
+
+    def collection(self, name):
+        """Subcollection của tài liệu (tài liệu con độc lập, không bị xoá theo tài liệu cha)."""
+        return FakeCollectionReference(self._client, f"{self.collection_name}/{self.id}/{name}")
+
+
+class FakeQuery:
+    """Truy vấn bất biến: order_by (nhiều trường, '__name__' là id tài liệu), start_after, limit."""
+
+    def __init__(self, client, collection, orders=(), cursor=None, limit=None):
+        self._client = client
+        self.collection_name = collection
+        self._orders = tuple(orders)  # (trường, giảm dần)
+        self._cursor = cursor
+        self._limit = limit
+
+    def _with(self, **changes):
+        args = {'orders': self._orders, 'cursor': self._cursor, 'limit': self._limit}
+        args.update(changes)
+        return type(self)(self._client, self.collection_name, **args)
+
+    def order_by(self, field, direction='ASCENDING'):
+        return self._with(orders=self._orders + ((field, direction == 'DESCENDING'),))
+
+    def start_after(self, values):
+        """values: dict trường -> giá trị theo các order_by (như cursor dạng dict của Firestore)."""
+        return self._with(cursor=values)
+
+    def limit(self, count):
+        return self._with(limit=count)
+
+    def _compare(self, a, b):
+        for field, descending in self._orders:
+            x, y = a[field], b[field]
+            if x != y:
+                return (1 if x < y else -1) if descending else (-1 if x < y else 1)
+        return 0
+
+    def stream(self):
+        self._client._round_trip()
+        fields = [field for field, _ in self._orders if field != '__name__']
+        # Firestore bỏ qua tài liệu không có trường dùng để sắp xếp
+        rows = [dict(data, __name__=doc_id) for doc_id, data in self._client._snapshot(self.collection_name)
+                if all(field in data for field in fields)]
+        if self._orders:
+            rows.sort(key=functools.cmp_to_key(self._compare))
+        if self._cursor is not None:
+            rows = [row for row in rows if self._compare(row, self._cursor) > 0]
+        if self._limit is not None:
+            rows = rows[:self._limit]
+        docs = [(row.pop('__name__'), row) for row in rows]
+        return iter([FakeSnapshot(FakeDocumentReference(self._client, self.collection_name, doc_id), data)
+                     for doc_id, data in docs])
+
+
+class FakeCollectionReference(FakeQuery):
+    def document(self, doc_id):
+        return FakeDocumentReference(self._client, self.collection_name, str(doc_id))
+
+
+class FakeWriteBatch:
+    MAX_OPERATIONS = 500  # giới hạn của Firestore
+
+    def __init__(self, client):
+        self._client = client
+        self._ops = []
+
+    def set(self, reference, data):
+        self._ops.append(('set', reference, data))
+
+    def update(self, reference, data):
+        self._ops.append(('update', reference, data))
+
+    def delete(self, reference):
+        self._ops.append(('delete', reference, None))
+
+    def commit(self):
+        if len(self._ops) > self.MAX_OPERATIONS:
+            raise FakeFirestoreError(f"Lô {len(self._ops)} thao tác vượt giới hạn {self.MAX_OPERATIONS}")
+        self._client._round_trip()
+        self._client._apply(self._ops)
+        self._ops = []
+
+
+class FakeFirestoreClient:
+    def __init__(self, latency=0.0, fail_rate=0.0, seed=None):
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._data = {}       # collection -> {doc_id: dict}
+        self._fail_next = 0
+        self.round_trips = 0
+        self.failed_round_trips = 0
+
+    # --- API giống firestore.Client ---
+    def collection(self, name):
+        return FakeCollectionReference(self, name)
+
+    def batch(self):
+        return FakeWriteBatch(self)
+
+    def get_all(self, references):
+        references = list(references)
+        self._round_trip()
+        return iter([FakeSnapshot(ref, self._read(ref.collection_name, ref.id)) for ref in references])
+
+    # --- Điều khiển khi thử ---
+    def fail_next(self, count=1):
+        """count round trip tiếp theo ném FakeFirestoreError."""
+        with self._lock:
+            self._fail_next += count
+
+    def documents(self, collection='ludo_matches'):
+        """Bản sao {doc_id: dict} của cả collection."""
+        return dict(self._snapshot(collection))
+
+    # --- Nội bộ ---
+    def _round_trip(self):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.round_trips += 1
+            fail = self._fail_next > 0 or (self.fail_rate and self._rng.random() < self.fail_rate)
+            if self._fail_next > 0:
+                self._fail_next -= 1
+            if fail:
+                self.failed_round_trips += 1
+        if fail:
+            raise FakeFirestoreError("Mất kết nối tới Firestore (giả lập)")
+
+    def _read(self, collection, doc_id):
+        with self._lock:
+            return copy.deepcopy(self._data.get(collection, {}).get(doc_id))
+
+    def _snapshot(self, collection):
+        with self._lock:
+            return [(doc_id, copy.deepcopy(data)) for doc_id, data in self._data.get(collection, {}).items()]
+
+    def _apply(self, ops):
+        """Áp dụng nguyên tử: kiểm tra hết rồi mới ghi, lỗi thì không ghi gì."""
+        with self._lock:
+            for kind, ref, _ in ops:
+                if kind == 'update' and ref.id not in self._data.get(ref.collection_name, {}):
+                    raise NotFound(f"Không có tài liệu {ref.collection_name}/{ref.id}")
+            for kind, ref, data in ops:
+                docs = self._data.setdefault(ref.collection_name, {})
+                if kind == 'set':
+                    docs[ref.id] = copy.deepcopy(data)
+                elif kind == 'update':
+                    docs[ref.id].update(copy.deepcopy(data))
+                else:
+                    docs.pop(ref.id, None)
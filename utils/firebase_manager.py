@@ -1,16 +1,231 @@
-import firebase_admin
-from firebase_admin import credentials, firestore
+try:
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+except ImportError:  # không có firebase_admin: chỉ lưu cục bộ (SQLite)
+    firebase_admin = None
+import atexit
+import base64
+import json
 import logging
 import datetime
+import sqlite3
+import threading
+import time
+import uuid
 from pathlib import Path
+from core import record, storage
+from utils.persistence import PersistenceBackend
+from utils.save_queue import WriteBehindQueue
+from utils.sqlite_backend import SQLiteBackend
+from utils.sync import SyncEngine
 
 db = None
 _IS_INITIALIZED = False
 
+# Backend lưu chính (cục bộ) và đích đồng bộ từ xa tuỳ chọn (Firestore)
+_local_backend = None
+_remote_backend = None
+_backend_lock = threading.Lock()
+
+# Hàng ghi trễ: save_game_state chỉ chụp bản ghi rồi trả về, luồng nền ghi vào backend cục bộ
+SAVE_QUEUE_SIZE = 64          # số ván tối đa đang chờ ghi
+HISTORY_FLUSH_TIMEOUT = 2.0   # giây chờ ghi nốt trước khi đọc lịch sử / xoá ván
+_save_queue = None
+_save_queue_lock = threading.Lock()
+
+# Đồng bộ offline-first: luồng nền đẩy outbox SQLite lên backend từ xa theo lô
+SYNC_BATCH_SIZE = 100         # số ván tối đa mỗi lô ghi Firestore
+SYNC_INTERVAL = 30.0          # giây giữa hai lần kiểm tra outbox khi không có bản lưu mới
+HISTORY_PAGE_SIZE = 30       # số ván mỗi trang lịch sử
+SHUTDOWN_FLUSH_TIMEOUT = 5.0  # giây chờ đồng bộ nốt khi thoát
+_sync = None
+_sync_lock = threading.Lock()
+_sync_atexit_registered = False
+
+
+class FirebaseStorage:
+    """Adapter lưu trữ của GameManager (core.storage) dựa trên các hàm lưu / tải bên dưới."""
+
+    def save_game_state(self, gm, winner_id=None, is_loadable=True):
+        return save_game_state(gm, winner_id=winner_id, is_loadable=is_loadable)
+
+    def load_game_state(self, match_id):
+        return load_game_state(match_id)
+
+
+class FirestoreBackend(PersistenceBackend):
+    """
+    Tài liệu ván trong collection 'ludo_matches' của Firestore. fetch_many / commit đọc và ghi
+    cả lô trong một round trip (dùng bởi utils.sync).
+
+    Bản ghi snapshot + delta (core.record) được tách như bản cục bộ: tài liệu ván chỉ giữ phần đầu
+    của Record (base, snapshot 22 byte, lượt, rng, 'ply_count' thay cho plies), các lần gieo nằm
+    trong subcollection 'moves' theo khối CHUNK_PLIES lần gieo (id = số thứ tự khối). Mỗi lần đẩy
+    chỉ ghi khối cuối còn dở và các khối mới, tài liệu ván luôn nhỏ.
+    """
+
+    CHUNK_PLIES = 64  # lần gieo mỗi tài liệu trong subcollection (~64 byte)
+    MAX_BATCH_WRITES = 500  # giới hạn số thao tác một lô ghi của Firestore
+
+    def __init__(self, client, collection='ludo_matches'):
+        self.client = client
+        self.collection = collection
+
+    def _document(self, match_id):
+        return self.client.collection(self.collection).document(str(match_id))
+
+    def _chunk(self, match_id, index):
+        return self._document(match_id).collection('moves').document(f"{index:05d}")
+
+    @classmethod
+    def _chunk_count(cls, plies):
+        return (plies + cls.CHUNK_PLIES - 1) // cls.CHUNK_PLIES
+
+    @staticmethod
+    def _stored_log(document):
+        """(base, số lần gieo) đã có trong subcollection theo tài liệu ván; (None, 0) nếu chưa có."""
+        rec = (document or {}).get('Record') or {}
+        if 'ply_count' not in rec:
+            return None, 0  # chưa có ván, hoặc bản lưu cũ giữ plies ngay trong tài liệu
+        return bytes(rec['base']), rec['ply_count']
+
+    def _match_writes(self, match_id, document, known):
+        """Các thao tác (loại, tham chiếu, dữ liệu) để ghi document lên, biết bản đang có là known."""
+        rec = document.get('Record')
+        if not rec or 'plies' not in rec:  # không có bản ghi, hoặc chỉ đổi các trường khác (phần đầu giữ nguyên)
+            return [('set', self._document(match_id), document)]
+        base, plies = bytes(rec['base']), bytes(rec['plies'])
+        stored_base, stored = self._stored_log(known)
+        old_chunks = self._chunk_count(stored)
+        if stored_base != base or stored > len(plies):
+            stored = 0  # ván bắt đầu log mới: ghi lại từ đầu
+        size = self.CHUNK_PLIES
+        first = stored // size if len(plies) > stored else self._chunk_count(len(plies))
+        ops = [('set', self._chunk(match_id, index), {'Plies': plies[index * size:(index + 1) * size]})
+               for index in range(first, self._chunk_count(len(plies)))]
+        ops += [('delete', self._chunk(match_id, index), None)
+                for index in range(self._chunk_count(len(plies)), old_chunks)]
+        header = {key: value for key, value in rec.items() if key != 'plies'}
+        header['ply_count'] = len(plies)
+        # Tài liệu ván ghi sau cùng: khối lần gieo luôn có trước khi ply_count trỏ tới
+        ops.append(('set', self._document(match_id), dict(document, Record=header)))
+        return ops
+
+    def _delete_writes(self, match_id, known):
+        _, stored = self._stored_log(known)
+        return ([('delete', self._chunk(match_id, index), None) for index in range(self._chunk_count(stored))]
+                + [('delete', self._document(match_id), None)])
+
+    def _load_plies(self, documents):
+        """Ghép lại Record['plies'] từ subcollection cho các tài liệu ván (một round trip cho cả lô)."""
+        wanted = []
+        for match_id, document in documents.items():
+            _, stored = self._stored_log(document)
+            wanted += [(match_id, index) for index in range(self._chunk_count(stored))]
+        chunks = {}
+        if wanted:
+            refs = [self._chunk(match_id, index) for match_id, index in wanted]
+            for (match_id, _), doc in zip(wanted, self.client.get_all(refs)):
+                if doc.exists:
+                    chunks.setdefault(match_id, []).append(bytes(doc.to_dict()['Plies']))
+        for match_id, document in documents.items():
+            rec = document.get('Record') or {}
+            if 'ply_count' in rec:
+                plies = b"".join(chunks.get(match_id, []))[:rec['ply_count']]
+                document['Record'] = dict({key: value for key, value in rec.items() if key != 'ply_count'},
+                                          plies=plies)
+        return documents
+
+    def save_match(self, match_id, document, create=False):
+        known = self.fetch_many([match_id])
+        current = known[str(match_id)]
+        if not create and current is not None:
+            document = dict(current, **document)  # như update: giữ các trường không có trong document
+        self.commit([(match_id, document)], known=known)
+        logging.info(f"Đã lưu game MatchID: {match_id}")
+
+    def load_match(self, match_id):
+        doc = self._document(match_id).get()
+        if not doc.exists:
+            return None
+        logging.info(f"Đã tải MatchID {match_id} từ Firebase.")
+        return self._load_plies({doc.id: doc.to_dict()})[doc.id]
+
+    def list_matches(self, limit=50, after=None):
+        # Cùng thứ tự với bản cục bộ: StartTime rồi id tài liệu, giảm dần
+        query = self.client.collection(self.collection) \
+            .order_by('StartTime', direction='DESCENDING') \
+            .order_by('__name__', direction='DESCENDING')
+        if after is not None:
+            query = query.start_after({'StartTime': after[0], '__name__': str(after[1])})
+        matches_stream = query.limit(limit).stream()
+        history = []
+        for doc in matches_stream:
+            data = doc.to_dict()
+            history.append({
+                'MatchID': doc.id,
+                'StartTime': data.get('StartTime'),
+                'EndTime': data.get('EndTime'),
+                'NumPlayers': data.get('NumPlayers'),
+                'Mode': data.get('Mode'),
+                'WinnerPlayerID': data.get('WinnerPlayerID'),
+                'is_loadable': data.get('is_loadable', False)
+            })
+        return history
+
+    def delete_match(self, match_id):
+        self.commit([], [match_id])
+        logging.info(f"Đã xóa thành công tài liệu MatchID: {match_id}")
+        return True
+
+    def fetch_many(self, match_ids):
+        """Tài liệu ván (phần đầu, không có các lần gieo) của nhiều ván trong một round trip."""
+        result = {str(match_id): None for match_id in match_ids}
+        if result:
+            for doc in self.client.get_all([self._document(match_id) for match_id in result]):
+                if doc.exists:
+                    result[doc.id] = doc.to_dict()
+        return result
+
+    def commit(self, puts, deletes=(), known=None):
+        """
+        Ghi lô; known: {match_id: tài liệu từ fetch_many} để chỉ ghi các khối lần gieo còn thiếu
+        (ván không có trong known được đọc thêm một round trip). Các thao tác của một ván luôn nằm
+        trong cùng một lô ghi.
+        """
+        known = dict(known or {})
+        missing = [str(match_id) for match_id, _ in puts if str(match_id) not in known]
+        missing += [str(match_id) for match_id in deletes if str(match_id) not in known]
+        if missing:
+            known.update(self.fetch_many(missing))
+        groups = [self._match_writes(match_id, document, known.get(str(match_id))) for match_id, document in puts]
+        groups += [self._delete_writes(match_id, known.get(str(match_id))) for match_id in deletes]
+        batch, size, writes = self.client.batch(), 0, 0
+        for ops in groups:
+            if size and size + len(ops) > self.MAX_BATCH_WRITES:
+                batch.commit()
+                batch, size = self.client.batch(), 0
+            for kind, ref, data in ops:
+                if kind == 'set':
+                    batch.set(ref, data)
+                else:
+                    batch.delete(ref)
+            size += len(ops)
+            writes += len(ops)
+        if size:
+            batch.commit()
+        logging.info(f"Đã đồng bộ lên Firebase: {len(puts)} ván, xoá {len(deletes)} ván ({writes} thao tác ghi).")
+
+
 def initialize_firebase():
     global db, _IS_INITIALIZED
     if _IS_INITIALIZED:
         return
+    # GameManager tạo sau thời điểm này sẽ lưu/tải qua firebase_manager (SQLite + Firestore nếu có)
+    storage.set_default_storage(FirebaseStorage())
+    if firebase_admin is None:
+        logging.warning("Không có firebase_admin: chỉ lưu lịch sử cục bộ.")
+        return
     try:
         CURRENT_DIR = Path(__file__).parent
         PROJECT_ROOT = CURRENT_DIR.parent
@@ -18,52 +233,137 @@ def initialize_firebase():
         cred = credentials.Certificate(str(KEY_FILE_PATH))
         firebase_admin.initialize_app(cred)
         db = firestore.client()
+        set_remote_backend(FirestoreBackend(db))
         _IS_INITIALIZED = True
         logging.info("✅ Firebase Firestore khởi tạo thành công.")
     except Exception as e:
         logging.critical(f"❌ Lỗi khởi tạo Firebase: {e}")
         db = None
 
-def _get_match_document(match_id):
-    if not db: return None
-    return db.collection('ludo_matches').document(str(match_id))
+# --- Cấu hình backend ---
+def get_local_backend():
+    """Backend lưu chính, mặc định SQLite ở data/game_history.db (mở khi cần lần đầu)."""
+    global _local_backend
+    with _backend_lock:
+        if _local_backend is None:
+            _local_backend = SQLiteBackend()
+        return _local_backend
+
+def set_local_backend(backend):
+    """Thay backend lưu chính (ví dụ SQLiteBackend với file khác)."""
+    global _local_backend
+    with _backend_lock:
+        _local_backend = backend
+
+def get_remote_backend():
+    return _remote_backend
+
+def set_remote_backend(backend):
+    """
+    Đích đồng bộ từ xa (None: chỉ lưu cục bộ). Luồng đồng bộ được khởi động và đẩy ngay
+    các thay đổi còn trong outbox (kể cả từ lần chạy trước).
+    """
+    global _remote_backend, _sync, _sync_atexit_registered
+    with _sync_lock:
+        old, _sync = _sync, None
+        _remote_backend = backend
+    # Chỉ cần tombstone cho mọi ván bị xoá khi có nơi để đẩy lệnh xoá lên
+    get_local_backend().track_deletes = backend is not None
+    if old is not None:
+        old.stop(SHUTDOWN_FLUSH_TIMEOUT)
+    if backend is None:
+        return
+    engine = SyncEngine(get_local_backend(), backend, batch_size=SYNC_BATCH_SIZE, interval=SYNC_INTERVAL)
+    with _sync_lock:
+        _sync = engine.start()
+        register_atexit = not _sync_atexit_registered
+        _sync_atexit_registered = True
+    if register_atexit:
+        atexit.register(shutdown_sync)
+
+def _get_save_queue():
+    global _save_queue
+    with _save_queue_lock:
+        if _save_queue is None:
+            _save_queue = WriteBehindQueue(_write_local, maxsize=SAVE_QUEUE_SIZE)
+            atexit.register(shutdown_save_queue)
+        return _save_queue
+
+def _write_local(match_id, match_data, create):
+    """Chạy trên luồng ghi nền: ghi một ván vào backend cục bộ rồi báo luồng đồng bộ."""
+    get_local_backend().save_match(match_id, match_data, create=create)
+    _notify_sync()
+
+def shutdown_save_queue(timeout=SHUTDOWN_FLUSH_TIMEOUT):
+    """Ghi nốt các bản lưu đang chờ vào backend cục bộ rồi dừng luồng ghi."""
+    global _save_queue
+    with _save_queue_lock:
+        queue, _save_queue = _save_queue, None
+    if queue is not None:
+        queue.close(timeout)
+        logging.info(f"Hàng ghi bản lưu đã đóng: {queue.stats()}")
+
+def save_queue_stats():
+    """Số liệu hàng ghi: depth, max_depth, submitted, coalesced, written, failed, dropped, last_write_ms..."""
+    return _get_save_queue().stats()
+
+def _notify_sync():
+    engine = _sync
+    if engine is not None:
+        engine.notify()
+
+def _flush_local(timeout=None):
+    """Chờ hàng ghi ghi hết vào backend cục bộ. True nếu xong trước timeout."""
+    queue = _save_queue
+    return queue is None or queue.flush(timeout)
+
+def flush_saves(timeout=None):
+    """
+    Chờ ghi hết hàng đợi vào bản cục bộ rồi đồng bộ hết outbox lên Firebase.
+    True nếu xong trước timeout (hoặc không có đích từ xa).
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    if not _flush_local(timeout):
+        return False
+    engine = _sync
+    return engine is None or engine.flush(None if deadline is None else max(0.0, deadline - time.monotonic()))
+
+def shutdown_sync(timeout=SHUTDOWN_FLUSH_TIMEOUT):
+    """
+    Ghi nốt hàng đợi, đồng bộ nốt rồi dừng các luồng nền (gọi khi thoát game / tắt server).
+    Phần chưa đẩy còn trong SQLite.
+    """
+    global _sync
+    shutdown_save_queue(timeout)
+    with _sync_lock:
+        engine, _sync = _sync, None
+    if engine is not None:
+        engine.stop(timeout)
+        logging.info(f"Đồng bộ Firebase đã dừng: {engine.stats()}")
+
+def sync_stats():
+    """Số liệu đồng bộ: pending, pushed, pulled, deleted, conflicts, batches, failures, last_error, last_sync_ms."""
+    engine = _sync
+    return None if engine is None else engine.stats()
 
 def save_game_state(gm, winner_id=None, is_loadable=True):
     """
-    Lưu trạng thái game lên Firebase.
+    Lưu trạng thái game (ghi trễ, không chờ I/O): bản ghi được chụp ngay trên luồng gọi, luồng ghi
+    nền lưu vào backend cục bộ (outbox), luồng đồng bộ đẩy lên Firebase sau.
     - gm: GameManager
     - winner_id: ID người thắng (nếu game kết thúc)
     - is_loadable: True nếu game có thể resume (Offline/Bot)
+    Ván mới nhận match_id sinh phía client nên gm.match_id có ngay khi hàm trả về
+    (cùng id cho bản cục bộ và tài liệu Firestore). Các lần lưu liên tiếp của cùng ván chưa kịp ghi
+    được gộp, chỉ ghi bản cuối.
     """
-    if not db:
-        logging.warning("Firebase chưa kết nối!")
-        return None
-
-    # --- Chuyển trạng thái quân cờ ---
-    pieces_state = {}
-    for pid, player_pieces in enumerate(gm.players):
-        pieces_state[f'player_{pid}'] = [
-            {
-                'piece_id': p.id,
-                'path_index': p.path_index,
-                'finished': p.finished
-            }
-            for p in player_pieces
-        ]
-
-    current_state = {
-        'num_players': gm.num_players,
-        'turn': gm.turn,
-        'dice_value': gm.dice_value,
-        'mode': 'Bot' if any('bot' in str(t).lower() for t in gm.player_types) else 'Offline',
-        'pieces_state': pieces_state
-    }
-
+    # --- Bản ghi snapshot + delta: backend chỉ ghi các lần gieo mới và snapshot định kỳ ---
+    mode = 'Bot' if any('bot' in str(t).lower() for t in gm.player_types) else 'Offline'
     match_data = {
-        'FinalState': current_state,
+        'Record': record.capture(gm, mode, finished=winner_id is not None),
         'is_loadable': is_loadable,
         'NumPlayers': gm.num_players,
-        'Mode': current_state['mode'],
+        'Mode': mode,
         'StartTime': gm.start_time.strftime("%Y-%m-%d %H:%M:%S")
     }
 
@@ -71,95 +371,122 @@ def save_game_state(gm, winner_id=None, is_loadable=True):
         match_data['WinnerPlayerID'] = winner_id
         match_data['EndTime'] = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-    try:
-        if gm.match_id:
-            # --- Update document cũ nếu đã có match_id ---
-            doc_ref = db.collection('ludo_matches').document(gm.match_id)
-            doc_ref.update(match_data)
-            logging.info(f"Đã cập nhật game MatchID: {gm.match_id}")
-        else:
-            # --- Tạo document mới chỉ khi chưa có match_id và chưa kết thúc ---
-            if winner_id is None:
-                doc_ref = db.collection('ludo_matches').document()
-                doc_ref.set(match_data)
-                gm.match_id = doc_ref.id
-                logging.info(f"Đã lưu game mới với MatchID: {gm.match_id}")
-            else:
-                # Trường hợp ván kết thúc nhưng chưa có match_id (hiếm)
-                doc_ref = db.collection('ludo_matches').document()
-                doc_ref.set(match_data)
-                gm.match_id = doc_ref.id
-                logging.info(f"Đã lưu game kết thúc với MatchID: {gm.match_id}")
-    except Exception as e:
-        logging.error(f"Lỗi khi lưu game vào Firebase: {e}")
+    # --- Ván chưa có match_id: sinh id phía client (không gọi mạng), lần ghi đầu là tạo mới ---
+    create = not gm.match_id
+    if create:
+        gm.match_id = uuid.uuid4().hex
 
-    logging.debug(f"Data đang lưu:\n{match_data}")
+    _get_save_queue().submit(gm.match_id, match_data, create=create)
+    logging.debug(f"Đã lưu MatchID {gm.match_id}: {len(gm.move_log)} lần gieo, lượt P{gm.turn + 1}")
     return gm.match_id
 
-# --- Các hàm còn lại giữ nguyên ---
+def _load_document(match_id):
+    """Tài liệu ván, tìm ở hàng ghi, bản cục bộ rồi tới Firebase (None nếu không có)."""
+    # Bản lưu chưa ghi xong: đọc lại ngay từ hàng ghi
+    queue = _save_queue
+    pending = queue.pending_payload(str(match_id)) if queue is not None else None
+    if pending is not None:
+        return pending
+    try:
+        data = get_local_backend().load_match(match_id)
+        if data is not None:
+            return data
+    except sqlite3.Error as e:
+        logging.error(f"Lỗi khi tải MatchID {match_id} từ bộ nhớ cục bộ: {e}")
+    if _remote_backend is not None:
+        try:
+            return _remote_backend.load_match(match_id)
+        except Exception as e:
+            logging.error(f"Lỗi khi tải từ Firebase: {e}")
+    return None
+
 def load_game_state(match_id):
-    if not db:
-        logging.warning("Firebase chưa kết nối.")
+    """
+    Trạng thái để GameManager._apply_loaded_state khôi phục (chỉ ván Offline / Bot): Record
+    (snapshot + delta) hoặc FinalState của bản lưu cũ.
+    """
+    data = _load_document(match_id)
+    if data is None:
+        logging.warning(f"Không tìm thấy MatchID {match_id}.")
         return None
-    doc_ref = _get_match_document(match_id)
-    if not doc_ref:
+    final_state = data.get('Record') or data.get('FinalState')
+    if final_state and final_state.get('mode') in ['Offline', 'Bot']:
+        return final_state
+    return None
+
+def load_replay(match_id):
+    """core.movelog.Replay của cả ván để xem lại từng nước (mọi chế độ), None nếu ván không có bản ghi."""
+    data = _load_document(match_id)
+    if not data or not data.get('Record'):
         return None
+    return record.replay(data['Record'])
+
+def _encode_cursor(match):
+    raw = json.dumps([match.get('StartTime') or '', match['MatchID']]).encode()
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+def _decode_cursor(cursor):
     try:
-        doc = doc_ref.get()
-        if doc.exists:
-            data = doc.to_dict()
-            logging.info(f"Đã tải MatchID {match_id} từ Firebase.")
-            final_state = data.get('FinalState')
-            if final_state and final_state.get('mode') in ['Offline', 'Bot']:
-                return final_state
-            return None
-        else:
-            logging.warning(f"Không tìm thấy MatchID {match_id}.")
-            return None
-    except Exception as e:
-        logging.error(f"Lỗi khi tải từ Firebase: {e}")
-        return None
+        start_time, match_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Cursor lịch sử không hợp lệ: {cursor!r}") from e
+    return start_time, match_id
 
-def get_match_history(limit=50):
-    if not db:
-        logging.warning("Firebase chưa kết nối.")
-        return []
+def get_match_history_page(cursor=None, limit=HISTORY_PAGE_SIZE):
+    """
+    Một trang lịch sử theo (StartTime, MatchID) giảm dần: (list ván, cursor trang sau hoặc None).
+    cursor là chuỗi mờ lấy từ trang trước (bắt đầu ngay sau ván cuối của trang đó).
+    Mỗi MatchID chỉ xuất hiện một lần: khoá chính ở bản cục bộ, id tài liệu trên Firebase; ván có ở
+    cả hai nơi lấy bản cục bộ, ván đã xoá cục bộ nhưng chưa đồng bộ không được lấy từ Firebase.
+    """
+    after = None if cursor is None else _decode_cursor(cursor)
+    _flush_local(HISTORY_FLUSH_TIMEOUT)  # ván vừa lưu phải có trong lịch sử
+    local = get_local_backend()
+    more = False
     try:
-        matches_stream = db.collection('ludo_matches') \
-            .order_by('StartTime', direction=firestore.Query.DESCENDING) \
-            .limit(limit).stream()
-    except Exception as e:
-        logging.error(f"Lỗi khi lấy lịch sử: {e}")
-        return []
-
-    history = []
-    for doc in matches_stream:
-        data = doc.to_dict()
-        history.append({
-            'MatchID': doc.id,
-            'StartTime': data.get('StartTime'),
-            'EndTime': data.get('EndTime'),
-            'NumPlayers': data.get('NumPlayers'),
-            'Mode': data.get('Mode'),
-            'WinnerPlayerID': data.get('WinnerPlayerID'),
-            'is_loadable': data.get('is_loadable', False)
-        })
-    return history
+        page = local.list_matches(limit, after)
+        more = len(page) >= limit
+    except sqlite3.Error as e:
+        logging.error(f"Lỗi khi lấy lịch sử cục bộ: {e}")
+        page = []
+    if _remote_backend is not None:
+        try:
+            remote = _remote_backend.list_matches(limit, after)
+        except Exception as e:
+            logging.error(f"Lỗi khi lấy lịch sử: {e}")
+            remote = []
+        more = more or len(remote) >= limit
+        known = {match['MatchID'] for match in page}
+        remote = [match for match in remote if match['MatchID'] not in known]
+        if remote:
+            deleted = local.deleted_ids(match['MatchID'] for match in remote)
+            page.extend(match for match in remote if match['MatchID'] not in deleted)
+            page.sort(key=lambda match: (match.get('StartTime') or '', match['MatchID']), reverse=True)
+            more = more or len(page) > limit
+            page = page[:limit]
+    next_cursor = _encode_cursor(page[-1]) if more and page else None
+    return page, next_cursor
+
+def get_match_history(limit=50):
+    """limit ván mới nhất (trang đầu của get_match_history_page)."""
+    return get_match_history_page(limit=limit)[0]
 
 def delete_match_history(match_id):
-    if not db:
-        logging.warning("Firebase chưa kết nối.")
-        return False
-        
-    doc_ref = _get_match_document(match_id)
-    if not doc_ref:
-        logging.warning(f"Không tìm thấy tài liệu MatchID {match_id} để xóa.")
-        return False
-        
+    """
+    Xoá ván cục bộ; tombstone trong outbox để luồng đồng bộ xoá cả tài liệu trên Firebase.
+    Trả về True nếu ván có trong bản cục bộ và đã bị xoá (tài liệu chỉ có trên Firebase vẫn được xoá sau).
+    """
+    deleted = False
+    queue = _save_queue
+    if queue is not None:
+        queue.discard(str(match_id))  # bản lưu chờ ghi không được tạo lại ván đã xoá
+        queue.flush(HISTORY_FLUSH_TIMEOUT)
     try:
-        doc_ref.delete()
-        logging.info(f"Đã xóa thành công tài liệu MatchID: {match_id}")
-        return True
-    except Exception as e:
-        logging.error(f"Lỗi khi xóa MatchID {match_id} khỏi Firebase: {e}")
-        return False
+        deleted = get_local_backend().delete_match(match_id)
+    except sqlite3.Error as e:
+        logging.error(f"Lỗi khi xóa MatchID {match_id} khỏi bộ nhớ cục bộ: {e}")
+    if not deleted:
+        logging.warning(f"Không tìm thấy MatchID {match_id} trong bộ nhớ cục bộ để xóa.")
+    if _remote_backend is not None:
+        _notify_sync()
+    return deleted
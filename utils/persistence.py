@@ -0,0 +1,79 @@
+# utils/persistence.py
+"""
+Giao diện backend lưu trữ ván cờ dùng bởi utils.firebase_manager.
+
+Đơn vị lưu là "tài liệu ván" (match document) có cùng dạng với tài liệu Firestore 'ludo_matches':
+    {'Record': {...}, 'is_loadable': bool, 'NumPlayers': int, 'Mode': str, 'StartTime': str,
+     'WinnerPlayerID': int (khi đã kết thúc), 'EndTime': str (khi đã kết thúc)}
+Record là bản ghi snapshot + delta của core.record: {'num_players', 'mode', 'turn', 'dice_value', 'rng',
+'base', 'plies', 'snapshot', 'check', 'replayable', 'finished'}; backend chỉ cần ghi phần plies chưa có.
+Bản lưu cũ có 'FinalState' = {'num_players', 'turn', 'dice_value', 'mode', 'pieces_state', 'rng', 'move_log'}
+thay cho 'Record' và vẫn được đọc.
+
+Backend cục bộ (utils.sqlite_backend.SQLiteBackend) là nơi lưu chính; Firestore
+(firebase_manager.FirestoreBackend) là đích đồng bộ từ xa tuỳ chọn, được utils.sync.SyncEngine
+đẩy lên theo lô qua fetch_many / commit. Tài liệu đã đồng bộ có thêm các trường 'Version',
+'UpdatedAt' và 'DeviceID' (máy đã ghi phiên bản đó), dùng để phân xử xung đột (precedence).
+"""
+
+
+def precedence(document):
+    """
+    Khoá thứ tự giữa hai bản của cùng một ván: Version, rồi UpdatedAt, rồi DeviceID. Bản có khoá lớn
+    hơn thắng; mọi máy so cùng hai bản đều ra cùng kết quả (kể cả khi hai máy lưu cùng Version).
+    """
+    return (document.get('Version') or 0, document.get('UpdatedAt') or '', document.get('DeviceID') or '')
+
+
+class PersistenceBackend:
+    """Backend lưu tài liệu ván theo match_id (chuỗi)."""
+
+    def save_match(self, match_id, document, create=False):
+        """
+        Ghi tài liệu ván. create=True: tạo mới (ghi đè nếu đã có); ngược lại cập nhật các trường
+        có trong document, giữ nguyên các trường không có (giống update của Firestore).
+        """
+        raise NotImplementedError
+
+    def save_many(self, items):
+        """Ghi nhiều (match_id, document, create) một lượt. Mặc định ghi lần lượt."""
+        for match_id, document, create in items:
+            self.save_match(match_id, document, create)
+
+    def load_match(self, match_id):
+        """Tài liệu ván, None nếu không có."""
+        raise NotImplementedError
+
+    def list_matches(self, limit=50, after=None):
+        """
+        Tóm tắt các ván mới nhất theo (StartTime, MatchID) giảm dần: list dict với các khoá
+        MatchID, StartTime, EndTime, NumPlayers, Mode, WinnerPlayerID, is_loadable.
+        after=(StartTime, MatchID): chỉ các ván đứng sau khoá này (trang tiếp theo). Mỗi MatchID một dòng.
+        """
+        raise NotImplementedError
+
+    def delete_match(self, match_id):
+        """Xoá ván. Trả về True nếu đã xoá."""
+        raise NotImplementedError
+
+    def fetch_many(self, match_ids):
+        """
+        {match_id: tài liệu hoặc None} cho nhiều ván. Đủ để so precedence và truyền lại cho commit;
+        backend có thể bỏ phần nặng (các lần gieo), load_match mới trả tài liệu đầy đủ.
+        Mặc định đọc lần lượt.
+        """
+        return {match_id: self.load_match(match_id) for match_id in match_ids}
+
+    def commit(self, puts, deletes=(), known=None):
+        """
+        Ghi lô: puts là list (match_id, document) ghi đè toàn bộ tài liệu, deletes là list match_id.
+        known: {match_id: tài liệu từ fetch_many} đang có ở backend, để chỉ ghi phần thay đổi.
+        Backend từ xa nên ghi cả lô trong một round trip. Mặc định ghi lần lượt.
+        """
+        for match_id, document in puts:
+            self.save_match(match_id, document, create=True)
+        for match_id in deletes:
+            self.delete_match(match_id)
+
+    def close(self):
+        pass
@@ -0,0 +1,140 @@
+# utils/save_queue.py
+"""
+Hàng đợi ghi trễ (write-behind) cho tầng lưu trữ.
+
+Luồng gọi (vòng lặp vẽ, lượt của server) chỉ chụp dữ liệu cần lưu rồi submit(key, payload):
+không chờ I/O. Một luồng nền ghi lần lượt bằng write_func(key, payload, create).
+- Gộp theo key: nhiều lần lưu cùng một ván khi chưa kịp ghi chỉ còn lần cuối (create được giữ
+  lại nếu một lần nào đó trong nhóm là lần tạo mới).
+- Giới hạn maxsize ván đang chờ: hàng đầy thì submit một ván mới chờ tối đa put_timeout giây
+  rồi bỏ (ghi log lỗi); lưu tiếp một ván đang chờ luôn được vì chỉ thay payload.
+- Ghi lỗi thì thử lại tối đa max_attempts lần (trừ khi đã có payload mới hơn cho key đó).
+- flush() chờ ghi hết, close() flush rồi dừng luồng; stats() trả về số liệu độ sâu hàng đợi.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+
+class WriteBehindQueue:
+    def __init__(self, write_func, maxsize=64, put_timeout=0.05, max_attempts=3, retry_delay=0.5,
+                 name="save-writer"):
+        self.write_func = write_func
+        self.maxsize = maxsize
+        self.put_timeout = put_timeout
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.name = name
+        self._pending = OrderedDict()  # key -> (payload, create, attempts)
+        self._in_flight = None         # key đang ghi
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = None
+        self._stats = {'submitted': 0, 'coalesced': 0, 'written': 0, 'failed': 0, 'dropped': 0,
+                       'max_depth': 0, 'last_write_ms': 0.0}
+
+    # --- Phía luồng gọi ---
+    def submit(self, key, payload, create=False):
+        """Xếp payload vào hàng ghi của key. Trả về False nếu bị bỏ (hàng đầy hoặc đã đóng)."""
+        with self._cond:
+            if self._closed:
+                logging.error(f"Hàng ghi {self.name} đã đóng, bỏ bản lưu {key}")
+                self._stats['dropped'] += 1
+                return False
+            self._stats['submitted'] += 1
+            old = self._pending.get(key)
+            if old is not None:
+                self._pending[key] = (payload, create or old[1], 0)
+                self._stats['coalesced'] += 1
+                return True
+            if len(self._pending) >= self.maxsize:
+                self._cond.wait_for(lambda: len(self._pending) < self.maxsize or self._closed, self.put_timeout)
+                if len(self._pending) >= self.maxsize or self._closed:
+                    logging.error(f"Hàng ghi {self.name} đầy ({self.maxsize}), bỏ bản lưu {key}")
+                    self._stats['dropped'] += 1
+                    return False
+            self._pending[key] = (payload, create, 0)
+            self._stats['max_depth'] = max(self._stats['max_depth'], len(self._pending))
+            self._ensure_thread()
+            self._cond.notify_all()
+            return True
+
+    def pending_payload(self, key):
+        """Payload chưa ghi xong của key (để đọc lại ngay thứ vừa lưu), None nếu không có."""
+        with self._cond:
+            entry = self._pending.get(key)
+            if entry is None and self._in_flight is not None and self._in_flight[0] == key:
+                entry = self._in_flight[1:]
+            return None if entry is None else entry[0]
+
+    def discard(self, key):
+        """Bỏ bản lưu đang chờ của key (ví dụ trước khi xoá ván)."""
+        with self._cond:
+            self._pending.pop(key, None)
+            self._cond.notify_all()
+
+    def flush(self, timeout=None):
+        """Chờ ghi hết các bản đang chờ. Trả về True nếu hàng đã rỗng trước timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pending and self._in_flight is None, timeout)
+
+    def close(self, timeout=5.0):
+        """Ghi nốt các bản đang chờ (tối đa timeout giây) rồi dừng luồng nền."""
+        flushed = self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            if not flushed:
+                logging.error(f"Hàng ghi {self.name}: còn {len(self._pending)} bản lưu chưa ghi khi đóng")
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return flushed
+
+    def stats(self):
+        """Số liệu: depth (ván đang chờ), in_flight, max_depth, submitted, coalesced, written, failed, dropped..."""
+        with self._cond:
+            stats = dict(self._stats)
+            stats['depth'] = len(self._pending)
+            stats['in_flight'] = self._in_flight is not None
+            return stats
+
+    # --- Luồng nền ---
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._closed)
+                if not self._pending:
+                    return
+                key, (payload, create, attempts) = self._pending.popitem(last=False)
+                self._in_flight = (key, payload, create, attempts)
+            start = time.perf_counter()
+            try:
+                self.write_func(key, payload, create)
+                error = None
+            except Exception as e:
+                error = e
+            with self._cond:
+                self._in_flight = None
+                self._stats['last_write_ms'] = (time.perf_counter() - start) * 1000
+                if error is None:
+                    self._stats['written'] += 1
+                elif key in self._pending:
+                    # Đã có bản mới hơn: bỏ bản lỗi, nhưng bản mới phải tạo tài liệu nếu bản lỗi là lần tạo
+                    newer, newer_create, newer_attempts = self._pending[key]
+                    self._pending[key] = (newer, newer_create or create, newer_attempts)
+                    self._stats['failed'] += 1
+                elif attempts + 1 < self.max_attempts and not self._closed:
+                    logging.warning(f"Ghi {key} lỗi ({error}), thử lại lần {attempts + 2}/{self.max_attempts}")
+                    self._pending[key] = (payload, create, attempts + 1)
+                else:
+                    logging.error(f"Ghi {key} lỗi, bỏ bản lưu: {error}")
+                    self._stats['failed'] += 1
+                self._cond.notify_all()
+            if error is not None:
+                time.sleep(self.retry_delay)
@@ -0,0 +1,506 @@
+# utils/sqlite_backend.py
+"""
+Backend lưu trữ cục bộ bằng SQLite (data/game_history.db), chạy không cần mạng.
+
+- WAL + synchronous=NORMAL: ghi không chờ fsync mỗi commit, đọc không chặn ghi.
+- Mọi câu lệnh là hằng SQL có tham số: sqlite3 giữ sẵn bản đã biên dịch (cached_statements),
+  mỗi lần lưu chỉ bind lại tham số.
+- Một lần lưu (bảng ván + bản lưu + một dòng GameActions) là một transaction; save_many gom
+  nhiều ván vào một transaction.
+- Chỉ mục theo (StartTime, MatchID) cho lịch sử phân trang theo khoá (keyset: trang sau bắt đầu ngay
+  sau ván cuối của trang trước, không OFFSET), theo Mode, WinnerPlayerID và MatchID của GameActions.
+  MatchID là khoá chính nên mỗi ván chỉ có một dòng lịch sử.
+- Bản lưu dạng snapshot + delta (core.record): mỗi lần lưu chỉ nối các lần gieo mới vào MatchMoves,
+  snapshot 22 byte vào MatchSnapshots mỗi record.SNAPSHOT_INTERVAL lần gieo; SavedGames chỉ còn cho bản lưu cũ.
+- Là "outbox" cho đồng bộ (utils.sync): mỗi lần lưu tăng Version; ván có Version > SyncedVersion
+  và các ván đã xoá (DeletedMatches) là thay đổi chưa đẩy lên Firestore. Mỗi file có một DeviceID
+  (SyncMeta) ghi kèm phiên bản để phân xử khi hai máy lưu cùng Version (persistence.precedence).
+
+Lược đồ (PRAGMA user_version = 4), MatchID là chuỗi (cùng id với tài liệu Firestore):
+    GameMatches(MatchID, Mode, NumPlayers, StartTime, EndTime, WinnerPlayerID, IsLoadable, UpdatedAt,
+                Version, SyncedVersion, DeviceID)
+    MatchLogs(MatchID, Base BLOB, Plies, SnapshotPly, Turn, DiceValue, Rng JSON, RngRolls, RngAuxDraws,
+              PositionCheck, Replayable)        -- phần hiện tại; mỗi lần lưu chỉ cập nhật các cột số
+    MatchMoves(MatchID, FromPly, Plies BLOB)    -- delta: các lần gieo từ FromPly, chỉ nối thêm
+    MatchSnapshots(MatchID, Ply, State BLOB)    -- GameState.to_bytes() sau Ply lần gieo
+    SavedGames(MatchID, Turn, DiceValue, PiecesState JSON, Rng JSON, MoveLog BLOB, LastUpdated)  -- bản lưu cũ
+    GameActions(ActionID, MatchID, PlayerID, ActionType, Detail, Timestamp)  -- nhật ký lưu / kết thúc
+    DeletedMatches(MatchID, DeletedAt)  -- ván đã xoá cục bộ, chờ xoá trên Firestore
+    SyncMeta(Key, Value)                -- 'DeviceID' của file này
+File cũ (user_version = 0, MatchID số nguyên; hoặc 1..3) được chuyển sang lược đồ mới khi mở lần đầu.
+"""
+import datetime
+import json
+import logging
+import os
+import sqlite3
+import threading
+import uuid
+
+from core import record
+from utils.persistence import PersistenceBackend, precedence
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')  # theo thư mục gói, không theo thư mục đang chạy
+DEFAULT_PATH = os.path.join(DATA_DIR, 'game_history.db')
+SCHEMA_VERSION = 4
+
+SCHEMA_SYNC = """
+CREATE TABLE IF NOT EXISTS DeletedMatches (
+    MatchID TEXT PRIMARY KEY,
+    DeletedAt TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_GameMatches_Unsynced ON GameMatches (UpdatedAt) WHERE Version > SyncedVersion;
+CREATE TABLE IF NOT EXISTS SyncMeta (
+    Key TEXT PRIMARY KEY,
+    Value TEXT NOT NULL
+);
+"""
+
+SCHEMA_RECORD = """
+CREATE TABLE IF NOT EXISTS MatchLogs (
+    MatchID TEXT PRIMARY KEY REFERENCES GameMatches (MatchID) ON DELETE CASCADE,
+    Base BLOB NOT NULL,
+    Plies INTEGER NOT NULL,
+    SnapshotPly INTEGER NOT NULL,
+    Turn INTEGER NOT NULL,
+    DiceValue INTEGER,
+    Rng TEXT,
+    RngRolls INTEGER NOT NULL DEFAULT 0,
+    RngAuxDraws INTEGER NOT NULL DEFAULT 0,
+    PositionCheck TEXT,
+    Replayable INTEGER NOT NULL DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS MatchMoves (
+    MatchID TEXT NOT NULL REFERENCES GameMatches (MatchID) ON DELETE CASCADE,
+    FromPly INTEGER NOT NULL,
+    Plies BLOB NOT NULL,
+    PRIMARY KEY (MatchID, FromPly)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS MatchSnapshots (
+    MatchID TEXT NOT NULL REFERENCES GameMatches (MatchID) ON DELETE CASCADE,
+    Ply INTEGER NOT NULL,
+    State BLOB NOT NULL,
+    PRIMARY KEY (MatchID, Ply)
+) WITHOUT ROWID;
+"""
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS GameMatches (
+    MatchID TEXT PRIMARY KEY,
+    Mode TEXT NOT NULL, NumPlayers INTEGER NOT NULL,
+    StartTime TEXT NOT NULL, EndTime TEXT,
+    WinnerPlayerID INTEGER,
+    IsLoadable INTEGER NOT NULL DEFAULT 0,
+    UpdatedAt TEXT,
+    Version INTEGER NOT NULL DEFAULT 0,
+    SyncedVersion INTEGER NOT NULL DEFAULT 0,
+    DeviceID TEXT
+);
+CREATE TABLE IF NOT EXISTS SavedGames (
+    MatchID TEXT PRIMARY KEY REFERENCES GameMatches (MatchID) ON DELETE CASCADE,
+    Turn INTEGER NOT NULL,
+    DiceValue INTEGER,
+    PiecesState TEXT NOT NULL,
+    Rng TEXT,
+    MoveLog BLOB,
+    LastUpdated TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS GameActions (
+    ActionID INTEGER PRIMARY KEY AUTOINCREMENT,
+    MatchID TEXT NOT NULL REFERENCES GameMatches (MatchID) ON DELETE CASCADE,
+    PlayerID INTEGER NOT NULL,
+    ActionType TEXT NOT NULL, Detail TEXT,
+    Timestamp TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_GameMatches_History ON GameMatches (StartTime DESC, MatchID DESC);
+CREATE INDEX IF NOT EXISTS idx_GameMatches_Mode ON GameMatches (Mode, StartTime DESC);
+CREATE INDEX IF NOT EXISTS idx_GameMatches_Winner ON GameMatches (WinnerPlayerID);
+CREATE INDEX IF NOT EXISTS idx_GameActions_MatchID ON GameActions (MatchID);
+""" + SCHEMA_SYNC + SCHEMA_RECORD
+
+# Lược đồ cũ (MatchID INTEGER AUTOINCREMENT) -> lược đồ hiện tại; các ván đã có được đánh dấu chờ đẩy lên một lần
+MIGRATE_V0 = """
+ALTER TABLE GameMatches RENAME TO GameMatches_v0;
+ALTER TABLE SavedGames RENAME TO SavedGames_v0;
+ALTER TABLE GameActions RENAME TO GameActions_v0;
+""" + SCHEMA + """
+INSERT INTO GameMatches (MatchID, Mode, NumPlayers, StartTime, EndTime, WinnerPlayerID, IsLoadable, UpdatedAt,
+                         Version, SyncedVersion)
+    SELECT CAST(m.MatchID AS TEXT), m.Mode, m.NumPlayers, m.StartTime, m.EndTime, m.WinnerPlayerID,
+           s.MatchID IS NOT NULL AND m.WinnerPlayerID IS NULL, COALESCE(s.LastUpdated, m.EndTime, m.StartTime),
+           1, 0
+    FROM GameMatches_v0 m LEFT JOIN SavedGames_v0 s ON s.MatchID = m.MatchID;
+INSERT INTO SavedGames (MatchID, Turn, DiceValue, PiecesState, LastUpdated)
+    SELECT CAST(MatchID AS TEXT), Turn, DiceValue, PiecesState, LastUpdated FROM SavedGames_v0;
+INSERT INTO GameActions (MatchID, PlayerID, ActionType, Detail, Timestamp)
+    SELECT CAST(MatchID AS TEXT), PlayerID, ActionType, Detail, Timestamp FROM GameActions_v0 ORDER BY ActionID;
+DROP TABLE GameActions_v0;
+DROP TABLE SavedGames_v0;
+DROP TABLE GameMatches_v0;
+"""
+
+# Lược đồ 1 -> 2: thêm phiên bản đồng bộ và máy đã ghi phiên bản đó; các ván đã có được đánh dấu chờ đẩy lên một lần
+MIGRATE_V1 = """
+ALTER TABLE GameMatches ADD COLUMN Version INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE GameMatches ADD COLUMN SyncedVersion INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE GameMatches ADD COLUMN DeviceID TEXT;
+""" + SCHEMA_SYNC
+
+# Lược đồ 2 -> 3: bảng bản ghi snapshot + delta (bản lưu cũ vẫn đọc từ SavedGames)
+MIGRATE_V2 = SCHEMA_RECORD
+
+# Lược đồ 3 -> 4: chỉ mục lịch sử gồm cả MatchID để phân trang theo khoá
+MIGRATE_V3 = """
+DROP INDEX IF EXISTS idx_GameMatches_StartTime;
+CREATE INDEX IF NOT EXISTS idx_GameMatches_History ON GameMatches (StartTime DESC, MatchID DESC);
+"""
+
+# Lưu cục bộ: mỗi lần lưu tăng Version (create=True ghi đè mọi trường, vẫn tăng Version để thắng bản cũ trên Firestore)
+INSERT_MATCH = """
+INSERT INTO GameMatches (MatchID, Mode, NumPlayers, StartTime, EndTime, WinnerPlayerID, IsLoadable, UpdatedAt,
+                         DeviceID, Version, SyncedVersion)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 1, 0)
+ON CONFLICT (MatchID) DO UPDATE SET
+    Mode = excluded.Mode, NumPlayers = excluded.NumPlayers, StartTime = excluded.StartTime,
+    EndTime = excluded.EndTime, WinnerPlayerID = excluded.WinnerPlayerID,
+    IsLoadable = excluded.IsLoadable, UpdatedAt = excluded.UpdatedAt, DeviceID = excluded.DeviceID,
+    Version = GameMatches.Version + 1
+"""
+# Cập nhật (create=False): giữ EndTime / người thắng cũ nếu tài liệu không có (như update của Firestore)
+UPSERT_MATCH = """
+INSERT INTO GameMatches (MatchID, Mode, NumPlayers, StartTime, EndTime, WinnerPlayerID, IsLoadable, UpdatedAt,
+                         DeviceID, Version, SyncedVersion)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 1, 0)
+ON CONFLICT (MatchID) DO UPDATE SET
+    Mode = excluded.Mode, NumPlayers = excluded.NumPlayers, StartTime = excluded.StartTime,
+    EndTime = COALESCE(excluded.EndTime, GameMatches.EndTime),
+    WinnerPlayerID = COALESCE(excluded.WinnerPlayerID, GameMatches.WinnerPlayerID),
+    IsLoadable = excluded.IsLoadable, UpdatedAt = excluded.UpdatedAt, DeviceID = excluded.DeviceID,
+    Version = GameMatches.Version + 1
+"""
+# Bản từ Firestore (đồng bộ kéo về): nhận đúng phiên bản, UpdatedAt và DeviceID của bản xa, coi như đã đồng bộ
+REMOTE_MATCH = """
+INSERT INTO GameMatches (MatchID, Mode, NumPlayers, StartTime, EndTime, WinnerPlayerID, IsLoadable, UpdatedAt,
+                         DeviceID, Version, SyncedVersion)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (MatchID) DO UPDATE SET
+    Mode = excluded.Mode, NumPlayers = excluded.NumPlayers, StartTime = excluded.StartTime,
+    EndTime = excluded.EndTime, WinnerPlayerID = excluded.WinnerPlayerID,
+    IsLoadable = excluded.IsLoadable, UpdatedAt = excluded.UpdatedAt, DeviceID = excluded.DeviceID,
+    Version = excluded.Version, SyncedVersion = excluded.SyncedVersion
+"""
+UPSERT_SAVED = """
+INSERT INTO SavedGames (MatchID, Turn, DiceValue, PiecesState, Rng, MoveLog, LastUpdated)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (MatchID) DO UPDATE SET
+    Turn = excluded.Turn, DiceValue = excluded.DiceValue, PiecesState = excluded.PiecesState,
+    Rng = excluded.Rng, MoveLog = excluded.MoveLog, LastUpdated = excluded.LastUpdated
+"""
+INSERT_ACTION = "INSERT INTO GameActions (MatchID, PlayerID, ActionType, Detail, Timestamp) VALUES (?, ?, ?, ?, ?)"
+SELECT_MATCH = """
+SELECT m.Mode, m.NumPlayers, m.StartTime, m.EndTime, m.WinnerPlayerID, m.IsLoadable, m.Version, m.UpdatedAt,
+       m.DeviceID, s.Turn, s.DiceValue, s.PiecesState, s.Rng, s.MoveLog
+FROM GameMatches m LEFT JOIN SavedGames s ON s.MatchID = m.MatchID
+WHERE m.MatchID = ?
+"""
+SELECT_HISTORY = """
+SELECT MatchID, StartTime, EndTime, NumPlayers, Mode, WinnerPlayerID, IsLoadable
+FROM GameMatches ORDER BY StartTime DESC, MatchID DESC LIMIT ?
+"""
+SELECT_HISTORY_AFTER = """
+SELECT MatchID, StartTime, EndTime, NumPlayers, Mode, WinnerPlayerID, IsLoadable
+FROM GameMatches WHERE (StartTime, MatchID) < (?, ?) ORDER BY StartTime DESC, MatchID DESC LIMIT ?
+"""
+SELECT_DELETED = "SELECT MatchID FROM DeletedMatches WHERE MatchID IN ({})"
+# --- Bản ghi snapshot + delta ---
+SELECT_LOG = "SELECT Base, Plies, SnapshotPly FROM MatchLogs WHERE MatchID = ?"
+# Ghi lại từ đầu (ván mới / log mới): base và phần không đổi của RNG chỉ ghi ở đây
+REPLACE_LOG = """
+INSERT OR REPLACE INTO MatchLogs (MatchID, Base, Plies, SnapshotPly, Turn, DiceValue, Rng, RngRolls, RngAuxDraws,
+                                  PositionCheck, Replayable)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+UPDATE_LOG = """
+UPDATE MatchLogs SET Plies = ?, SnapshotPly = ?, Turn = ?, DiceValue = ?, RngRolls = ?, RngAuxDraws = ?,
+                     PositionCheck = ?, Replayable = ?
+WHERE MatchID = ?
+"""
+INSERT_MOVES = "INSERT OR REPLACE INTO MatchMoves (MatchID, FromPly, Plies) VALUES (?, ?, ?)"
+INSERT_SNAPSHOT = "INSERT OR REPLACE INTO MatchSnapshots (MatchID, Ply, State) VALUES (?, ?, ?)"
+CLEAR_MOVES = "DELETE FROM MatchMoves WHERE MatchID = ?"
+CLEAR_SNAPSHOTS = "DELETE FROM MatchSnapshots WHERE MatchID = ?"
+DELETE_SAVED = "DELETE FROM SavedGames WHERE MatchID = ?"
+SELECT_RECORD = """
+SELECT l.Base, l.Plies, l.SnapshotPly, l.Turn, l.DiceValue, l.Rng, l.RngRolls, l.RngAuxDraws, l.PositionCheck,
+       l.Replayable, s.State
+FROM MatchLogs l LEFT JOIN MatchSnapshots s ON s.MatchID = l.MatchID AND s.Ply = l.SnapshotPly
+WHERE l.MatchID = ?
+"""
+SELECT_MOVES = "SELECT Plies FROM MatchMoves WHERE MatchID = ? ORDER BY FromPly"
+SELECT_PRECEDENCE = "SELECT Version, UpdatedAt, DeviceID FROM GameMatches WHERE MatchID = ?"
+DELETE_MATCH = "DELETE FROM GameMatches WHERE MatchID = ?"
+# --- Outbox đồng bộ ---
+SELECT_UNSYNCED = "SELECT MatchID FROM GameMatches WHERE Version > SyncedVersion ORDER BY UpdatedAt LIMIT ?"
+COUNT_UNSYNCED = "SELECT (SELECT COUNT(*) FROM GameMatches WHERE Version > SyncedVersion) + (SELECT COUNT(*) FROM DeletedMatches)"
+MARK_SYNCED = "UPDATE GameMatches SET SyncedVersion = ? WHERE MatchID = ? AND SyncedVersion < ?"
+SELECT_SYNCED_VERSION = "SELECT SyncedVersion FROM GameMatches WHERE MatchID = ?"
+INSERT_TOMBSTONE = "INSERT OR REPLACE INTO DeletedMatches (MatchID, DeletedAt) VALUES (?, ?)"
+DELETE_TOMBSTONE = "DELETE FROM DeletedMatches WHERE MatchID = ?"
+SELECT_TOMBSTONES = "SELECT MatchID FROM DeletedMatches ORDER BY DeletedAt LIMIT ?"
+SELECT_DEVICE_ID = "SELECT Value FROM SyncMeta WHERE Key = 'DeviceID'"
+INSERT_DEVICE_ID = "INSERT OR IGNORE INTO SyncMeta (Key, Value) VALUES ('DeviceID', ?)"
+
+
+def _now():
+    return datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+class SQLiteBackend(PersistenceBackend):
+    """
+    Một kết nối dùng chung cho mọi luồng (UI, server, luồng đồng bộ), tuần tự hoá bằng khoá.
+    track_deletes: ghi tombstone cho mọi ván bị xoá (firebase_manager bật khi có đích đồng bộ từ xa).
+    Khi tắt, chỉ ván đã từng được đẩy lên (SyncedVersion > 0) mới cần tombstone.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, track_deletes=False):
+        self.path = path
+        self.track_deletes = track_deletes
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # isolation_level=None: tự quản lý BEGIN / COMMIT để gom đúng các câu lệnh cần thiết
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, cached_statements=64)
+        self._lock = threading.Lock()
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._migrate()
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self.device_id = self._device_id()
+
+    def _migrate(self):
+        conn = self._conn
+        (version,) = conn.execute("PRAGMA user_version").fetchone()
+        if version >= SCHEMA_VERSION:
+            return
+        existing = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'GameMatches'").fetchone() is not None
+        if not existing:
+            script = SCHEMA
+        elif version == 0:
+            script = MIGRATE_V0
+        else:
+            script = "".join((MIGRATE_V1, MIGRATE_V2, MIGRATE_V3)[version - 1:])  # các bước nối tiếp từ lược đồ hiện có
+        conn.execute("PRAGMA foreign_keys=OFF")  # đổi tên bảng có khoá ngoại trong lúc chuyển
+        conn.executescript(f"BEGIN;\n{script}\nPRAGMA user_version = {SCHEMA_VERSION};\nCOMMIT;")
+        if existing:
+            logging.info(f"Đã chuyển {self.path} từ lược đồ {version} sang {SCHEMA_VERSION}.")
+
+    def _device_id(self):
+        """Id ngẫu nhiên của file này, tạo ở lần mở đầu tiên (giữ nguyên giữa các lần chạy)."""
+        self._conn.execute(INSERT_DEVICE_ID, (uuid.uuid4().hex,))
+        return self._conn.execute(SELECT_DEVICE_ID).fetchone()[0]
+
+    # --- Ghi ---
+    def _write(self, match_id, document, create, remote_version=None):
+        """Ghi một tài liệu trong transaction đang mở. remote_version: bản kéo về từ Firestore."""
+        rec = document.get('Record')
+        state = rec or document.get('FinalState') or {}
+        now = _now()
+        winner = document.get('WinnerPlayerID')
+        match_row = (match_id, document.get('Mode') or state.get('mode', 'Offline'),
+                     document.get('NumPlayers') or state.get('num_players'), document.get('StartTime') or now,
+                     document.get('EndTime'), winner, int(bool(document.get('is_loadable'))))
+        if remote_version is not None:
+            self._conn.execute(REMOTE_MATCH, match_row + (document.get('UpdatedAt') or now, document.get('DeviceID'),
+                                                          remote_version, remote_version))
+        else:
+            self._conn.execute(INSERT_MATCH if create else UPSERT_MATCH, match_row + (now, self.device_id))
+            self._conn.execute(DELETE_TOMBSTONE, (match_id,))
+        if rec:
+            self._write_record(match_id, rec, winner is not None, remote_version is not None)
+        elif state:
+            move_log = state.get('move_log')
+            rng = state.get('rng')
+            self._conn.execute(UPSERT_SAVED, (
+                match_id, state.get('turn', 0), state.get('dice_value'), json.dumps(state.get('pieces_state')),
+                None if rng is None else json.dumps(rng), None if move_log is None else bytes(move_log), now))
+        if remote_version is not None:
+            return
+        if winner is not None:
+            self._conn.execute(INSERT_ACTION, (match_id, winner, 'finish', f"Người {winner + 1} thắng", now))
+        else:
+            self._conn.execute(INSERT_ACTION, (match_id, state.get('turn', 0), 'save',
+                                               f"Lượt P{state.get('turn', 0) + 1}", now))
+
+    def _write_record(self, match_id, rec, finished, replace):
+        """
+        Bản ghi snapshot + delta: chỉ nối các lần gieo chưa có trong MatchMoves và giữ snapshot khi
+        record.snapshot_due. Log khác base (ván bắt đầu log mới) hay ngắn hơn bản đã lưu, hoặc
+        replace (bản kéo từ Firestore), thì ghi lại từ đầu.
+        """
+        conn = self._conn
+        base, plies = bytes(rec['base']), bytes(rec['plies'])
+        row = None if replace else conn.execute(SELECT_LOG, (match_id,)).fetchone()
+        rewrite = row is None or bytes(row[0]) != base or row[1] > len(plies)
+        if rewrite:
+            conn.execute(CLEAR_MOVES, (match_id,))
+            conn.execute(CLEAR_SNAPSHOTS, (match_id,))
+            stored = last_snapshot = 0
+        else:
+            stored, last_snapshot = row[1], row[2]
+        if len(plies) > stored:
+            conn.execute(INSERT_MOVES, (match_id, stored, plies[stored:]))
+        snapshot = rec.get('snapshot')
+        if snapshot and (record.snapshot_due(snapshot[0], last_snapshot, dict(rec, finished=finished))
+                         or (replace and snapshot[0] > 0)):
+            conn.execute(INSERT_SNAPSHOT, (match_id, snapshot[0], bytes(snapshot[1])))
+            last_snapshot = snapshot[0]
+        rng = dict(rec.get('rng') or {})
+        rolls, aux_draws = rng.pop('rolls', 0), rng.pop('aux_draws', 0)
+        current = (len(plies), last_snapshot, rec.get('turn', 0), rec.get('dice_value'), rolls, aux_draws,
+                   rec.get('check'), int(rec.get('replayable', True)))
+        if rewrite:
+            conn.execute(REPLACE_LOG, (match_id, base) + current[:4] + (json.dumps(rng) if rng else None,)
+                         + current[4:])
+            conn.execute(DELETE_SAVED, (match_id,))  # bản lưu FinalState cũ của ván (nếu có) đã được thay
+        else:
+            conn.execute(UPDATE_LOG, current + (match_id,))
+
+    def _transaction(self, func, *args):
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                result = func(*args)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return result
+
+    def save_match(self, match_id, document, create=False):
+        self.save_many([(match_id, document, create)])
+
+    def save_many(self, items):
+        def write_all():
+            for match_id, document, create in items:
+                self._write(str(match_id), document, create)
+        self._transaction(write_all)
+
+    # --- Đọc ---
+    def _load(self, match_id):
+        row = self._conn.execute(SELECT_MATCH, (str(match_id),)).fetchone()
+        if row is None:
+            return None
+        (mode, num_players, start, end, winner, loadable, version, updated, device,
+         turn, dice, pieces, rng, move_log) = row
+        document = {'is_loadable': bool(loadable), 'NumPlayers': num_players, 'Mode': mode, 'StartTime': start,
+                    'Version': version, 'UpdatedAt': updated, 'DeviceID': device}
+        if winner is not None:
+            document['WinnerPlayerID'] = winner
+        if end is not None:
+            document['EndTime'] = end
+        rec = self._load_record(match_id, num_players, mode, winner is not None)
+        if rec is not None:
+            document['Record'] = rec
+        elif pieces is not None:
+            document['FinalState'] = {
+                'num_players': num_players, 'turn': turn, 'dice_value': dice, 'mode': mode,
+                'pieces_state': json.loads(pieces), 'rng': None if rng is None else json.loads(rng),
+                'move_log': move_log,
+            }
+        return document
+
+    def _load_record(self, match_id, num_players, mode, finished):
+        """Record của ván (core.record): mọi delta nối lại và snapshot mới nhất. None nếu ván chỉ có bản lưu cũ."""
+        row = self._conn.execute(SELECT_RECORD, (str(match_id),)).fetchone()
+        if row is None:
+            return None
+        base, count, snapshot_ply, turn, dice, rng, rolls, aux_draws, check, replayable, snapshot = row
+        if rng is not None:
+            rng = dict(json.loads(rng), rolls=rolls, aux_draws=aux_draws)
+        plies = b"".join(chunk for (chunk,) in self._conn.execute(SELECT_MOVES, (str(match_id),)))
+        return {
+            'num_players': num_players, 'mode': mode, 'turn': turn, 'dice_value': dice,
+            'rng': rng, 'base': base, 'plies': plies[:count],
+            'snapshot': None if snapshot is None else [snapshot_ply, snapshot], 'check': check,
+            'replayable': bool(replayable), 'finished': finished,
+        }
+
+    def load_match(self, match_id):
+        with self._lock:
+            return self._load(match_id)
+
+    def list_matches(self, limit=50, after=None):
+        with self._lock:
+            if after is None:
+                rows = self._conn.execute(SELECT_HISTORY, (limit,)).fetchall()
+            else:
+                rows = self._conn.execute(SELECT_HISTORY_AFTER, (after[0], str(after[1]), limit)).fetchall()
+        return [{'MatchID': match_id, 'StartTime': start, 'EndTime': end, 'NumPlayers': num_players,
+                 'Mode': mode, 'WinnerPlayerID': winner, 'is_loadable': bool(loadable)}
+                for match_id, start, end, num_players, mode, winner, loadable in rows]
+
+    def delete_match(self, match_id):
+        def delete():
+            # Bản lưu và nhật ký bị xoá theo (ON DELETE CASCADE); ghi tombstone để xoá cả trên Firestore
+            row = self._conn.execute(SELECT_SYNCED_VERSION, (str(match_id),)).fetchone()
+            deleted = self._conn.execute(DELETE_MATCH, (str(match_id),)).rowcount
+            if self.track_deletes or (row is not None and row[0] > 0):
+                self._conn.execute(INSERT_TOMBSTONE, (str(match_id), _now()))
+            return deleted > 0
+        return self._transaction(delete)
+
+    # --- Outbox đồng bộ (utils.sync) ---
+    def pending_count(self):
+        """Số thay đổi chưa đẩy lên (ván chưa đồng bộ + ván đã xoá)."""
+        with self._lock:
+            return self._conn.execute(COUNT_UNSYNCED).fetchone()[0]
+
+    def pending_changes(self, limit=100):
+        """Các ván có Version > SyncedVersion, cũ nhất trước: list (match_id, tài liệu kèm 'Version')."""
+        with self._lock:
+            ids = [row[0] for row in self._conn.execute(SELECT_UNSYNCED, (limit,))]
+            return [(match_id, self._load(match_id)) for match_id in ids]
+
+    def deleted_ids(self, match_ids):
+        """Các id trong match_ids đã xoá cục bộ nhưng chưa xoá trên Firestore."""
+        match_ids = [str(match_id) for match_id in match_ids]
+        if not match_ids:
+            return set()
+        with self._lock:
+            sql = SELECT_DELETED.format(", ".join("?" * len(match_ids)))
+            return {row[0] for row in self._conn.execute(sql, match_ids)}
+
+    def pending_deletes(self, limit=100):
+        with self._lock:
+            return [row[0] for row in self._conn.execute(SELECT_TOMBSTONES, (limit,))]
+
+    def mark_synced(self, versions, deleted=()):
+        """
+        versions: list (match_id, version) đã có trên Firestore; deleted: các tombstone đã xoá xong.
+        Ván được lưu thêm trong lúc đẩy (Version lớn hơn) vẫn còn trong outbox.
+        """
+        def mark():
+            self._conn.executemany(MARK_SYNCED, [(version, match_id, version) for match_id, version in versions])
+            self._conn.executemany(DELETE_TOMBSTONE, [(match_id,) for match_id in deleted])
+        self._transaction(mark)
+
+    def apply_remote(self, match_id, document, version):
+        """
+        Ghi bản từ Firestore (thắng khi xung đột) với đúng version của nó. Bỏ qua nếu bản cục bộ
+        không thua theo persistence.precedence (ví dụ đã được lưu tiếp lên phiên bản cao hơn trong
+        lúc đồng bộ). Trả về True nếu đã ghi.
+        """
+        def apply():
+            row = self._conn.execute(SELECT_PRECEDENCE, (str(match_id),)).fetchone()
+            if row is not None:
+                local = {'Version': row[0], 'UpdatedAt': row[1], 'DeviceID': row[2]}
+                if precedence(local) >= precedence(dict(document, Version=version)):
+                    return False
+            self._write(str(match_id), document, True, remote_version=version)
+            return True
+        return self._transaction(apply)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
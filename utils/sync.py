@@ -0,0 +1,184 @@
+# utils/sync.py
+"""
+Đồng bộ offline-first giữa backend cục bộ (SQLiteBackend) và backend từ xa (FirestoreBackend).
+
+Bản lưu luôn ghi vào SQLite trước (không chờ mạng); mỗi lần lưu tăng Version của ván. Outbox là
+các ván có Version > SyncedVersion cùng các tombstone của ván đã xoá, nên thay đổi chưa đẩy lên
+vẫn còn sau khi thoát game hay mất mạng.
+
+Luồng nền SyncEngine mỗi vòng:
+- đọc tối đa batch_size thay đổi và tombstone từ outbox;
+- đọc các tài liệu tương ứng trên Firestore (một round trip, fetch_many; chỉ phần đầu của ván);
+- xung đột: tài liệu trên Firestore xếp trên bản cục bộ theo persistence.precedence (Version lớn
+  hơn; cùng Version thì UpdatedAt rồi DeviceID lớn hơn) thì bản Firestore thắng và được kéo về
+  (apply_remote); còn lại gom thành một lô ghi (commit), backend chỉ ghi các lần gieo Firestore chưa
+  có. Hai máy cùng lưu một Version luôn chọn cùng một bản thắng;
+- đánh dấu đã đồng bộ đúng version đã đẩy (ván lưu thêm trong lúc đẩy vẫn ở lại outbox).
+Lỗi mạng: thử lại với backoff luỹ thừa có jitter (base_delay .. max_delay); không mất dữ liệu vì
+outbox chỉ được xoá sau khi commit thành công.
+"""
+import logging
+import random
+import threading
+import time
+
+from utils.persistence import precedence
+
+
+class SyncEngine:
+    def __init__(self, local, remote, batch_size=100, interval=30.0, base_delay=1.0, max_delay=60.0,
+                 name="sync-worker"):
+        self.local = local
+        self.remote = remote
+        self.batch_size = batch_size
+        self.interval = interval      # giây giữa hai lần kiểm tra outbox khi không có notify()
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.name = name
+        self._cond = threading.Condition()
+        self._dirty = True            # có thể còn thay đổi chưa đẩy (lúc khởi động: outbox từ lần trước)
+        self._stopping = False
+        self._idle = False            # vòng gần nhất thấy outbox rỗng
+        self._thread = None
+        self._rng = random.Random()
+        self._stats = {'pushed': 0, 'pulled': 0, 'deleted': 0, 'conflicts': 0, 'batches': 0,
+                       'failures': 0, 'last_error': None, 'last_sync_ms': 0.0}
+
+    # --- Phía luồng gọi ---
+    def start(self):
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+        return self
+
+    def notify(self):
+        """Báo có thay đổi mới trong outbox (gọi sau mỗi lần lưu / xoá cục bộ)."""
+        with self._cond:
+            self._dirty = True
+            self._idle = False
+            self._cond.notify_all()
+
+    def flush(self, timeout=None):
+        """Chờ tới khi outbox rỗng. Trả về True nếu đã đồng bộ hết trước timeout."""
+        self.notify()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while not (self._idle and not self._dirty):
+                if self._thread is None or not self._thread.is_alive():
+                    return False
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def stop(self, timeout=5.0):
+        """Đẩy nốt outbox (tối đa timeout giây) rồi dừng luồng nền. Phần còn lại chờ lần chạy sau."""
+        flushed = self.flush(timeout)
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if not flushed:
+            logging.warning(f"{self.name}: dừng khi còn {self._pending()} thay đổi chưa đồng bộ.")
+        return flushed
+
+    def stats(self):
+        """Số liệu: pending (outbox), pushed, pulled, deleted, conflicts, batches, failures, last_error, last_sync_ms."""
+        with self._cond:
+            stats = dict(self._stats)
+        stats['pending'] = self._pending()
+        return stats
+
+    def _pending(self):
+        try:
+            return self.local.pending_count()
+        except Exception:
+            return None
+
+    # --- Một vòng đồng bộ ---
+    def sync_once(self):
+        """Đẩy một lô từ outbox. Trả về số thay đổi đã xử lý (0: outbox rỗng). Lỗi mạng được ném ra."""
+        start = time.perf_counter()
+        deletes = self.local.pending_deletes(self.batch_size)
+        changes = [(match_id, doc) for match_id, doc in self.local.pending_changes(self.batch_size)
+                   if doc is not None]
+        if not deletes and not changes:
+            return 0
+        # Cả ván đã xoá: backend cần biết phần đã lưu trên Firestore để xoá hết
+        remote_docs = self.remote.fetch_many([match_id for match_id, _ in changes] + list(deletes))
+
+        puts, synced = [], []
+        pulled = conflicts = 0
+        for match_id, doc in changes:
+            version = doc['Version']
+            remote_doc = remote_docs.get(match_id)
+            if remote_doc is not None and precedence(remote_doc) > precedence(doc):
+                # Máy khác đã ghi ván này với phiên bản cao hơn (hoặc cùng phiên bản, thắng khi phân xử)
+                conflicts += 1
+                if remote_doc.get('Version', 0) == version:
+                    logging.warning(f"Đồng bộ: MatchID {match_id} được lưu v{version} trên hai máy, "
+                                    f"giữ bản của {remote_doc.get('DeviceID')} ({remote_doc.get('UpdatedAt')}).")
+                remote_doc = self.remote.load_match(match_id)  # tài liệu đầy đủ (kèm các lần gieo)
+                remote_version = (remote_doc or {}).get('Version', 0)
+                if remote_doc is not None and self.local.apply_remote(match_id, remote_doc, remote_version):
+                    pulled += 1
+                    logging.info(f"Đồng bộ: MatchID {match_id} lấy bản Firestore v{remote_version} (cục bộ v{version}).")
+                continue
+            puts.append((match_id, doc))
+            synced.append((match_id, version))
+
+        if puts or deletes:
+            self.remote.commit(puts, deletes, known=remote_docs)
+        self.local.mark_synced(synced, deletes)
+        with self._cond:
+            self._stats['pushed'] += len(puts)
+            self._stats['deleted'] += len(deletes)
+            self._stats['pulled'] += pulled
+            self._stats['conflicts'] += conflicts
+            self._stats['batches'] += 1
+            self._stats['last_sync_ms'] = (time.perf_counter() - start) * 1000
+        return len(changes) + len(deletes)
+
+    # --- Luồng nền ---
+    def _backoff(self, failures):
+        delay = min(self.max_delay, self.base_delay * 2 ** (failures - 1))
+        return delay * (0.5 + self._rng.random() / 2)
+
+    def _run(self):
+        failures = 0
+        while True:
+            with self._cond:
+                if not self._dirty and not self._stopping:
+                    self._cond.wait_for(lambda: self._dirty or self._stopping, self.interval)
+                if self._stopping:
+                    return
+                self._dirty = False
+            try:
+                handled = self.sync_once()
+                error = None
+            except Exception as e:
+                handled, error = 0, e
+            with self._cond:
+                if error is None:
+                    failures = 0
+                    self._stats['last_error'] = None
+                    if handled:
+                        self._dirty = True  # có thể còn lô tiếp theo
+                    elif not self._dirty:
+                        self._idle = True
+                else:
+                    failures += 1
+                    self._dirty = True
+                    self._stats['failures'] += 1
+                    self._stats['last_error'] = str(error)
+                self._cond.notify_all()
+            if error is not None:
+                delay = self._backoff(failures)
+                logging.warning(f"{self.name}: đồng bộ lỗi ({error}), thử lại sau {delay:.1f}s (lần {failures}).")
+                with self._cond:
+                    # Trong lúc chờ chỉ dừng mới cắt ngang, notify() không rút ngắn backoff
+                    self._cond.wait_for(lambda: self._stopping, delay)